@@ -0,0 +1,17 @@
+from ._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodules=[
+        "bdf",
+        "benchmark",
+        "butcher_tableau",
+        "consistent_initial_conditions",
+        "dae_problem",
+        "fortran",
+        "irk",
+        "math",
+        "radau",
+        "solution",
+    ],
+)
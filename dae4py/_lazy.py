@@ -0,0 +1,55 @@
+import sys
+import importlib
+
+
+def attach(package, submodules=(), submodule_attributes=None):
+    """
+    Lazy loading of the submodules of a package and of the attributes they
+    export (PEP 562). A submodule is only imported when one of its
+    attributes is accessed for the first time, such that importing a
+    package does not load the dependencies of unused solvers.
+
+    Parameters
+    ----------
+    package: str
+        Name of the package, i.e., __name__ of its __init__.py.
+    submodules: iterable of str, default: ()
+        Submodules that are accessible as attributes of the package.
+    submodule_attributes: dict or None, default: None
+        Mapping from submodule names to the attributes they export. The
+        attributes must not have the name of a submodule, since importing
+        a submodule binds it to the package.
+
+    Returns
+    -------
+    __getattr__: callable
+        Module level __getattr__ of the package.
+    __dir__: callable
+        Module level __dir__ of the package.
+    __all__: list
+        Public names of the package.
+    """
+    submodules = set(submodules)
+    attributes = {
+        attribute: submodule
+        for submodule, names in (submodule_attributes or {}).items()
+        for attribute in names
+    }
+    __all__ = sorted(submodules | attributes.keys())
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module(f"{package}.{name}")
+        if name in attributes:
+            module = importlib.import_module(f"{package}.{attributes[name]}")
+            value = getattr(module, name)
+
+            # bind the attribute, such that it is only resolved once
+            setattr(sys.modules[package], name, value)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__():
+        return list(__all__)
+
+    return __getattr__, __dir__, __all__
@@ -1 +1,9 @@
-from .bdf import solve_dae_BDF
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "bdf": ["solve_dae_BDF", "iter_dae_BDF"],
+        "bdf_adaptive": ["solve_dae_BDF_adaptive", "iter_dae_BDF_adaptive"],
+    },
+)
@@ -1,7 +1,7 @@
 import numpy as np
-from tqdm import tqdm
 from scipy._lib._util import _RichResult
-from dae4py.math import newton
+from dae4py.math import newton, DAEJacobian
+from dae4py.solution import collect_steps
 
 MAX_ORDER = 6
 
@@ -16,7 +16,21 @@ BDF_COEFFICIENTS = [
 ]
 
 
-def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
+def solve_dae_BDF(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h,
+    atol=1e-6,
+    rtol=1e-6,
+    jac_sparsity=None,
+    vectorized=False,
+    max_jac_age=20,
+    max_rate=0.5,
+    observer=None,
+    buffer_size=None,
+):
     """
     Solves a system of DAEs using BDF methods.
 
@@ -36,6 +50,32 @@ def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
         Absolute tolerance for the Newton solver.
     rtol: float, default: 1e-6
         Relative tolerance for the Newton solver.
+    jac_sparsity: array-like, sparse matrix, tuple or DAEJacobian, optional
+        Sparsity structure of dF/dy and dF/dy', either as a single (m, m)
+        structure or as a tuple (sparsity_y, sparsity_yp). It is used to
+        group structurally independent columns of the Newton iteration
+        matrix, so that only one residual evaluation per group is required.
+    vectorized: bool, default: False
+        If True, F is called as F(T, Y, Yp) with arrays T of shape (k,) and
+        Y, Yp of shape (k, m) and has to return an array of shape (k, m).
+        All columns of the finite difference approximation are then
+        evaluated by a single call. It counts as k function evaluations in
+        nfev.
+    max_jac_age: int, default: 20
+        Maximum number of steps for which the LU-decomposition of the
+        Newton iteration matrix is reused. It is recomputed earlier if the
+        coefficient h / alpha of the iteration matrix changes (while the
+        order increases) or if the Newton iteration does not converge. A
+        value of 1 evaluates a new Jacobian in each step.
+    max_rate: float, default: 0.5
+        The LU-decomposition is not reused for the next step if the
+        estimated convergence rate of the Newton iteration exceeds max_rate.
+    observer: callable, optional
+        Function observer(step) that is called after each accepted step with
+        the step yielded by iter_dae_BDF.
+    buffer_size: int or None, default: None
+        If given, only the last buffer_size points of the time grid are
+        stored in a ring buffer, see solve_dae_radau.
 
     Returns
     -------
@@ -44,8 +84,61 @@ def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
         - t (array-like): Time grid.
         - y (array-like): State at the time grid.
         - yp (array-like): Derivative at the time grid.
-        - Y (array-like): Stage values at the time grid.
-        - Yp (array-like): Stage derivative at the time grid.
+        - nsteps (int): Number of steps.
+        - nfev (int): Number of function evaluations.
+        - njev (int): Number of Jacobian evaluations.
+        - nlu (int): Number of LU decompositions.
+        - nlgs (int): Number of solutions of linear systems.
+    """
+    y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
+    steps = iter_dae_BDF(
+        F,
+        y0,
+        yp0,
+        t_span,
+        h,
+        atol=atol,
+        rtol=rtol,
+        jac_sparsity=jac_sparsity,
+        vectorized=vectorized,
+        max_jac_age=max_jac_age,
+        max_rate=max_rate,
+    )
+    return collect_steps(
+        steps,
+        dict(t=t_span[0], y=y0, yp=yp0),
+        observer=observer,
+        buffer_size=buffer_size,
+    )
+
+
+def iter_dae_BDF(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h,
+    atol=1e-6,
+    rtol=1e-6,
+    jac_sparsity=None,
+    vectorized=False,
+    max_jac_age=20,
+    max_rate=0.5,
+):
+    """
+    Generator that solves a system of DAEs using BDF methods and yields the
+    steps one by one. The parameters are described in solve_dae_BDF.
+
+    Yields
+    ------
+    step: _RichResult
+        Container that stores
+        - t (float): Time at the end of the step.
+        - y (array-like): State at t.
+        - yp (array-like): Derivative at t.
+        - h (float): Step-size.
+        - nsteps, nfev, njev, nlu, nlgs (int): Counters up to this step,
+          see solve_dae_BDF.
     """
     t0, t1 = t_span
     if t1 <= t0:
@@ -54,18 +147,40 @@ def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
     y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
     m = len(y0)
 
-    # initialize solution arrays
-    t = [t0]
-    y = [y0]
-    yp = [yp0]
+    # the iteration matrix dF/dy * h / coeffs[-1] + dF/dy' has the sparsity
+    # structure of both partial derivatives
+    if jac_sparsity is not None and not isinstance(jac_sparsity, DAEJacobian):
+        jac_sparsity = DAEJacobian(jac_sparsity)
+    sparsity = jac_sparsity.sparsity if jac_sparsity is not None else None
+
+    # wrap function calls
+    nsteps = 0
+    nfev = 0
+    njev = 0
+    nlu = 0
+    nlgs = 0
+
+    def fun(t, y, yp):
+        # vectorized calls evaluate the residuals at all points of t
+        nonlocal nfev
+        nfev += np.size(t)
+        return F(t, y, yp)
 
     # history array and current derivative
     history = np.zeros((MAX_ORDER + 1, m))
     history[0] = y0
     yp1 = yp0
 
+    # LU-decomposition of the iteration matrix, its coefficient h / alpha
+    # and the number of steps it has been used for
+    LU = None
+    LU_coeff = None
+    LU_age = 0
+
     # progress bar for tracking
     steps = int(np.ceil((t1 - t0) / h))
+    from tqdm import tqdm
+
     with tqdm(total=steps, desc="BDF integration") as pbar:
         order = 1
         while t0 < t1:
@@ -74,26 +189,60 @@ def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
 
             def residual(yp1):
                 y1 = (h * yp1 - np.dot(coeffs[:-1], history[:order])) / coeffs[-1]
-                return np.atleast_1d(F(t0 + h, y1, yp1))
+                if vectorized:
+                    # yp1 is either a single point or stacked points
+                    yp1_2d = np.atleast_2d(yp1)
+                    y1_2d = np.atleast_2d(y1)
+                    T = np.full(len(yp1_2d), t0 + h)
+                    return np.reshape(fun(T, y1_2d, yp1_2d), yp1.shape)
+                return np.atleast_1d(fun(t0 + h, y1, yp1))
+
+            # the iteration matrix dF/dy * h / alpha + dF/dy' is outdated
+            if LU_age >= max_jac_age or LU_coeff != h / coeffs[-1]:
+                LU = None
+
+            # solve the nonlinear system, retry with a new Jacobian if the
+            # reused LU-decomposition fails
+            while True:
+                sol = newton(
+                    residual,
+                    yp1,
+                    atol=atol,
+                    rtol=rtol,
+                    jac_sparsity=sparsity,
+                    vectorized=vectorized,
+                    LU=LU,
+                )
+                njev += sol.njev
+                nlu += sol.nlu
+                nlgs += sol.nlgs
+                if sol.success or LU is None:
+                    break
+                LU = None
 
-            # solve the nonlinear system
-            sol = newton(residual, yp1, atol=atol, rtol=rtol)
             if not sol.success:
                 raise RuntimeError(
                     f"Newton solver failed at t={t0 + h} with error={sol.error:.2e}"
                 )
 
+            # keep the LU-decomposition for the next step
+            if sol.njev > 0:
+                LU_coeff = h / coeffs[-1]
+                LU_age = 0
+            LU = sol.LU
+            LU_age += 1
+            if sol.rate is not None and sol.rate > max_rate:
+                LU = None
+
             # extract the solution
             yp1 = sol.x
             y1 = (h * yp1 - np.dot(coeffs[:-1], history[:order])) / coeffs[-1]
             history[order] = y1
 
-            # advance time, append to solution arrays and update progress bar
+            # advance time and update progress bar
             t0 += h
+            nsteps += 1
             pbar.update(1)
-            t.append(t0)
-            y.append(y1)
-            yp.append(yp1)
 
             # shift history and increase order
             if order < MAX_ORDER:
@@ -101,8 +250,14 @@ def solve_dae_BDF(F, y0, yp0, t_span, h, atol=1e-6, rtol=1e-6):
             else:
                 history[:-1] = history[1:]  # shift history for full order
 
-    return _RichResult(
-        t=np.array(t),
-        y=np.array(y),
-        yp=np.array(yp),
-    )
+            yield _RichResult(
+                t=t0,
+                y=y1,
+                yp=yp1,
+                h=h,
+                nsteps=nsteps,
+                nfev=nfev,
+                njev=njev,
+                nlu=nlu,
+                nlgs=nlgs,
+            )
@@ -0,0 +1,504 @@
+import numpy as np
+from scipy._lib._util import _RichResult
+from scipy.sparse import issparse, csc_matrix
+from dae4py.math import DAEJacobian, banded_sparsity
+from dae4py.math import factor_lu as _factor_lu, solve_lu as _solve_lu
+from dae4py.solution import collect_steps
+
+EPS = np.finfo(float).eps
+
+MAX_ORDER = 5
+NEWTON_MAXITER = 4
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+
+# coefficients of the quasi-constant step-size BDF methods of order 0, ..., 5
+# and their error constants, see Shampine and Reichelt (1997). The NDF
+# modification alpha = (1 - kappa) * gamma is not used, i.e., kappa = 0.
+GAMMA = np.hstack((0, np.cumsum(1 / np.arange(1, MAX_ORDER + 1))))
+ALPHA = GAMMA
+ERROR_CONST = 1 / np.arange(1, MAX_ORDER + 2)
+
+
+def compute_R(order, factor):
+    """
+    Matrix that transforms the modified divided differences of a BDF method
+    of the given order, when the step-size is multiplied by factor.
+
+    Parameters
+    ----------
+    order: int
+        Order of the BDF method.
+    factor: float
+        Ratio of the new and the old step-size.
+
+    Returns
+    -------
+    R: ndarray, shape (order + 1, order + 1)
+        Transformation matrix.
+    """
+    I = np.arange(1, order + 1)[:, None]
+    J = np.arange(1, order + 1)
+    M = np.zeros((order + 1, order + 1))
+    M[1:, 1:] = (I - 1 - factor * J) / I
+    M[0] = 1
+    return np.cumprod(M, axis=0)
+
+
+def change_D(D, order, factor):
+    """
+    Update the modified divided differences D in-place for a step-size that
+    is multiplied by factor.
+    """
+    R = compute_R(order, factor)
+    U = compute_R(order, 1)
+    RU = R.dot(U)
+    D[: order + 1] = np.dot(RU.T, D[: order + 1])
+
+
+def solve_dae_BDF_adaptive(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h0=1e-3,
+    t_eval=None,
+    atol=1e-6,
+    rtol=1e-3,
+    max_order=MAX_ORDER,
+    jac=None,
+    jac_sparsity=None,
+    vectorized=False,
+    lband=None,
+    uband=None,
+    observer=None,
+    buffer_size=None,
+):
+    """
+    Solves a system of DAEs using variable-order, variable step-size BDF
+    methods in the quasi-constant step-size formulation with modified
+    divided differences of Shampine and Reichelt (1997).
+
+    Parameters
+    ----------
+    F: callable
+        Function defining the DAE system, F(t, y, yp) = 0.
+    y0: array-like
+        Initial condition for y.
+    yp0: array-like
+        Initial condition for y'.
+    t_span: Tuple
+        (t0, t1) defining the time span.
+    h0: float, default: 1e-3
+        Initial step-size.
+    t_eval, array-like, optional
+        Array of evaluation points for dense output.
+    atol: float, defaul: 1e-6
+        Absolute tolerance for the step-size controller.
+    rtol: float, default: 1e-3
+        Relative tolerance for the step-size controller.
+    max_order: int, default: 5
+        Maximum order of the BDF methods (between 1 and 5).
+    jac: callable, optional
+        Function jac(t, y, yp) returning the partial derivatives
+        (dF/dy, dF/dy'). They can be dense arrays or scipy.sparse matrices.
+        If None, the partial derivatives are approximated by finite
+        differences.
+    jac_sparsity: array-like, sparse matrix, tuple or DAEJacobian, optional
+        Sparsity structure of dF/dy and dF/dy' that is used for the finite
+        difference approximation, see solve_dae_radau.
+    vectorized: bool, default: False
+        If True, F is called as F(T, Y, Yp) with arrays T of shape (k,) and
+        Y, Yp of shape (k, m) and has to return an array of shape (k, m).
+        All columns of a finite difference sweep are then evaluated by a
+        single call. It counts as k function evaluations in nfev.
+    lband: int or None, default: None
+        Lower bandwidth of dF/dy and dF/dy'.
+    uband: int or None, default: None
+        Upper bandwidth of dF/dy and dF/dy'. If one of the bandwidths is
+        given, the iteration matrix is factorized with a banded
+        LU-decomposition.
+    observer: callable, optional
+        Function observer(step) that is called after each accepted step with
+        the step yielded by iter_dae_BDF_adaptive.
+    buffer_size: int or None, default: None
+        If given, only the last buffer_size points of the time grid are
+        stored in a ring buffer, see solve_dae_radau.
+
+    Returns
+    -------
+    solution: _RichResult
+        Container that stores
+        - t (array-like): Time grid.
+        - y (array-like): State at the time grid.
+        - yp (array-like): Derivative at the time grid.
+        - order (array-like): Order of the BDF method of each step.
+        - t_eval (array-like): Time grid (dense output).
+        - y_eval (array-like): State (dense output).
+        - yp_eval (array-like): Derivative (dense output).
+        - nsteps (int): Number of steps.
+        - nfev (int): Number of function evaluations.
+        - njev (int): Number of Jacobian evaluations.
+        - nlu (int): Number of LU decompositions.
+        - nlgs (int): Number of forward + backward substitutions to solve a
+          linear system of equations with given LU-decompositions.
+    """
+    y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
+    steps = iter_dae_BDF_adaptive(
+        F,
+        y0,
+        yp0,
+        t_span,
+        h0=h0,
+        t_eval=t_eval,
+        atol=atol,
+        rtol=rtol,
+        max_order=max_order,
+        jac=jac,
+        jac_sparsity=jac_sparsity,
+        vectorized=vectorized,
+        lband=lband,
+        uband=uband,
+    )
+    solution = collect_steps(
+        steps,
+        dict(t=t_span[0], y=y0, yp=yp0, order=1),
+        observer=observer,
+        buffer_size=buffer_size,
+        dense_output=True,
+    )
+    solution.t_eval = t_eval if t_eval is None else np.asarray(t_eval)
+    return solution
+
+
+def iter_dae_BDF_adaptive(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h0=1e-3,
+    t_eval=None,
+    atol=1e-6,
+    rtol=1e-3,
+    max_order=MAX_ORDER,
+    jac=None,
+    jac_sparsity=None,
+    vectorized=False,
+    lband=None,
+    uband=None,
+):
+    """
+    Generator that solves a system of DAEs using variable-order, variable
+    step-size BDF methods and yields the accepted steps one by one. The
+    parameters are described in solve_dae_BDF_adaptive.
+
+    Yields
+    ------
+    step: _RichResult
+        Container that stores
+        - t (float): Time at the end of the step.
+        - y (array-like): State at t.
+        - yp (array-like): Derivative at t.
+        - order (int): Order of the BDF method of the step.
+        - h (float): Step-size.
+        - t_eval (array-like): Points of t_eval inside the step (None if
+          there are none).
+        - y_eval (array-like): State at these points (dense output).
+        - yp_eval (array-like): Derivative at these points (dense output).
+        - nsteps, nfev, njev, nlu, nlgs (int): Counters up to this step,
+          see solve_dae_BDF_adaptive.
+    """
+    t0, t1 = t_span
+    if t1 <= t0:
+        raise ValueError("t1 must be greater than t0")
+
+    if not 1 <= max_order <= MAX_ORDER:
+        raise ValueError(f"max_order has to be between 1 and {MAX_ORDER}")
+
+    if t_eval is not None:
+        t_eval_i = 0
+        t_eval = np.asarray(t_eval)
+
+    # wrap function calls
+    nsteps = 0
+    nfev = 0
+    njev = 0
+    nlu = 0
+    nlgs = 0
+
+    def fun(t, y, yp):
+        nonlocal nfev
+        nfev += 1
+        if vectorized:
+            return np.reshape(F(np.array([t]), y[None, :], yp[None, :]), -1)
+        return np.atleast_1d(F(t, y, yp))
+
+    def fun_vectorized(T, Y, Yp):
+        # a single call evaluates the residuals at all len(T) points
+        nonlocal nfev
+        nfev += len(T)
+        return np.reshape(F(T, Y, Yp), Y.shape)
+
+    if jac is None:
+        if jac_sparsity is None and (lband is not None or uband is not None):
+            jac_sparsity = banded_sparsity(np.size(y0), lband, uband)
+
+        if isinstance(jac_sparsity, DAEJacobian):
+            fd_jac = jac_sparsity
+        else:
+            fd_jac = DAEJacobian(jac_sparsity)
+
+        fd_fun = fun_vectorized if vectorized else fun
+
+        def jac(t, y, yp):
+            return fd_jac(fd_fun, t, y, yp, vectorized=vectorized)
+
+    def jacobian(t, y, yp, jac=jac):
+        nonlocal njev
+        njev += 1
+        J, M = jac(t, y, yp)
+
+        # use sparse matrices for both partial derivatives if one of them
+        # is sparse, otherwise the iteration matrix becomes dense
+        if issparse(J) or issparse(M):
+            return csc_matrix(M), csc_matrix(J)
+        return np.atleast_2d(M), np.atleast_2d(J)
+
+    def factor_lu(A):
+        nonlocal nlu
+        nlu += 1
+        return _factor_lu(A, lband, uband)
+
+    def solve_lu(LU, rhs):
+        nonlocal nlgs
+        nlgs += 1
+        return _solve_lu(LU, rhs)
+
+    newton_tol = max(10 * EPS / rtol, min(0.03, rtol**0.5))
+
+    # prepare initial values
+    y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
+    m = len(y0)
+
+    # modified divided differences, D[0] = y and D[1] = h * y'
+    D = np.zeros((MAX_ORDER + 3, m), dtype=float)
+    D[0] = y0
+    D[1] = h0 * yp0
+
+    hn = h0
+    tn = t0
+    order = 1
+    n_equal_steps = 0
+
+    # the partial derivatives are reused as long as the simplified Newton
+    # iterations converge, the iteration matrix M + c * J is only
+    # factorized again if c = h / alpha changes
+    M, J = jacobian(t0, y0, yp0)
+    current_jac = True
+    LU = None
+    from tqdm import tqdm
+
+    with tqdm(total=100, desc="BDF") as pbar:
+        while tn < t1:
+            min_step = 10 * np.abs(np.nextafter(tn, np.inf) - tn)
+            if hn < min_step:
+                change_D(D, order, min_step / hn)
+                hn = min_step
+                n_equal_steps = 0
+                LU = None
+
+            step_accepted = False
+            while not step_accepted:
+                if hn < min_step:
+                    raise RuntimeError(f"Step-size too small at t={tn}")
+
+                # ensure that last step exactly hits t1
+                tn1 = tn + hn
+                if tn1 > t1:
+                    tn1 = t1
+                    change_D(D, order, (tn1 - tn) / hn)
+                    n_equal_steps = 0
+                    LU = None
+                hn = tn1 - tn
+
+                # predictor and the part of the derivative that is
+                # independent of the correction d, i.e., yp = (psi + d) / c
+                y_predict = np.sum(D[: order + 1], axis=0)
+                psi = np.dot(D[1 : order + 1].T, GAMMA[1 : order + 1]) / ALPHA[order]
+                c = hn / ALPHA[order]
+                scale = atol + rtol * np.abs(y_predict)
+
+                converged = False
+                while not converged:
+                    if LU is None:
+                        LU = factor_lu(M + c * J)
+
+                    # simplified Newton iterations for the correction d
+                    yn1 = y_predict.copy()
+                    d = np.zeros(m)
+                    dy_norm_old = None
+                    rate = None
+                    for k in range(NEWTON_MAXITER):
+                        f = fun(tn1, yn1, (psi + d) / c)
+                        if not np.all(np.isfinite(f)):
+                            break
+
+                        dy = -c * solve_lu(LU, f)
+                        dy_norm = np.linalg.norm(dy / scale) / m**0.5
+                        if dy_norm_old is not None:
+                            rate = dy_norm / dy_norm_old
+
+                        if rate is not None and (
+                            rate >= 1
+                            or rate ** (NEWTON_MAXITER - k) / (1 - rate) * dy_norm
+                            > newton_tol
+                        ):
+                            break
+
+                        yn1 += dy
+                        d += dy
+
+                        if dy_norm == 0 or (
+                            rate is not None
+                            and rate / (1 - rate) * dy_norm < newton_tol
+                        ):
+                            converged = True
+                            break
+
+                        dy_norm_old = dy_norm
+
+                    if not converged:
+                        if current_jac:
+                            break
+
+                        # update the partial derivatives at the predictor
+                        M, J = jacobian(tn1, y_predict, psi / c)
+                        current_jac = True
+                        LU = None
+
+                if not converged:
+                    factor = 0.5
+                    hn *= factor
+                    change_D(D, order, factor)
+                    n_equal_steps = 0
+                    LU = None
+                    continue
+
+                # error estimate
+                safety = 0.9 * (2 * NEWTON_MAXITER + 1) / (2 * NEWTON_MAXITER + k + 1)
+                scale = atol + rtol * np.abs(yn1)
+                error_norm = np.linalg.norm(ERROR_CONST[order] * d / scale) / m**0.5
+
+                # can the step be accepted
+                if error_norm > 1:
+                    factor = max(MIN_FACTOR, safety * error_norm ** (-1 / (order + 1)))
+                    hn *= factor
+                    change_D(D, order, factor)
+                    n_equal_steps = 0
+                    LU = None
+                else:
+                    step_accepted = True
+
+            # the Jacobian of the next step is not current anymore
+            current_jac = False
+            n_equal_steps += 1
+            ypn1 = (psi + d) / c
+
+            # update differences
+            D[order + 2] = d - D[order + 1]
+            D[order + 1] = d
+            for i in reversed(range(order + 1)):
+                D[i] += D[i + 1]
+
+            # the accepted step
+            nsteps += 1
+            step = _RichResult(
+                t=tn1,
+                y=yn1.copy(),
+                yp=ypn1,
+                order=order,
+                h=hn,
+                t_eval=None,
+                y_eval=None,
+                yp_eval=None,
+            )
+
+            # dense output
+            if t_eval is not None:
+                t_eval_i1 = np.searchsorted(t_eval, tn1, side="right")
+                t_eval_step = t_eval[t_eval_i:t_eval_i1]
+
+                if t_eval_step.size > 0:
+                    t_eval_i = t_eval_i1
+                    y_eval_step, yp_eval_step = _dense_output(
+                        t_eval_step, tn1, hn, order, D
+                    )
+                    step.t_eval = t_eval_step
+                    step.y_eval = y_eval_step
+                    step.yp_eval = yp_eval_step
+
+            tn = tn1
+
+            # order and step-size selection after order + 1 steps of
+            # constant step-size
+            if n_equal_steps >= order + 1:
+                if order > 1:
+                    error_m = ERROR_CONST[order - 1] * D[order]
+                    error_m_norm = np.linalg.norm(error_m / scale) / m**0.5
+                else:
+                    error_m_norm = np.inf
+
+                if order < max_order:
+                    error_p = ERROR_CONST[order + 1] * D[order + 2]
+                    error_p_norm = np.linalg.norm(error_p / scale) / m**0.5
+                else:
+                    error_p_norm = np.inf
+
+                error_norms = np.array([error_m_norm, error_norm, error_p_norm])
+                with np.errstate(divide="ignore"):
+                    factors = error_norms ** (-1 / np.arange(order, order + 3))
+
+                order += np.argmax(factors) - 1
+                factor = min(MAX_FACTOR, safety * np.max(factors))
+                hn *= factor
+                change_D(D, order, factor)
+                n_equal_steps = 0
+                LU = None
+
+            # update progress bar
+            progress = min(100, int(100 * (tn - t0) / (t1 - t0)))
+            pbar.n = progress
+            pbar.set_description(f"t: {tn:0.2e}s < {t1:0.2e}s; h: {hn:0.2e}")
+            pbar.refresh()
+
+            yield _RichResult(
+                step,
+                nsteps=nsteps,
+                nfev=nfev,
+                njev=njev,
+                nlu=nlu,
+                nlgs=nlgs,
+            )
+
+
+def _dense_output(t_eval, t, h, order, D):
+    """
+    Evaluate the interpolation polynomial of the last step and its
+    derivative at the points t_eval.
+    """
+    t_shift = t - h * np.arange(order)
+    denom = h * (1 + np.arange(order))
+
+    # p_j(t) = prod_{i < j} (t - t_shift[i]) / denom[i] and its derivative
+    p = np.ones_like(t_eval)
+    dp = np.zeros_like(t_eval)
+    y = np.tile(D[0], (len(t_eval), 1))
+    yp = np.zeros_like(y)
+    for j in range(order):
+        x = (t_eval - t_shift[j]) / denom[j]
+        dp = dp * x + p / denom[j]
+        p = p * x
+        y += p[:, None] * D[j + 1]
+        yp += dp[:, None] * D[j + 1]
+
+    return y, yp
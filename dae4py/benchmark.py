@@ -1,11 +1,13 @@
+import os
 import time
 import numpy as np
-import matplotlib.pyplot as plt
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from scipy._lib._util import _RichResult
 from dae4py.bdf import solve_dae_BDF
 from dae4py.irk import solve_dae_IRK_generic
 from dae4py.butcher_tableau import radau_tableau, gauss_legendre_tableau
 
-
 solvers = [
     ("RadauIIA(1)", solve_dae_IRK_generic, {"tableau": radau_tableau(1)}),
     ("RadauIIA(2)", solve_dae_IRK_generic, {"tableau": radau_tableau(2)}),
@@ -18,44 +20,115 @@ solvers = [
 ]
 
 
-def convergence_analysis(problem, rtols, atols, h0s):
-    # benchmark results
+def _convergence_run(problem, method, kwargs, rtol, atol, h0):
+    """
+    Single integration of a convergence analysis. This is a top-level
+    function, so that it can be pickled and sent to worker processes.
+
+    Returns
+    -------
+    error_y: array-like
+        Absolute error of all components of y at t1.
+    elapsed_time: float
+        Wall time of the integration in seconds.
+    """
+    # solve system
+    start = time.perf_counter()
+    sol = method(
+        f=problem.F,
+        y0=problem.y0,
+        yp0=problem.yp0,
+        t_span=problem.t_span,
+        h0=h0,
+        atol=atol,
+        rtol=rtol,
+        **kwargs,
+    )
+    elapsed_time = time.perf_counter() - start
+
+    # error
+    y_true, yp_true = problem.true_sol(problem.t1)
+    idx = np.where(np.isclose(sol.t, problem.t1))[0][0]
+    diff_y = y_true - sol.y[idx]
+    error_y = np.abs(diff_y)
+
+    return error_y, elapsed_time
+
+
+def run_convergence_analysis(
+    problem, rtols, atols, h0s, solvers=solvers, parallel=False, max_workers=None
+):
+    """
+    Compute the errors at t1 of all solvers for all (rtol, atol, h0) triples
+    and estimate the rates of convergence.
+
+    Parameters
+    ----------
+    problem: DAEProblem
+        Problem with known true solution.
+    rtols: array-like
+        Relative tolerances.
+    atols: array-like
+        Absolute tolerances.
+    h0s: array-like
+        (Initial) step-sizes.
+    solvers: list, default: dae4py.benchmark.solvers
+        List of tuples (name, method, kwargs).
+    parallel: bool, default: False
+        If True, the independent integrations are distributed among the
+        processes of a ProcessPoolExecutor. Each worker process runs a single
+        integration at a time, so the global state of the Fortran wrappers is
+        never shared between concurrent integrations. The problem, the
+        methods and their kwargs have to be picklable.
+    max_workers: int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    result: _RichResult
+        Container that stores
+        - solver_names (list): Names of the solvers.
+        - h0s (array-like): (Initial) step-sizes.
+        - rtols (array-like): Relative tolerances.
+        - atols (array-like): Absolute tolerances.
+        - errors (array-like): Errors of shape (nsolvers, nh0s, m).
+        - rates (array-like): Estimated rates of shape (nsolvers, m).
+        - elapsed_times (array-like): Wall times of shape (nsolvers, nh0s).
+    """
+    h0s = np.asarray(h0s, dtype=float)
     n = len(problem.y0)
     errors = np.zeros((len(solvers), len(rtols), n))
     rates = np.zeros((len(solvers), n))
+    elapsed_times = np.zeros((len(solvers), len(rtols)))
+
+    runs = [
+        ((i, j), (problem, method, kwargs, rtol, atol, h0))
+        for i, (solver_name, method, kwargs) in enumerate(solvers)
+        for j, (rtol, atol, h0) in enumerate(zip(rtols, atols, h0s))
+    ]
 
-    for i, name_method_kwargs in enumerate(solvers):
-        solver_name, method, kwargs = name_method_kwargs
-        print(f" - method: {solver_name}; kwargs: {kwargs}")
-        for j, (rtol, atol, h0) in enumerate(zip(rtols, atols, h0s)):
+    if parallel:
+        if max_workers is None:
+            max_workers = os.cpu_count()
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (ij, executor.submit(_convergence_run, *args)) for ij, args in runs
+            ]
+            for (i, j), future in futures:
+                errors[i, j], elapsed_times[i, j] = future.result()
+    else:
+        for (i, j), args in runs:
+            if j == 0:
+                solver_name, method, kwargs = solvers[i]
+                print(f" - method: {solver_name}; kwargs: {kwargs}")
+            rtol, atol, h0 = args[3:]
             print(f"   * rtol: {rtol}")
             print(f"   * atol: {atol}")
             print(f"   * h0:   {h0}")
+            errors[i, j], elapsed_times[i, j] = _convergence_run(*args)
+            print(f"     => error_y: {errors[i, j]}")
 
-            # solve system
-            start = time.time()
-            sol = method(
-                f=problem.F,
-                y0=problem.y0,
-                yp0=problem.yp0,
-                t_span=problem.t_span,
-                h0=h0,
-                atol=atol,
-                rtol=rtol,
-                **kwargs,
-            )
-            end = time.time()
-            elapsed_time = end - start
-
-            # error
-            y_true, yp_true = problem.true_sol(problem.t1)
-            idx = np.where(np.isclose(sol.t, problem.t1))[0][0]
-            diff_y = y_true - sol.y[idx]
-            error_y = np.abs(diff_y)
-            print(f"     => error_y: {error_y}")
-
-            errors[i, j] = error_y
-
+    for i in range(len(solvers)):
         # estiamte rate of convergence
         log_h = np.vstack([np.log(h0s)] * n).T
         log_err = np.log(errors[i])
@@ -65,10 +138,23 @@ def convergence_analysis(problem, rtols, atols, h0s):
         p = np.diff(log_err, axis=0) / np.diff(log_h, axis=0)
         rates[i] = p[-1]
 
-    for i, name_method_kwargs in enumerate(solvers):
-        solver_name = name_method_kwargs[0]
+    return _RichResult(
+        solver_names=[solver[0] for solver in solvers],
+        h0s=h0s,
+        rtols=np.asarray(rtols),
+        atols=np.asarray(atols),
+        errors=errors,
+        rates=rates,
+        elapsed_times=elapsed_times,
+    )
+
+
+def save_convergence(problem, result):
+    """Write the errors of each solver to a txt file."""
+    n = len(problem.y0)
+    for i, solver_name in enumerate(result.solver_names):
         header = "".join(["h"] + [f", e{i + 1}" for i in range(n)])
-        data = np.hstack([h0s[:, None], errors[i]])
+        data = np.hstack([result.h0s[:, None], result.errors[i]])
 
         np.savetxt(
             f"{problem.name}_index{problem.index}_{solver_name}_convergence.txt",
@@ -78,7 +164,15 @@ def convergence_analysis(problem, rtols, atols, h0s):
             comments="",
         )
 
-    fig, ax = plt.subplots(1, n, figsize=(12, 9))
+
+def plot_convergence(result, show=True):
+    """Plot the errors of all solvers over the step-sizes."""
+    import matplotlib.pyplot as plt
+
+    h0s, errors, rates = result.h0s, result.errors, result.rates
+    n = errors.shape[-1]
+    fig, ax = plt.subplots(1, n, figsize=(12, 9), squeeze=False)
+    ax = ax[0]
 
     for j in range(n):
         ax[j].plot(h0s, h0s, "--", label="h")
@@ -89,7 +183,10 @@ def convergence_analysis(problem, rtols, atols, h0s):
         ax[j].plot(h0s, h0s**6, "--", label="h^6")
         for i, ei in enumerate(errors):
             ax[j].plot(
-                h0s, ei[:, j], "-o", label=f"{solvers[i][0]}; p≈{rates[i, j]:0.2f}"
+                h0s,
+                ei[:, j],
+                "-o",
+                label=f"{result.solver_names[i]}; p≈{rates[i, j]:0.2f}",
             )
 
         ax[j].set_title(f"convergence analysis:")
@@ -100,6 +197,528 @@ def convergence_analysis(problem, rtols, atols, h0s):
         ax[j].set_xlabel("h [s]")
         ax[j].set_ylabel(f"||y_{j},ref(t1) - y_{j}(t1)||")
 
-    plt.show()
+    if show:
+        plt.show()
+
+    return fig, ax
+
+
+def convergence_analysis(
+    problem, rtols, atols, h0s, solvers=solvers, parallel=False, max_workers=None
+):
+    result = run_convergence_analysis(
+        problem,
+        rtols,
+        atols,
+        h0s,
+        solvers=solvers,
+        parallel=parallel,
+        max_workers=max_workers,
+    )
+    save_convergence(problem, result)
+    plot_convergence(result)
+
+    return result.errors, result.rates
+
+
+def _run_solve_dae_radau(problem, rtol, atol, h):
+    from dae4py.radau import solve_dae_radau
+
+    kwargs = {} if h is None else {"h0": h}
+    return solve_dae_radau(
+        problem.F,
+        problem.y0,
+        problem.yp0,
+        problem.t_span,
+        atol=atol,
+        rtol=rtol,
+        **kwargs,
+    )
+
+
+def _run_solve_dae_BDF(problem, rtol, atol, h):
+    return solve_dae_BDF(
+        problem.F, problem.y0, problem.yp0, problem.t_span, h, atol=atol, rtol=rtol
+    )
+
+
+def _run_solve_dae_BDF_adaptive(problem, rtol, atol, h):
+    from dae4py.bdf import solve_dae_BDF_adaptive
+
+    kwargs = {} if h is None else {"h0": h}
+    return solve_dae_BDF_adaptive(
+        problem.F,
+        problem.y0,
+        problem.yp0,
+        problem.t_span,
+        atol=atol,
+        rtol=rtol,
+        **kwargs,
+    )
+
+
+def _run_solve_dae_IRK(problem, rtol, atol, h):
+    from dae4py.irk import solve_dae_IRK
+
+    return solve_dae_IRK(
+        problem.F,
+        problem.y0,
+        problem.yp0,
+        problem.t_span,
+        h,
+        radau_tableau(3),
+        atol=atol,
+        rtol=rtol,
+    )
+
+
+def _run_fortran(name, problem, rtol, atol, h):
+    import dae4py.fortran
+
+    solver = getattr(dae4py.fortran, name)
+    return solver(problem.F, problem.t_span, problem.y0, problem.yp0, rtol, atol)
+
+
+# name, solver, fixed step-size
+work_precision_solvers = [
+    ("solve_dae_radau", _run_solve_dae_radau, False),
+    ("solve_dae_BDF", _run_solve_dae_BDF, True),
+    ("solve_dae_BDF_adaptive", _run_solve_dae_BDF_adaptive, False),
+    ("solve_dae_IRK", _run_solve_dae_IRK, True),
+    ("dassl", partial(_run_fortran, "dassl"), False),
+    ("pside", partial(_run_fortran, "pside"), False),
+    ("radau", partial(_run_fortran, "radau"), False),
+    ("radau5", partial(_run_fortran, "radau5"), False),
+    ("daskr", partial(_run_fortran, "daskr"), False),
+    ("daspk", partial(_run_fortran, "daspk"), False),
+]
+
+# counters of the solution and their names in the Fortran wrappers
+_counters = {
+    "nsteps": ("nsteps",),
+    "nfev": ("nfev", "nf"),
+    "njev": ("njev", "njac"),
+    "nlu": ("nlu",),
+    "nlgs": ("nlgs", "nsol", "nsolve"),
+}
+
+
+def _benchmark_run(problem, solver_name, solver, rtol, atol, h, y_ref):
+    """Single timed run of a work-precision benchmark."""
+    record = dict(
+        problem=problem.name,
+        solver=solver_name,
+        rtol=rtol,
+        atol=atol,
+        h=h,
+    )
+
+    try:
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        sol = solver(problem, rtol, atol, h)
+        record["wall_time"] = time.perf_counter() - start_wall
+        record["cpu_time"] = time.process_time() - start_cpu
+    except Exception as e:
+        record.update(success=False, message=f"{type(e).__name__}: {e}")
+        return record
+
+    t = np.asarray(sol["t"])
+    y = np.asarray(sol["y"])
+    success = bool(sol.get("success", True)) and np.isclose(t[-1], problem.t1)
+    record["success"] = bool(success)
+    record["error"] = float(np.max(np.abs(y[-1] - y_ref))) if success else None
+
+    for counter, keys in _counters.items():
+        record[counter] = next((int(sol[key]) for key in keys if key in sol), None)
+
+    return record
+
+
+def _memory_run(problem, solver, rtol, atol, h):
+    """
+    Peak memory of Python allocations (including NumPy arrays) of a single
+    run measured with tracemalloc. This is separated from the timed run,
+    since tracing slows down the integration.
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        solver(problem, rtol, atol, h)
+        return tracemalloc.get_traced_memory()[1]
+    except Exception:
+        return None
+    finally:
+        tracemalloc.stop()
+
+
+def _isolated(fun, *args):
+    """Call fun(*args) in a fresh worker process."""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(fun, *args).result()
+
+
+def reference_solution(problem, rtol=1e-12, atol=1e-12, h0=1e-6):
+    """
+    State at t1 given by the true solution of the problem or, if it is
+    unknown, by solve_dae_radau with stringent tolerances.
+    """
+    if problem.true_sol is not None:
+        return np.asarray(problem.true_sol(problem.t1)[0])
+
+    from dae4py.radau import solve_dae_radau
+
+    sol = solve_dae_radau(
+        problem.F,
+        problem.y0,
+        problem.yp0,
+        problem.t_span,
+        h0,
+        atol=atol,
+        rtol=rtol,
+        s=5,
+    )
+    return sol.y[-1]
+
+
+def work_precision(
+    problem,
+    rtols,
+    atols=None,
+    h0s=None,
+    solvers=None,
+    y_ref=None,
+    memory=True,
+    isolate=True,
+):
+    """
+    Work-precision benchmark of a single problem.
+
+    Parameters
+    ----------
+    problem: DAEProblem
+        Problem to be solved.
+    rtols: array-like
+        Relative tolerances.
+    atols: array-like, optional
+        Absolute tolerances. Defaults to rtols.
+    h0s: array-like, optional
+        (Initial) step-sizes for each tolerance. Solvers with fixed
+        step-size are skipped if not given.
+    solvers: list, default: dae4py.benchmark.work_precision_solvers
+        List of tuples (name, solver, fixed step-size), where the solver is
+        called as solver(problem, rtol, atol, h) and returns a solution with
+        the keys "t" and "y" and optionally the counters nsteps, nfev,
+        njev, nlu and nlgs.
+    y_ref: array-like, optional
+        Reference state at t1. Defaults to `reference_solution(problem)`.
+    memory: bool, default: True
+        Measure the peak memory of Python allocations with tracemalloc in a
+        second, untimed run.
+    isolate: bool, default: True
+        Execute each run in a fresh worker process. This protects the
+        benchmark from the global state of the Fortran wrappers and from
+        crashes of single runs. All arguments have to be picklable.
+
+    Returns
+    -------
+    records: list
+        List of dicts storing problem, solver, rtol, atol, h, success,
+        error, wall_time, cpu_time, peak_memory, nsteps, nfev, njev, nlu
+        and nlgs of each run.
+    """
+    if atols is None:
+        atols = rtols
+    if solvers is None:
+        solvers = work_precision_solvers
+    if y_ref is None:
+        y_ref = reference_solution(problem)
+
+    records = []
+    for solver_name, solver, fixed_step in solvers:
+        if fixed_step and h0s is None:
+            continue
+        for j, (rtol, atol) in enumerate(zip(rtols, atols)):
+            h = None if h0s is None else float(h0s[j])
+            print(f" - {problem.name}; {solver_name}; rtol: {rtol}; atol: {atol}")
+            args = (problem, solver_name, solver, rtol, atol, h, y_ref)
+            memory_args = (problem, solver, rtol, atol, h)
+            if isolate:
+                try:
+                    record = _isolated(_benchmark_run, *args)
+                    if memory:
+                        record["peak_memory"] = _isolated(_memory_run, *memory_args)
+                except Exception as e:
+                    record = dict(
+                        problem=problem.name,
+                        solver=solver_name,
+                        rtol=rtol,
+                        atol=atol,
+                        h=h,
+                        success=False,
+                        message=f"{type(e).__name__}: {e}",
+                    )
+            else:
+                record = _benchmark_run(*args)
+                if memory:
+                    record["peak_memory"] = _memory_run(*memory_args)
+            records.append(record)
+
+    return records
+
+
+def save_benchmark(records, filename):
+    """Write the benchmark records together with the environment to JSON."""
+    import json
+    import platform
+    import scipy
+
+    data = dict(
+        environment=dict(
+            python=platform.python_version(),
+            numpy=np.__version__,
+            scipy=scipy.__version__,
+            machine=platform.machine(),
+            processor=platform.processor(),
+            system=platform.system(),
+        ),
+        records=records,
+    )
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_benchmark(filename):
+    """Read the benchmark records written by `save_benchmark`."""
+    import json
+
+    with open(filename, "r") as f:
+        return json.load(f)["records"]
+
+
+def compare_benchmark(
+    records,
+    baseline,
+    time_tolerance=0.25,
+    min_time=1e-2,
+    memory_tolerance=0.25,
+    counter_tolerance=0.0,
+    error_factor=10.0,
+):
+    """
+    Compare benchmark records with a baseline. Runs are matched by problem,
+    solver, rtol, atol and h.
+
+    Parameters
+    ----------
+    records: list
+        Current benchmark records.
+    baseline: list
+        Benchmark records of the baseline.
+    time_tolerance: float, default: 0.25
+        Allowed relative increase of wall and CPU time.
+    min_time: float, default: 1e-2
+        Times below this value in seconds are not compared.
+    memory_tolerance: float, default: 0.25
+        Allowed relative increase of the peak memory.
+    counter_tolerance: float, default: 0.0
+        Allowed relative increase of nsteps, nfev, njev, nlu and nlgs.
+    error_factor: float, default: 10.0
+        Allowed factor of increase of the error.
+
+    Returns
+    -------
+    regressions: list
+        Descriptions of all detected regressions.
+    """
+
+    def key(record):
+        return (
+            record["problem"],
+            record["solver"],
+            record["rtol"],
+            record["atol"],
+            record["h"],
+        )
+
+    baseline = {key(record): record for record in baseline}
+
+    def increased(new, old, tolerance):
+        return new is not None and old is not None and new > (1 + tolerance) * old
+
+    regressions = []
+    for record in records:
+        old = baseline.get(key(record))
+        if old is None:
+            continue
+
+        name = "{}; {}; rtol: {}; atol: {}; h: {}".format(*key(record))
+        if old.get("success") and not record.get("success"):
+            regressions.append(f"{name}: run failed ({record.get('message')})")
+            continue
+
+        for quantity in ["wall_time", "cpu_time"]:
+            new_value, old_value = record.get(quantity), old.get(quantity)
+            if (
+                new_value is not None
+                and new_value > min_time
+                and increased(new_value, old_value, time_tolerance)
+            ):
+                regressions.append(
+                    f"{name}: {quantity} {old_value:0.3e}s -> {new_value:0.3e}s"
+                )
+
+        if increased(
+            record.get("peak_memory"), old.get("peak_memory"), memory_tolerance
+        ):
+            regressions.append(
+                f"{name}: peak_memory {old['peak_memory']} -> {record['peak_memory']}"
+            )
+
+        for counter in _counters:
+            if increased(record.get(counter), old.get(counter), counter_tolerance):
+                regressions.append(
+                    f"{name}: {counter} {old[counter]} -> {record[counter]}"
+                )
+
+        if increased(record.get("error"), old.get("error"), error_factor - 1):
+            regressions.append(
+                f"{name}: error {old['error']:0.3e} -> {record['error']:0.3e}"
+            )
+
+    return regressions
+
+
+# modules that must not be loaded by importing the solvers; scipy.sparse.linalg
+# is not listed, since importing scipy.linalg already loads it
+heavy_modules = [
+    "matplotlib",
+    "tqdm",
+    "scipy.optimize",
+    "scipy.integrate",
+]
+
+import_statements = [
+    "import dae4py",
+    "from dae4py.radau import solve_dae_radau",
+    "from dae4py.radau import solve_dae_radau_ensemble",
+    "from dae4py.bdf import solve_dae_BDF",
+    "from dae4py.bdf import solve_dae_BDF_adaptive",
+    "from dae4py.irk import solve_dae_IRK",
+    "from dae4py.fortran import dassl, pside, radau, radau5",
+    "from dae4py.fortran import daskr, daspk",
+]
+
+
+def _import_run(statement):
+    import sys
+    import subprocess
+
+    # -X importtime reports "self [us] | cumulative [us] | module" on stderr
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    modules = []
+    import_time = 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, module = line[len("import time:") :].split("|")
+        import_time += float(self_time) * 1e-6
+        modules.append(module.strip())
+    return process.returncode == 0, import_time, modules, process.stderr
+
+
+def import_time(statements=None, repeat=5):
+    """
+    Measure the import time of dae4py in fresh interpreters and check that
+    no heavy modules (see `heavy_modules`) are loaded.
+
+    Parameters
+    ----------
+    statements: list or None, default: None
+        Import statements. If None, `import_statements` are measured.
+    repeat: int, default: 5
+        Number of fresh interpreters per statement. The minimum import time
+        is reported.
+
+    Returns
+    -------
+    records: list
+        One dictionary per statement with the statement, success, the
+        import time in seconds and the loaded heavy modules.
+    """
+    if statements is None:
+        statements = import_statements
+
+    records = []
+    for statement in statements:
+        times = []
+        for _ in range(repeat):
+            success, import_time, modules, message = _import_run(statement)
+            if not success:
+                break
+            times.append(import_time)
+
+        record = dict(statement=statement, success=success)
+        if success:
+            record["import_time"] = min(times)
+            record["heavy_modules"] = [
+                module for module in heavy_modules if module in modules
+            ]
+        else:
+            record["message"] = message.strip().splitlines()[-1]
+        records.append(record)
+
+    return records
+
+
+def compare_import_time(records, baseline=None, time_tolerance=0.25, min_time=1e-2):
+    """
+    Check the import time records for heavy modules and compare them with a
+    baseline. Statements are matched by their text.
+
+    Parameters
+    ----------
+    records: list
+        Current records of `import_time`.
+    baseline: list or None, default: None
+        Records of the baseline.
+    time_tolerance: float, default: 0.25
+        Allowed relative increase of the import time.
+    min_time: float, default: 1e-2
+        Import times below this value in seconds are not compared.
+
+    Returns
+    -------
+    regressions: list
+        Descriptions of all detected regressions.
+    """
+    baseline = {record["statement"]: record for record in baseline or []}
+
+    regressions = []
+    for record in records:
+        name = record["statement"]
+        old = baseline.get(name, {})
+        if not record["success"]:
+            if old.get("success", True):
+                regressions.append(f"{name}: import failed ({record['message']})")
+            continue
+
+        if record["heavy_modules"]:
+            regressions.append(f"{name}: loads {', '.join(record['heavy_modules'])}")
+
+        new_value, old_value = record["import_time"], old.get("import_time")
+        if (
+            old_value is not None
+            and new_value > min_time
+            and new_value > (1 + time_tolerance) * old_value
+        ):
+            regressions.append(
+                f"{name}: import_time {old_value:0.3e}s -> {new_value:0.3e}s"
+            )
 
-    return errors, rates
+    return regressions
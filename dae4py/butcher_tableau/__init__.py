@@ -1,2 +1,9 @@
-from .gauss_legendre_butcher_tableau import gauss_legendre_tableau
-from .radau_butcher_tableau import radau_tableau
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "gauss_legendre_butcher_tableau": ["gauss_legendre_tableau"],
+        "radau_butcher_tableau": ["radau_tableau"],
+    },
+)
@@ -1,10 +1,13 @@
 import numpy as np
+from functools import lru_cache
 from scipy._lib._util import _RichResult
 
 
+@lru_cache(maxsize=None)
 def gauss_legendre_tableau(s):
     """
-    Evaluate the Butcher tableau for the s-stage Gauss-Legendre method.
+    Evaluate the Butcher tableau for the s-stage Gauss-Legendre method. The
+    tableau is cached, hence its arrays are read-only.
 
     Parameters
     ----------
@@ -41,4 +44,8 @@ def gauss_legendre_tableau(s):
     p = 2 * s
     q = s
 
+    # the cached arrays are shared by all callers
+    for array in (A, b, c):
+        array.setflags(write=False)
+
     return _RichResult(A=A, b=b, c=c, p=p, q=q, s=s)
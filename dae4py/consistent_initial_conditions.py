@@ -1,7 +1,13 @@
 import numpy as np
 from scipy.linalg import qr, solve_triangular
-from scipy.integrate._ivp.common import norm, EPS
-from scipy.optimize._numdiff import approx_derivative
+from scipy.sparse import issparse
+from dae4py.math import DAEJacobian
+from dae4py.math.jacobian import EPS
+
+
+def norm(x):
+    """Root mean square norm."""
+    return np.linalg.norm(x) / x.size**0.5
 
 
 def consistent_initial_conditions(
@@ -18,23 +24,25 @@ def consistent_initial_conditions(
     chord_iter=3,
     safety=0.5,
     *args,
+    jac_sparsity=None,
 ):
     """Compute consistent initial conditions for DAE problem."""
     n = len(y0)
 
     if jac is None:
+        if isinstance(jac_sparsity, DAEJacobian):
+            fd_jac = jac_sparsity
+        else:
+            fd_jac = DAEJacobian(jac_sparsity)
 
         def jac(t, y, yp):
-            n = len(y)
-            z = np.concatenate((y, yp))
-
-            def fun_composite(t, z):
-                y, yp = z[:n], z[n:]
-                return F(t, y, yp)
+            Jy, Jyp = fd_jac(lambda t, y, yp: F(t, y, yp, *args), t, y, yp)
 
-            J = approx_derivative(lambda z: fun_composite(t, z), z, method="2-point")
-            J = J.reshape((n, 2 * n))
-            Jy, Jyp = J[:, :n], J[:, n:]
+            # the rank revealing QR-decompositions below require dense matrices
+            if issparse(Jy):
+                Jy = Jy.toarray()
+            if issparse(Jyp):
+                Jyp = Jyp.toarray()
             return Jy, Jyp
 
     if fixed_y0 is None:
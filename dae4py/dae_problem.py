@@ -1,4 +1,6 @@
 import numpy as np
+from functools import cached_property
+from dae4py.math import DAEJacobian
 
 
 class DAEProblem:
@@ -13,6 +15,8 @@ class DAEProblem:
         true_sol=None,
         jac=None,
         parameters=None,
+        jac_sparsity=None,
+        vectorized=False,
     ):
         """
         Class representing a Differential-Algebraic Equation (DAE) problem.
@@ -44,6 +48,14 @@ class DAEProblem:
             `y` and `yp`.
         parameters: dict, optional, default: {}
             A dictionary of additional parameters required for the system.
+        jac_sparsity: array-like, sparse matrix or tuple, optional, default: None
+            Sparsity structure of the partial derivatives with respect to `y`
+            and `yp`, either as a single (m, m) structure or as a tuple
+            (sparsity_y, sparsity_yp).
+        vectorized: bool, optional, default: False
+            Whether `F` can be called as F(T, Y, Yp) with arrays T of shape
+            (k,) and Y, Yp of shape (k, m), returning an array of shape
+            (k, m).
         """
         self.name = name
         self.F = F
@@ -62,4 +74,16 @@ class DAEProblem:
             self.yp0 = np.array(yp0)
         self.true_sol = true_sol
         self.jac = jac
+        self.jac_sparsity = jac_sparsity
+        self.vectorized = vectorized
         self.parameters = parameters if parameters else {}
+
+    @cached_property
+    def fd_jacobian(self):
+        """
+        Finite difference approximation of the partial derivatives with
+        respect to `y` and `yp`. The column grouping of `jac_sparsity` is
+        computed only once per problem and can be passed as `jac_sparsity`
+        to all solvers.
+        """
+        return DAEJacobian(self.jac_sparsity)
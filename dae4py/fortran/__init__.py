@@ -0,0 +1,12 @@
+from .._lazy import attach
+
+# DASKR and DASPK are separate extension modules, since they share
+# subroutine names with ddassl.f
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "_fortran": ["dassl", "pside", "radau", "radau5"],
+        "_daskr": ["daskr"],
+        "_daspk": ["daspk"],
+    },
+)
@@ -0,0 +1,177 @@
+#ifndef DAE4PY_BUFFER_H
+#define DAE4PY_BUFFER_H
+
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+
+#define DAE_BUFFER_CAPACITY 64
+#define DAE_BUFFER_CAPSULE "dae4py.buffer"
+
+// Growable contiguous storage of rows with a fixed number of items. The
+// capacity is doubled whenever it is exhausted, so that appending is
+// amortized O(1). Only every `every`-th offered row is kept (or only the
+// last one), but the most recently offered row is always kept when the
+// buffer is converted into a NumPy array.
+//
+// Apart from dae_buffer_to_array, none of the functions use the Python C
+// API, so they can be called without holding the GIL.
+typedef struct _dae_buffer {
+    char *data;
+    npy_intp width;    // number of items per row
+    npy_intp itemsize; // size of a single item in bytes
+    npy_intp size;     // number of kept rows
+    npy_intp capacity; // number of allocated rows
+    npy_intp count;    // number of offered rows
+    npy_intp every;    // keep every `every`-th offered row
+    int last_only;     // keep only the last offered row
+    int pending;       // last offered row is stored at index size but not kept yet
+    int typenum;
+} dae_buffer;
+
+// Allocate memory for `capacity` rows, returns -1 if allocation failed.
+static int dae_buffer_init(dae_buffer *buffer, npy_intp width, int typenum,
+                           npy_intp itemsize, npy_intp capacity,
+                           npy_intp every, int last_only)
+{
+    if (last_only) {
+        capacity = 1;
+    }
+    if (capacity < 1) {
+        capacity = 1;
+    }
+    buffer->width = width;
+    buffer->itemsize = itemsize;
+    buffer->typenum = typenum;
+    buffer->size = 0;
+    buffer->count = 0;
+    buffer->every = every;
+    buffer->last_only = last_only;
+    buffer->pending = 0;
+    buffer->capacity = capacity;
+    buffer->data = malloc(capacity * width * itemsize);
+    return buffer->data == NULL ? -1 : 0;
+}
+
+// Offer a new row, returns -1 if allocation failed.
+static int dae_buffer_store(dae_buffer *buffer, const void *row)
+{
+    // grow by doubling the capacity
+    if (buffer->size == buffer->capacity) {
+        npy_intp capacity = 2 * buffer->capacity;
+        char *data = realloc(buffer->data, capacity * buffer->width * buffer->itemsize);
+        if (data == NULL) {
+            return -1;
+        }
+        buffer->data = data;
+        buffer->capacity = capacity;
+    }
+
+    // the row is written to the next free slot, which is overwritten by
+    // the next offered row if it is not kept
+    npy_intp nbytes = buffer->width * buffer->itemsize;
+    memcpy(buffer->data + buffer->size * nbytes, row, nbytes);
+    if (!buffer->last_only && buffer->count % buffer->every == 0) {
+        buffer->size += 1;
+        buffer->pending = 0;
+    } else {
+        buffer->pending = 1;
+    }
+    buffer->count += 1;
+    return 0;
+}
+
+static void dae_buffer_capsule_destructor(PyObject *capsule)
+{
+    free(PyCapsule_GetPointer(capsule, DAE_BUFFER_CAPSULE));
+}
+
+// Transfer the memory of the buffer to a NumPy array of shape (size,) if
+// ndim == 1 or (size, width) if ndim == 2. The data is not copied, the
+// array owns it through a capsule as base object.
+static PyObject* dae_buffer_to_array(dae_buffer *buffer, int ndim)
+{
+    PyObject *array = NULL;
+    PyObject *capsule = NULL;
+    npy_intp dims[2];
+
+    // keep the last offered row
+    if (buffer->pending) {
+        buffer->size += 1;
+        buffer->pending = 0;
+    }
+    dims[0] = buffer->size;
+    dims[1] = buffer->width;
+
+    if (buffer->size == 0) {
+        return PyArray_SimpleNew(ndim, dims, buffer->typenum);
+    }
+
+    // release unused memory
+    if (buffer->size < buffer->capacity) {
+        char *data = realloc(buffer->data, buffer->size * buffer->width * buffer->itemsize);
+        if (data != NULL) {
+            buffer->data = data;
+            buffer->capacity = buffer->size;
+        }
+    }
+
+    array = PyArray_SimpleNewFromData(ndim, dims, buffer->typenum, buffer->data);
+    if (array == NULL) {
+        return NULL;
+    }
+    capsule = PyCapsule_New(buffer->data, DAE_BUFFER_CAPSULE, dae_buffer_capsule_destructor);
+    if (capsule == NULL) {
+        Py_DECREF(array);
+        return NULL;
+    }
+    // steals the reference to the capsule
+    if (PyArray_SetBaseObject((PyArrayObject *) array, capsule) < 0) {
+        // the memory was released together with the capsule
+        buffer->data = NULL;
+        Py_DECREF(array);
+        return NULL;
+    }
+
+    // the memory is now owned by the array
+    buffer->data = NULL;
+    buffer->size = 0;
+    buffer->capacity = 0;
+    return array;
+}
+
+// Default output points, `num` equidistant points in [start, stop].
+static PyObject* linspace(double start, double stop, int num) {
+    // check for valid number of points
+    if (num <= 0) {
+        PyErr_SetString(PyExc_ValueError, "linspace: Number of points must be greater than 0");
+        return NULL;
+    }
+
+    // calculate the step-size
+    double step = (num > 1) ? (stop - start) / (num - 1) : 0.0;
+
+    // create a NumPy array of doubles
+    npy_intp dims[1] = {num};  // dimension of the array
+    PyObject* array = PyArray_SimpleNew(1, dims, NPY_DOUBLE);  // 1D array of type double
+    if (!array) {
+        PyErr_SetString(PyExc_RuntimeError, "linspace: Failed to create NumPy array");
+        return NULL;
+    }
+
+    // Fill the array with linearly spaced values
+    double* data = (double*)PyArray_DATA((PyArrayObject*)array);
+    for (int i = 0; i < num; i++) {
+        data[i] = start + i * step;
+    }
+
+    return array;
+}
+
+static void dae_buffer_free(dae_buffer *buffer)
+{
+    free(buffer->data);
+    buffer->data = NULL;
+}
+
+#endif
@@ -0,0 +1,354 @@
+#ifndef DAE4PY_CALLBACK_H
+#define DAE4PY_CALLBACK_H
+
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+
+// Reasons for interrupting an integration, stored in the error flag of the
+// per-call parameters.
+#define DAE_ERROR_PYTHON 1 // a Python callback raised an exception
+#define DAE_ERROR_NATIVE 2 // a native callback returned a nonzero value
+#define DAE_ERROR_MEMORY 3 // storing the solution failed
+
+// Signatures of native residuals and partial derivatives
+//     F(n, t, y, yp, f[, user_data]) = 0 on success,
+// where f is either the residual or a column-major (n, n) matrix.
+#define DAE_F_SIGNATURE_DATA "int (int, double, double *, double *, double *, void *)"
+#define DAE_F_SIGNATURE "int (int, double, double *, double *, double *)"
+
+// Signatures of native iteration matrices dF/dy + cj * dF/dy'
+//     J(n, t, y, yp, cj, pd[, user_data]) = 0 on success,
+// where pd is a column-major (n, n) matrix.
+#define DAE_JAC_SIGNATURE_DATA "int (int, double, double *, double *, double, double *, void *)"
+#define DAE_JAC_SIGNATURE "int (int, double, double *, double *, double, double *)"
+
+typedef int dae_f_data_t(int n, double t, double *y, double *yp, double *f, void *user_data);
+typedef int dae_f_t(int n, double t, double *y, double *yp, double *f);
+typedef int dae_jac_data_t(int n, double t, double *y, double *yp, double cj, double *pd, void *user_data);
+typedef int dae_jac_t(int n, double t, double *y, double *yp, double cj, double *pd);
+
+// Either a Python callable or a native function pointer extracted from a
+// PyCapsule, scipy.LowLevelCallable, ctypes or cffi function pointer.
+typedef struct _dae_callback {
+    PyObject *python_function; // borrowed reference, NULL for native callbacks
+    PyObject *owner;           // keeps the native function alive
+    void *function;            // native function pointer
+    void *user_data;           // context of the capsule
+    int with_user_data;        // the native function takes user_data
+} dae_callback;
+
+// Returns a new reference to an attribute of an already imported module or
+// NULL without exception if the module has not been imported.
+static PyObject* dae_imported_attr(const char *module_name, const char *attr_name)
+{
+    PyObject *name = PyUnicode_FromString(module_name);
+    if (name == NULL) {
+        return NULL;
+    }
+    PyObject *module = PyImport_GetModule(name);
+    Py_DECREF(name);
+    if (module == NULL) {
+        return NULL;
+    }
+    PyObject *attr = PyObject_GetAttrString(module, attr_name);
+    Py_DECREF(module);
+    if (attr == NULL) {
+        PyErr_Clear();
+    }
+    return attr;
+}
+
+static int dae_isinstance(PyObject *obj, const char *module_name, const char *type_name)
+{
+    PyObject *type = dae_imported_attr(module_name, type_name);
+    if (type == NULL) {
+        return 0;
+    }
+    int status = PyObject_IsInstance(obj, type);
+    Py_DECREF(type);
+    if (status < 0) {
+        PyErr_Clear();
+        return 0;
+    }
+    return status;
+}
+
+// Returns a new reference to the capsule of a low-level callable, NULL
+// without exception if obj is a Python callable and NULL with exception if
+// the conversion failed.
+static PyObject* dae_callback_capsule(PyObject *obj)
+{
+    PyObject *llc = NULL;
+    PyObject *capsule = NULL;
+
+    if (PyCapsule_CheckExact(obj)) {
+        Py_INCREF(obj);
+        return obj;
+    }
+
+    if (dae_isinstance(obj, "scipy", "LowLevelCallable")) {
+        Py_INCREF(obj);
+        llc = obj;
+    } else if (dae_isinstance(obj, "ctypes", "_CFuncPtr")
+               || strncmp(Py_TYPE(obj)->tp_name, "_cffi_backend.", 14) == 0) {
+        // let scipy determine the signature of ctypes and cffi pointers
+        PyObject *scipy = PyImport_ImportModule("scipy");
+        if (scipy == NULL) {
+            return NULL;
+        }
+        llc = PyObject_CallMethod(scipy, "LowLevelCallable", "O", obj);
+        Py_DECREF(scipy);
+        if (llc == NULL) {
+            return NULL;
+        }
+    } else {
+        return NULL;
+    }
+
+    // the raw capsule is the first item of the LowLevelCallable tuple
+    capsule = PyTuple_GetItem(llc, 0);
+    Py_XINCREF(capsule);
+    Py_DECREF(llc);
+    return capsule;
+}
+
+// Prepare a callback, returns -1 with exception if obj is neither callable
+// nor a native function with one of the given signatures (with and without
+// user_data).
+static int dae_callback_prepare(dae_callback *callback, PyObject *obj, const char *name,
+                                const char *signature_data, const char *signature_nodata)
+{
+    callback->python_function = NULL;
+    callback->owner = NULL;
+    callback->function = NULL;
+    callback->user_data = NULL;
+    callback->with_user_data = 0;
+
+    PyObject *capsule = dae_callback_capsule(obj);
+    if (capsule == NULL) {
+        if (PyErr_Occurred()) {
+            return -1;
+        }
+        if (!PyCallable_Check(obj)) {
+            PyErr_Format(PyExc_ValueError, "`%s` must be a callable function.", name);
+            return -1;
+        }
+        callback->python_function = obj;
+        return 0;
+    }
+
+    // check the signature stored as name of the capsule
+    const char *signature = PyCapsule_GetName(capsule);
+    if (signature != NULL && strcmp(signature, signature_data) == 0) {
+        callback->with_user_data = 1;
+    } else if (signature == NULL || strcmp(signature, signature_nodata) != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "Invalid signature of low-level callable `%s`: '%s'. "
+                     "Expected '%s' or '%s'.",
+                     name, signature == NULL ? "" : signature,
+                     signature_data, signature_nodata);
+        Py_DECREF(capsule);
+        return -1;
+    }
+
+    callback->function = PyCapsule_GetPointer(capsule, signature);
+    callback->user_data = PyCapsule_GetContext(capsule);
+    if (callback->function == NULL || PyErr_Occurred()) {
+        Py_DECREF(capsule);
+        return -1;
+    }
+    callback->owner = capsule;
+    return 0;
+}
+
+static void dae_callback_release(dae_callback *callback)
+{
+    Py_CLEAR(callback->owner);
+}
+
+// Evaluate a native residual, does not require the GIL.
+static int dae_callback_native_f(dae_callback *callback, int n, double t,
+                                 double *y, double *yp, double *f)
+{
+    if (callback->with_user_data) {
+        return ((dae_f_data_t *) callback->function)(n, t, y, yp, f, callback->user_data);
+    }
+    return ((dae_f_t *) callback->function)(n, t, y, yp, f);
+}
+
+// Evaluate a native iteration matrix, does not require the GIL.
+static int dae_callback_native_jac(dae_callback *callback, int n, double t,
+                                   double *y, double *yp, double cj, double *pd)
+{
+    if (callback->with_user_data) {
+        return ((dae_jac_data_t *) callback->function)(n, t, y, yp, cj, pd, callback->user_data);
+    }
+    return ((dae_jac_t *) callback->function)(n, t, y, yp, cj, pd);
+}
+
+// Copy a dense (n, n) matrix returned by a Python callback (array-like or
+// scipy.sparse matrix) to column-major storage with leading dimension ld.
+// Returns -1 with exception on failure.
+static int dae_copy_matrix(PyObject *result, const char *name, int n, double *out, int ld)
+{
+    PyObject *dense = NULL;
+    PyArrayObject *array = NULL;
+
+    // convert sparse matrices
+    if (PyObject_HasAttrString(result, "toarray")) {
+        dense = PyObject_CallMethod(result, "toarray", NULL);
+        if (dense == NULL) {
+            return -1;
+        }
+        result = dense;
+    }
+
+    array = (PyArrayObject *) PyArray_FROM_OTF(result, NPY_DOUBLE, NPY_ARRAY_F_CONTIGUOUS | NPY_ARRAY_ALIGNED);
+    Py_XDECREF(dense);
+    if (array == NULL) {
+        return -1;
+    }
+    if (PyArray_NDIM(array) != 2 || PyArray_DIM(array, 0) != n || PyArray_DIM(array, 1) != n) {
+        PyErr_Format(PyExc_ValueError, "`%s` must return an array of shape (n, n) with n = len(y0).", name);
+        Py_DECREF(array);
+        return -1;
+    }
+
+    double *data = (double *) PyArray_DATA(array);
+    for (int j = 0; j < n; j++) {
+        memcpy(out + j * ld, data + j * n, n * sizeof(double));
+    }
+    Py_DECREF(array);
+    return 0;
+}
+
+// Copy the band -ml <= j - i <= mu of an (n, n) matrix returned by a Python
+// callback (array-like or scipy.sparse matrix) to the Fortran band storage
+// out[(offset + i - j) + j * ld]. Sparse matrices are not densified.
+// Returns -1 with exception on failure.
+static int dae_copy_band(PyObject *result, const char *name, int n, int ml, int mu,
+                         double *out, int ld, int offset)
+{
+    PyObject *shape = NULL;
+    PyObject *diagonal = NULL;
+    PyArrayObject *array = NULL;
+    int status = -1;
+
+    if (PyObject_HasAttrString(result, "toarray")) {
+        // scipy.sparse matrix, copy the diagonals
+        shape = PyObject_GetAttrString(result, "shape");
+        if (shape == NULL) {
+            return -1;
+        }
+        Py_ssize_t rows, cols;
+        if (!PyArg_ParseTuple(shape, "nn", &rows, &cols)) {
+            goto done;
+        }
+        if (rows != n || cols != n) {
+            PyErr_Format(PyExc_ValueError, "`%s` must return an array of shape (n, n) with n = len(y0).", name);
+            goto done;
+        }
+        for (int k = -ml; k <= mu; k++) {
+            diagonal = PyObject_CallMethod(result, "diagonal", "i", k);
+            if (diagonal == NULL) {
+                goto done;
+            }
+            array = (PyArrayObject *) PyArray_FROM_OTF(diagonal, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY);
+            Py_CLEAR(diagonal);
+            if (array == NULL) {
+                goto done;
+            }
+            double *data = (double *) PyArray_DATA(array);
+            npy_intp len = PyArray_SIZE(array);
+            for (npy_intp p = 0; p < len; p++) {
+                // element (i, j) with j - i = k
+                npy_intp j = k >= 0 ? p + k : p;
+                out[offset - k + j * ld] = data[p];
+            }
+            Py_CLEAR(array);
+        }
+        status = 0;
+    } else {
+        array = (PyArrayObject *) PyArray_FROM_OTF(result, NPY_DOUBLE, NPY_ARRAY_F_CONTIGUOUS | NPY_ARRAY_ALIGNED);
+        if (array == NULL) {
+            return -1;
+        }
+        if (PyArray_NDIM(array) != 2 || PyArray_DIM(array, 0) != n || PyArray_DIM(array, 1) != n) {
+            PyErr_Format(PyExc_ValueError, "`%s` must return an array of shape (n, n) with n = len(y0).", name);
+            goto done;
+        }
+        double *data = (double *) PyArray_DATA(array);
+        for (int j = 0; j < n; j++) {
+            int i0 = j - mu > 0 ? j - mu : 0;
+            int i1 = j + ml < n - 1 ? j + ml : n - 1;
+            for (int i = i0; i <= i1; i++) {
+                out[(offset + i - j) + j * ld] = data[i + j * n];
+            }
+        }
+        status = 0;
+    }
+
+    done:
+        Py_XDECREF(shape);
+        Py_XDECREF(diagonal);
+        Py_XDECREF(array);
+        return status;
+}
+
+// Converter for lower and upper bandwidths, None is mapped to -1.
+static int dae_bandwidth_converter(PyObject *obj, void *out)
+{
+    if (obj == Py_None) {
+        *(int *) out = -1;
+        return 1;
+    }
+    long value = PyLong_AsLong(obj);
+    if (value == -1 && PyErr_Occurred()) {
+        return 0;
+    }
+    if (value < 0) {
+        PyErr_SetString(PyExc_ValueError, "`lband` and `uband` must be non-negative integers or None.");
+        return 0;
+    }
+    *(int *) out = (int) value;
+    return 1;
+}
+
+// Complete the bandwidths as in scipy's LSODA: if only one of them is
+// given, the other one is zero. Returns 1 for banded, 0 for full matrices
+// and -1 with exception for invalid bandwidths.
+static int dae_bandwidth_check(int *ml, int *mu, int n)
+{
+    if (*ml < 0 && *mu < 0) {
+        return 0;
+    }
+    if (*ml < 0) {
+        *ml = 0;
+    }
+    if (*mu < 0) {
+        *mu = 0;
+    }
+    if (*ml >= n || *mu >= n) {
+        PyErr_SetString(PyExc_ValueError, "`lband` and `uband` must be smaller than len(y0).");
+        return -1;
+    }
+    return 1;
+}
+
+// Set the exception corresponding to an error flag if no exception is set.
+static void dae_set_error(int error)
+{
+    if (PyErr_Occurred()) {
+        return;
+    }
+    if (error == DAE_ERROR_NATIVE) {
+        PyErr_SetString(PyExc_RuntimeError, "A low-level callable returned an error.");
+    } else if (error == DAE_ERROR_MEMORY) {
+        PyErr_NoMemory();
+    } else {
+        PyErr_SetString(PyExc_RuntimeError, "Integration was interrupted.");
+    }
+}
+
+#endif
@@ -0,0 +1,1034 @@
+#include <Python.h>
+#include <pythread.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+#include "../buffer.h"
+#include "../callback.h"
+
+#ifdef HAVE_BLAS_ILP64
+#define F_INT npy_int64
+#define F_INT_NPY NPY_INT64
+#else
+#define F_INT int
+#define F_INT_NPY NPY_INT
+#endif
+
+// Per-call context that is passed to the callbacks through rpar.
+typedef struct _daskr_params {
+    dae_callback f;
+    dae_callback J;
+    dae_callback psetup;
+    dae_callback psolve;
+    PyObject *events; // tuple of event functions
+    int neqn;
+    int ml; // lower bandwidth, -1 for full matrices
+    int mu; // upper bandwidth
+    int error; // reason for interrupting the integration (DAE_ERROR_*)
+    int nfev; // number of residual evaluations, including finite differences
+} daskr_params;
+
+// DDASKR keeps data of the current problem (e.g. LID and NONNEG) and of the
+// root finding in SAVE variables, which are reused by the continuation
+// calls. Hence integrations of different threads are serialized and nested
+// calls are rejected.
+static PyThread_type_lock daskr_lock = NULL;
+static unsigned long daskr_lock_owner = 0;
+
+#if defined(UPPERCASE_FORTRAN)
+    #if defined(NO_APPEND_FORTRAN)
+        /* nothing to do here */
+    #else
+        #define DDASKR  DDASKR_
+    #endif
+#else
+    #if defined(NO_APPEND_FORTRAN)
+        #define DDASKR  ddaskr
+    #else
+        #define DDASKR  ddaskr_
+    #endif
+#endif
+
+typedef void daskr_f_t(double *t, double *y, double *yp, double *cj,
+                       double *f, F_INT *ires,
+                       double *rpar, F_INT *ipar);
+// direct methods, INFO(12) = 0
+typedef void daskr_jac_t(double *t, double *y, double *yp,
+                         double *pd, double *cj,
+                         double *rpar, F_INT *ipar);
+// Krylov method, INFO(12) = 1
+typedef void daskr_psetup_t(daskr_f_t *res, F_INT *ires, F_INT *neq,
+                            double *t, double *y, double *yp,
+                            double *rewt, double *savr, double *wk,
+                            double *h, double *cj, double *wp, F_INT *iwp,
+                            F_INT *ier, double *rpar, F_INT *ipar);
+typedef void daskr_psol_t(F_INT *neq, double *t, double *y, double *yp,
+                          double *savr, double *wk, double *cj, double *wght,
+                          double *wp, F_INT *iwp, double *b, double *eplin,
+                          F_INT *ier, double *rpar, F_INT *ipar);
+typedef void daskr_rt_t(F_INT *neq, double *t, double *y, double *yp,
+                        F_INT *nrt, double *rval,
+                        double *rpar, F_INT *ipar);
+
+// JAC is either a daskr_jac_t or a daskr_psetup_t depending on INFO(12)
+void DDASKR(daskr_f_t *res, F_INT *neq, double *t,
+            double *y, double *yp, double *tout,
+            F_INT *info, double *rtol, double *atol,
+            F_INT *idid, double *rwork, F_INT *lrw,
+            F_INT *iwork, F_INT *liw, double *rpar,
+            F_INT *ipar, void *jac, daskr_psol_t *psol,
+            daskr_rt_t *rt, F_INT *nrt, F_INT *jroot);
+
+void daskr_f(double *t, double *y, double *yp, double *cj,
+             double *f, F_INT *ires,
+             double *rpar, F_INT *ipar)
+{
+    daskr_params *params = (daskr_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+    PyArrayObject *result_array = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // a previous callback failed, return control to the calling program
+    if (params->error) {
+        *ires = -2;
+        return;
+    }
+    params->nfev += 1;
+
+    // native residuals are evaluated without the GIL
+    if (params->f.function != NULL) {
+        if (dae_callback_native_f(&params->f, params->neqn, *t, y, yp, f) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ires = -2;
+        }
+        return;
+    }
+
+    // the GIL is released during the integration
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOO",
+        *t,
+        y_obj,
+        yp_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function. */
+    result = PyObject_CallObject(params->f.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+
+    /* Build numpy array from result and copy to f. */
+    result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
+    if (result_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != params->neqn) {
+        PyErr_SetString(PyExc_ValueError, "`f` must return an array of the same size as y0.");
+        goto fail;
+    }
+
+    /* Copy data from the result array to your C array */
+    memcpy(f, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ires = -2;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// pd = dF/dy + cj * dF/dy'
+void daskr_jac(double *t, double *y, double *yp,
+               double *pd, double *cj,
+               double *rpar, F_INT *ipar)
+{
+    daskr_params *params = (daskr_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // pd is set to zero by DDASKR, the next residual call interrupts the
+    // integration if a previous callback failed
+    if (params->error) {
+        return;
+    }
+
+    // native Jacobians are evaluated without the GIL
+    if (params->J.function != NULL) {
+        if (dae_callback_native_jac(&params->J, params->neqn, *t, y, yp, *cj, pd) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOd",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function and copy the result to pd. */
+    result = PyObject_CallObject(params->J.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    if (params->ml < 0) {
+        if (dae_copy_matrix(result, "J", params->neqn, pd, params->neqn) < 0) {
+            goto fail;
+        }
+    } else {
+        // PD(i - j + ML + MU + 1, j) with leading dimension 2 * ML + MU + 1
+        if (dae_copy_band(result, "J", params->neqn, params->ml, params->mu,
+                          pd, 2 * params->ml + params->mu + 1, params->ml + params->mu) < 0) {
+            goto fail;
+        }
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Prepare the preconditioner P ~ dF/dy + cj * dF/dy' by calling
+// psetup(t, y, yp, cj). Native callbacks additionally get the current
+// residual savr as last argument.
+void daskr_psetup(daskr_f_t *res, F_INT *ires, F_INT *neq,
+                  double *t, double *y, double *yp,
+                  double *rewt, double *savr, double *wk,
+                  double *h, double *cj, double *wp, F_INT *iwp,
+                  F_INT *ier, double *rpar, F_INT *ipar)
+{
+    daskr_params *params = (daskr_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // the next residual call interrupts the integration
+    if (params->error) {
+        *ier = 1;
+        return;
+    }
+
+    // native callbacks are evaluated without the GIL
+    if (params->psetup.function != NULL) {
+        if (dae_callback_native_jac(&params->psetup, params->neqn, *t, y, yp, *cj, savr) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ier = 1;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOd",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function, its return value is ignored. */
+    result = PyObject_CallObject(params->psetup.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ier = 1;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Solve P x = b, where b is overwritten by x. Without psolve, P is the
+// identity, i.e., GMRES is applied to the unpreconditioned system.
+void daskr_psol(F_INT *neq, double *t, double *y, double *yp,
+                double *savr, double *wk, double *cj, double *wght,
+                double *wp, F_INT *iwp, double *b, double *eplin,
+                F_INT *ier, double *rpar, F_INT *ipar)
+{
+    daskr_params *params = (daskr_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *b_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+    PyArrayObject *result_array = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // unrecoverable error, control is returned to the calling program
+    if (params->error) {
+        *ier = -1;
+        return;
+    }
+
+    if (params->psolve.function == NULL && params->psolve.python_function == NULL) {
+        return;
+    }
+
+    // native callbacks are evaluated without the GIL
+    if (params->psolve.function != NULL) {
+        if (dae_callback_native_jac(&params->psolve, params->neqn, *t, y, yp, *cj, b) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ier = -1;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y, yp and b. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+    b_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, b);
+    if (b_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOdO",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj,
+        b_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function. */
+    result = PyObject_CallObject(params->psolve.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+
+    /* Build numpy array from result and copy to b. */
+    result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
+    if (result_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != params->neqn) {
+        PyErr_SetString(PyExc_ValueError, "`psolve` must return an array of the same size as y0.");
+        goto fail;
+    }
+    memmove(b, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ier = -1;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(b_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// After a failed callback, the event functions are set to a nonzero
+// constant, such that DDASKR neither reports a root nor complains about an
+// ill-defined R, and the next residual call stops the integration.
+static void daskr_rt_disable(F_INT nrt, double *rval)
+{
+    for (F_INT i = 0; i < nrt; i++) {
+        rval[i] = 1.0;
+    }
+}
+
+// rval[i] = events[i](t, y, yp), whose roots are located by DDASKR
+void daskr_rt(F_INT *neq, double *t, double *y, double *yp,
+              F_INT *nrt, double *rval,
+              double *rpar, F_INT *ipar)
+{
+    daskr_params *params = (daskr_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // the integration is interrupted after this call
+    if (params->error) {
+        daskr_rt_disable(*nrt, rval);
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOO",
+        *t,
+        y_obj,
+        yp_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call all event functions. */
+    for (int i = 0; i < (*nrt); i++) {
+        result = PyObject_CallObject(PyTuple_GET_ITEM(params->events, i), arglist);
+        if (result == NULL) {
+            goto fail;
+        }
+        rval[i] = PyFloat_AsDouble(result);
+        Py_CLEAR(result);
+        if (rval[i] == -1.0 && PyErr_Occurred()) {
+            goto fail;
+        }
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        daskr_rt_disable(*nrt, rval);
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Prepare the event functions, i.e., a single callable or a sequence of
+// callables with the optional attributes `terminal` (bool) and `direction`
+// (float) as in scipy.integrate.solve_ivp. Returns -1 with exception on
+// failure, directions and terminal have to be freed.
+static int daskr_events_prepare(daskr_params *params, PyObject *events_obj,
+                                int *nrt, double **directions, int **terminal)
+{
+    if (PyCallable_Check(events_obj)) {
+        params->events = PyTuple_Pack(1, events_obj);
+    } else {
+        params->events = PySequence_Tuple(events_obj);
+    }
+    if (params->events == NULL) {
+        PyErr_SetString(PyExc_TypeError, "`events` must be a callable or a sequence of callables.");
+        return -1;
+    }
+    *nrt = (int) PyTuple_GET_SIZE(params->events);
+
+    *directions = calloc(*nrt > 0 ? *nrt : 1, sizeof(double));
+    *terminal = calloc(*nrt > 0 ? *nrt : 1, sizeof(int));
+    if (*directions == NULL || *terminal == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    for (int i = 0; i < (*nrt); i++) {
+        PyObject *event = PyTuple_GET_ITEM(params->events, i);
+        if (!PyCallable_Check(event)) {
+            PyErr_SetString(PyExc_TypeError, "`events` must be a callable or a sequence of callables.");
+            return -1;
+        }
+        PyObject *attr = PyObject_GetAttrString(event, "direction");
+        if (attr == NULL) {
+            PyErr_Clear();
+        } else {
+            (*directions)[i] = PyFloat_AsDouble(attr);
+            Py_DECREF(attr);
+            if (PyErr_Occurred()) {
+                return -1;
+            }
+        }
+        attr = PyObject_GetAttrString(event, "terminal");
+        if (attr == NULL) {
+            PyErr_Clear();
+        } else {
+            (*terminal)[i] = PyObject_IsTrue(attr);
+            Py_DECREF(attr);
+            if ((*terminal)[i] < 0) {
+                return -1;
+            }
+        }
+    }
+    return 0;
+}
+
+// store the state at a root of the i-th event function, returns -1 if
+// allocation failed
+static int daskr_store_event(dae_buffer *t_events, dae_buffer *y_events,
+                             dae_buffer *yp_events, int i,
+                             double t, double *y, double *yp) {
+    if (dae_buffer_store(&t_events[i], &t) < 0
+        || dae_buffer_store(&y_events[i], y) < 0
+        || dae_buffer_store(&yp_events[i], yp) < 0) {
+        return -1;
+    }
+    return 0;
+}
+
+// store the current state, returns -1 if allocation failed
+static int daskr_store(dae_buffer *order_sol, dae_buffer *t_sol,
+                       dae_buffer *y_sol, dae_buffer *yp_sol,
+                       long order, double t, double *y, double *yp) {
+    if (dae_buffer_store(order_sol, &order) < 0
+        || dae_buffer_store(t_sol, &t) < 0
+        || dae_buffer_store(y_sol, y) < 0
+        || dae_buffer_store(yp_sol, yp) < 0) {
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject* daskr(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    PyObject *f_obj = NULL;
+    PyObject *J_obj = Py_None;
+    PyObject *psetup_obj = Py_None;
+    PyObject *psolve_obj = Py_None;
+    PyObject *events_obj = Py_None;
+    PyObject *t_span_obj = NULL;
+    PyObject *t_eval_obj = Py_None;
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *events_result = NULL;
+    PyArrayObject *t_eval_array = NULL;
+    PyArrayObject *y_array = NULL;
+    PyArrayObject *yp_array = NULL;
+
+    double rtol = 1.0e-6;
+    double atol = 1.0e-3;
+    double t, t1;
+    double *t_eval_ptr, *y, *yp;
+
+    int nt_eval;
+    int success = 1;
+    int locked = 0;
+
+    int neqn;
+    int ml = -1;
+    int mu = -1;
+    int banded;
+    int krylov = 0;
+    int maxl = 0;
+    int ninfo = 20;
+    int nrt = 0;
+    int *jroot = NULL;
+    double *directions = NULL; // only sign changes in this direction are events
+    int *terminal = NULL; // events that stop the integration
+    int terminated = 0;
+    void *jac;
+
+    int lrwork;
+    int liwork;
+    double *rwork = NULL;
+    int *iwork = NULL;
+    int *info = NULL;
+
+    // solution storage
+    Py_ssize_t store_every = 1;
+    int store_last_only = 0;
+    dae_buffer order_sol = {NULL};
+    dae_buffer t_sol = {NULL};
+    dae_buffer y_sol = {NULL};
+    dae_buffer yp_sol = {NULL};
+    dae_buffer *t_events = NULL;
+    dae_buffer *y_events = NULL;
+    dae_buffer *yp_events = NULL;
+    npy_intp capacity;
+
+    daskr_params params = {{NULL}, {NULL}, {NULL}, {NULL}, NULL, 0};
+    double *rpar = (double *) &params;
+    int *ipar = NULL;
+    int idid = 0;
+
+    // parse inputs
+    static char *kwlist[] = {"f", "t_span", "y0", "yp0", // mandatory arguments
+                             "rtol", "atol", "J", "t_eval", // optional arguments
+                             "lband", "uband", // bandwidths
+                             "krylov", "psetup", "psolve", "maxl", // Krylov method
+                             "events", // root finding
+                             "store_every", "store_last_only", NULL}; // storage options and NULL termination
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOOO&O&pOOiOnp", kwlist,
+                                     &f_obj, &t_span_obj, &y_obj, &yp_obj, // positional arguments
+                                     &rtol, &atol, &J_obj, &t_eval_obj, // optional arguments
+                                     dae_bandwidth_converter, &ml, dae_bandwidth_converter, &mu, // bandwidths
+                                     &krylov, &psetup_obj, &psolve_obj, &maxl, // Krylov method
+                                     &events_obj, // root finding
+                                     &store_every, &store_last_only)) // storage options
+        return NULL;
+
+    if (store_every < 1) {
+        PyErr_SetString(PyExc_ValueError, "`store_every` must be a positive integer.");
+        goto fail;
+    }
+
+    // the iteration matrix is only formed by the direct methods, whereas
+    // the preconditioner is only used by the Krylov method
+    if (krylov && (J_obj != Py_None || ml >= 0 || mu >= 0)) {
+        PyErr_SetString(PyExc_ValueError, "`J`, `lband` and `uband` are not used by the Krylov method.");
+        goto fail;
+    }
+    if (!krylov && (psetup_obj != Py_None || psolve_obj != Py_None || maxl != 0)) {
+        PyErr_SetString(PyExc_ValueError, "`psetup`, `psolve` and `maxl` require `krylov=True`.");
+        goto fail;
+    }
+
+    // check if function (Python or native) and Jacobians (if present) are callable
+    if (dae_callback_prepare(&params.f, f_obj, "f", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+        goto fail;
+    }
+    if (J_obj != Py_None) {
+        if (dae_callback_prepare(&params.J, J_obj, "J", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+    if (psetup_obj != Py_None) {
+        if (dae_callback_prepare(&params.psetup, psetup_obj, "psetup", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+    if (psolve_obj != Py_None) {
+        if (dae_callback_prepare(&params.psolve, psolve_obj, "psolve", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+
+    // event functions
+    if (events_obj != Py_None) {
+        if (daskr_events_prepare(&params, events_obj, &nrt, &directions, &terminal) < 0) {
+            goto fail;
+        }
+    }
+
+    // unpack t_span tuple
+    if (!PyArg_ParseTuple(t_span_obj, "dd", &t, &t1)) {
+        goto fail;
+    }
+    if (!(t1 > t)) {
+        PyErr_SetString(PyExc_ValueError, "`t1` must larger than `t0`.");
+        goto fail;
+    }
+
+    // check if t_eval is present, otherwise create array with 500 linear spaced points
+    if (t_eval_obj == Py_None) {
+        t_eval_array = (PyArrayObject *) linspace(t, t1, 500);
+    } else {
+        t_eval_array = (PyArrayObject *) PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 0, 0);
+    }
+    if (t_eval_array == NULL) {
+        goto fail;
+    }
+    t_eval_ptr = (double *) PyArray_DATA(t_eval_array);
+    nt_eval = PyArray_Size((PyObject *) t_eval_array);
+
+    // initial conditions (copied, since they are overwritten during integration)
+    y_array = (PyArrayObject *) PyArray_FROM_OTF(y_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
+    if (y_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_NDIM(y_array) > 1) {
+        PyErr_SetString(PyExc_ValueError, "Initial condition y0 must be one-dimensional.");
+        goto fail;
+    }
+    y = (double *) PyArray_DATA(y_array);
+    neqn = PyArray_Size((PyObject *) y_array);
+
+    yp_array = (PyArrayObject *) PyArray_FROM_OTF(yp_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
+    if (yp_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_NDIM(yp_array) > 1) {
+        PyErr_SetString(PyExc_ValueError, "Initial condition yp0 must be one-dimensional.");
+        goto fail;
+    }
+    yp = (double *) PyArray_DATA(yp_array);
+    if (!(neqn == PyArray_Size((PyObject *) yp_array))) {
+        PyErr_SetString(PyExc_ValueError, "Size of y0 and yp0 have to coincide.");
+        goto fail;
+    }
+
+    // full or banded iteration matrix
+    banded = dae_bandwidth_check(&ml, &mu, neqn);
+    if (banded < 0) {
+        goto fail;
+    }
+
+    // maximum dimension of the Krylov subspace, MAXL = min(5, NEQ) by default
+    if (maxl < 0 || maxl > neqn) {
+        PyErr_SetString(PyExc_ValueError, "`maxl` must be a positive integer not larger than len(y0).");
+        goto fail;
+    }
+    if (maxl == 0) {
+        maxl = neqn < 5 ? neqn : 5;
+    }
+
+    // initialize iwork and rwork for MAXORD = 5
+    if (krylov) {
+        // complete GMRES (KMP = MAXL) without work space for the preconditioner
+        lrwork = 60 + (5 + 5) * neqn + (maxl + 3) * neqn + (maxl + 3) * maxl + 1 + 3 * nrt;
+        liwork = 40;
+    } else if (banded) {
+        lrwork = 60 + (5 + 4) * neqn + (2 * ml + mu + 1) * neqn + 2 * (neqn / (ml + mu + 1) + 1) + 3 * nrt;
+        liwork = 40 + neqn;
+    } else {
+        lrwork = 60 + (5 + 4) * neqn + pow(neqn, 2) + 3 * nrt;
+        liwork = 40 + neqn;
+    }
+
+    rwork = calloc(lrwork, sizeof(double));
+    iwork = calloc(liwork, sizeof(int));
+    jroot = calloc(nrt > 0 ? nrt : 1, sizeof(int));
+
+    // initialize info
+    info = calloc(ninfo, sizeof(int));
+    if (rwork == NULL || iwork == NULL || jroot == NULL || info == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // get intermediate results
+    info[2] = 1;
+    // compute solution until t == t1
+    info[3] = 1;
+    rwork[0] = t1;
+    if (krylov) {
+        // preconditioned GMRES
+        info[11] = 1;
+        // MAXL, KMP = MAXL, NRMAX = 5 and EPLI = 0.05
+        info[12] = 1;
+        iwork[23] = maxl;
+        iwork[24] = maxl;
+        iwork[25] = 5;
+        rwork[9] = 0.05;
+        // psetup is called through JAC
+        info[14] = psetup_obj != Py_None;
+        jac = (void *) daskr_psetup;
+    } else {
+        // user-defined or numerical jacobian
+        info[4] = J_obj != Py_None;
+        // banded iteration matrix with bandwidths IWORK(1) and IWORK(2)
+        if (banded) {
+            info[5] = 1;
+            iwork[0] = ml;
+            iwork[1] = mu;
+        }
+        jac = (void *) daskr_jac;
+    }
+
+    // set parameters of this call
+    params.neqn = neqn;
+    params.ml = banded ? ml : -1;
+    params.mu = banded ? mu : -1;
+
+    // the number of stored states is known in advance from t_eval
+    capacity = (nt_eval - 1) / store_every + 2;
+    if (dae_buffer_init(&order_sol, 1, NPY_LONG, sizeof(long), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&t_sol, 1, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&y_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&yp_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // states at the roots of each event function
+    if (nrt > 0) {
+        t_events = calloc(nrt, sizeof(dae_buffer));
+        y_events = calloc(nrt, sizeof(dae_buffer));
+        yp_events = calloc(nrt, sizeof(dae_buffer));
+        if (t_events == NULL || y_events == NULL || yp_events == NULL) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+        for (int k = 0; k < nrt; k++) {
+            if (dae_buffer_init(&t_events[k], 1, NPY_DOUBLE, sizeof(double), 1, 1, 0) < 0
+                || dae_buffer_init(&y_events[k], neqn, NPY_DOUBLE, sizeof(double), 1, 1, 0) < 0
+                || dae_buffer_init(&yp_events[k], neqn, NPY_DOUBLE, sizeof(double), 1, 1, 0) < 0) {
+                PyErr_NoMemory();
+                goto fail;
+            }
+        }
+    }
+
+    // start with initial values
+    if (daskr_store(&order_sol, &t_sol, &y_sol, &yp_sol, 1, t, y, yp) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // acquire the lock without holding the GIL
+    if (daskr_lock == NULL) {
+        daskr_lock = PyThread_allocate_lock();
+        if (daskr_lock == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "Failed to allocate lock.");
+            goto fail;
+        }
+    }
+    if (daskr_lock_owner == PyThread_get_thread_ident()) {
+        PyErr_SetString(PyExc_RuntimeError, "Nested calls of daskr are not supported.");
+        goto fail;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(daskr_lock, WAIT_LOCK);
+    Py_END_ALLOW_THREADS
+    daskr_lock_owner = PyThread_get_thread_ident();
+    locked = 1;
+
+    // compute all steps
+    for (int i = 1; i < nt_eval && success; i++) {
+        // call daskr solver until t = t_eval[i] is reached
+        while (t < t_eval_ptr[i]) {
+            Py_BEGIN_ALLOW_THREADS
+            DDASKR(daskr_f, &neqn, &t, y, yp,
+                &(t_eval_ptr[i]), info, &rtol, &atol, &idid,
+                rwork, &lrwork, iwork, &liwork,
+                rpar, ipar, jac, daskr_psol,
+                daskr_rt, &nrt, jroot);
+            Py_END_ALLOW_THREADS
+
+            if (params.error) {
+                break;
+            }
+            if (idid == -1) {
+                // about 500 steps were taken, continue integration
+                info[0] = 1;
+            } else if (idid == 5) {
+                // roots were found, JROOT(k) = +1 (-1) for a sign change
+                // from negative to positive (positive to negative)
+                for (int k = 0; k < nrt; k++) {
+                    if (jroot[k] == 0 || directions[k] * jroot[k] < 0) {
+                        continue;
+                    }
+                    if (daskr_store_event(t_events, y_events, yp_events, k, t, y, yp) < 0) {
+                        PyErr_NoMemory();
+                        goto fail;
+                    }
+                    terminated = terminated || terminal[k];
+                }
+                if (terminated) {
+                    break;
+                }
+            } else if (idid < 0) {
+                success = 0;
+                break;
+            }
+        }
+        if (params.error) {
+            dae_set_error(params.error);
+            goto fail;
+        }
+        if (!success) {
+            break;
+        }
+
+        // store new state
+        if (daskr_store(&order_sol, &t_sol, &y_sol, &yp_sol, iwork[7], t, y, yp) < 0) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+        if (terminated) {
+            break;
+        }
+    }
+
+    result = Py_BuildValue(
+        "{s:N,s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
+        "success", PyBool_FromLong(success),
+        "order", dae_buffer_to_array(&order_sol, 1),
+        "t", dae_buffer_to_array(&t_sol, 1),
+        "y", dae_buffer_to_array(&y_sol, 2),
+        "yp", dae_buffer_to_array(&yp_sol, 2),
+        "idid", idid, // IDID reported by the last DDASKR call
+        "nfev", params.nfev, // number of calls of f
+        "nsteps", iwork[10], // IWORK(11) total number of steps
+        "nf", iwork[11], // IWORK(12) number of function evaluations
+        "njac", iwork[12], // IWORK(13) number of jacobian (or psetup) evaluations
+        "nrejerror", iwork[13], // IWORK(14) total number of error test failures
+        "nrejnewton", iwork[14], // IWORK(15) total number of convergence test failures
+        "nrejlinear", iwork[15], // IWORK(16) number of linear convergence failures
+        "nnewton", iwork[18], // IWORK(19) number of nonlinear iterations
+        "nlinear", iwork[19], // IWORK(20) number of linear (Krylov) iterations
+        "npsolve", iwork[20] // IWORK(21) number of preconditioner solves
+    );
+    if (result == NULL) {
+        goto fail;
+    }
+
+    // t_events, y_events and yp_events are lists with an entry for each
+    // event function or None if no events are given
+    if (nrt > 0) {
+        events_result = Py_BuildValue("[NNN]", PyList_New(nrt), PyList_New(nrt), PyList_New(nrt));
+        if (events_result == NULL) {
+            Py_CLEAR(result);
+            goto fail;
+        }
+        for (int k = 0; k < nrt; k++) {
+            PyList_SET_ITEM(PyList_GET_ITEM(events_result, 0), k, dae_buffer_to_array(&t_events[k], 1));
+            PyList_SET_ITEM(PyList_GET_ITEM(events_result, 1), k, dae_buffer_to_array(&y_events[k], 2));
+            PyList_SET_ITEM(PyList_GET_ITEM(events_result, 2), k, dae_buffer_to_array(&yp_events[k], 2));
+            if (PyErr_Occurred()) {
+                Py_CLEAR(result);
+                goto fail;
+            }
+        }
+    } else {
+        events_result = Py_BuildValue("[OOO]", Py_None, Py_None, Py_None);
+        if (events_result == NULL) {
+            Py_CLEAR(result);
+            goto fail;
+        }
+    }
+    if (PyDict_SetItemString(result, "t_events", PyList_GET_ITEM(events_result, 0)) < 0
+        || PyDict_SetItemString(result, "y_events", PyList_GET_ITEM(events_result, 1)) < 0
+        || PyDict_SetItemString(result, "yp_events", PyList_GET_ITEM(events_result, 2)) < 0
+        || PyDict_SetItemString(result, "terminated", terminated ? Py_True : Py_False) < 0) {
+        Py_CLEAR(result);
+        goto fail;
+    }
+
+    // cleanup (only objects owned by this function are released)
+    fail:
+        if (locked) {
+            daskr_lock_owner = 0;
+            PyThread_release_lock(daskr_lock);
+        }
+        free(rwork);
+        free(iwork);
+        free(jroot);
+        free(info);
+        free(directions);
+        free(terminal);
+        Py_XDECREF(events_result);
+        Py_XDECREF(params.events);
+        for (int k = 0; k < nrt && t_events != NULL; k++) {
+            dae_buffer_free(&t_events[k]);
+            dae_buffer_free(&y_events[k]);
+            dae_buffer_free(&yp_events[k]);
+        }
+        free(t_events);
+        free(y_events);
+        free(yp_events);
+        dae_callback_release(&params.f);
+        dae_callback_release(&params.J);
+        dae_callback_release(&params.psetup);
+        dae_callback_release(&params.psolve);
+        Py_XDECREF(t_eval_array);
+        Py_XDECREF(y_array);
+        Py_XDECREF(yp_array);
+        dae_buffer_free(&order_sol);
+        dae_buffer_free(&t_sol);
+        dae_buffer_free(&y_sol);
+        dae_buffer_free(&yp_sol);
+        return result;
+}
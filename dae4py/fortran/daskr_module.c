@@ -0,0 +1,120 @@
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+
+#include "daskr/daskr.h"
+
+PyDoc_STRVAR(doc,
+"Function signature: daskr(f, t_span, y0, yp0, rtol=1e-6, atol=1e-3, J=None, t_eval=None, lband=None, uband=None, krylov=False, psetup=None, psolve=None, maxl=None, events=None)\n"
+"\n"
+"Solve a DAE system f(t, y, y') = 0 with the BDF methods of DASKR. The\n"
+"linear systems are solved either with a dense or banded LU-decomposition\n"
+"of the iteration matrix or with the preconditioned Krylov method GMRES,\n"
+"which only requires residual evaluations and never forms the iteration\n"
+"matrix. Roots of event functions g(t, y, y') are located by the solver\n"
+"itself without stepwise polling from Python.\n"
+"\n"
+"Parameters\n"
+"----------\n"
+"f : callable\n"
+"    A Python function that defines the DAE system. The function \n"
+"    must have the signature `f(t, y, yp)`, where `t` is the\n"
+"    current time, `y` is the state vector, and `yp` is the \n"
+"    derivative of the state vector.\n"
+"    Alternatively, a native function given as scipy.LowLevelCallable,\n"
+"    PyCapsule, ctypes or cffi function pointer (e.g. a Numba cfunc) with\n"
+"    one of the signatures\n"
+"        int f(int n, double t, double *y, double *yp, double *f, void *user_data)\n"
+"        int f(int n, double t, double *y, double *yp, double *f)\n"
+"    can be passed, which writes the residual to f and returns 0 on success.\n"
+"\n"
+"t_span : array-like\n"
+"    A 2-element list or array defining the time interval `[t_start, t_end]`\n"
+"    over which to integrate the system.\n"
+"\n"
+"y0 : array-like\n"
+"    The initial conditions for the state vector `y` at the start of the integration.\n"
+"\n"
+"yp0 : array-like\n"
+"    The initial conditions for the derivative of the state vector `yp` at the start of the integration.\n"
+"\n"
+"J: callable (optional)\n"
+"    Iteration matrix `J(t, y, yp, cj) = df/dy + cj * df/dyp` of shape (n, n)\n"
+"    for the direct methods, see dae4py.fortran.dassl. If not given, it is\n"
+"    approximated by finite differences.\n"
+"\n"
+"lband, uband: int (optional)\n"
+"    Lower and upper bandwidths of the iteration matrix for the direct methods,\n"
+"    see dae4py.fortran.dassl.\n"
+"\n"
+"krylov: bool (optional)\n"
+"    Use the preconditioned Krylov method instead of the direct methods. Default value: False.\n"
+"\n"
+"psetup: callable (optional)\n"
+"    Called as `psetup(t, y, yp, cj)` whenever the preconditioner\n"
+"    P ~ df/dy + cj * df/dyp has to be updated, e.g., to compute and factorize\n"
+"    an approximation of the iteration matrix. The return value is ignored.\n"
+"    A native function has the signature of the dassl Jacobian, where the\n"
+"    current residual is passed instead of pd.\n"
+"\n"
+"psolve: callable (optional)\n"
+"    Called as `psolve(t, y, yp, cj, b)` to solve P x = b and return x. A native\n"
+"    function has the signature of the dassl Jacobian and overwrites b with x.\n"
+"    If not given, no preconditioner is used.\n"
+"\n"
+"maxl: int (optional)\n"
+"    Maximum dimension of the Krylov subspace. Default value: min(5, len(y0)).\n"
+"\n"
+"events: callable or list of callables (optional)\n"
+"    Event functions `g(t, y, yp)` returning a float, whose roots are located\n"
+"    during the integration. As in scipy.integrate.solve_ivp, each function\n"
+"    can have the attributes\n"
+"    - terminal: bool, stop the integration at the first root. Default value: False.\n"
+"    - direction: float, only record roots where g changes from negative to\n"
+"      positive (direction > 0) or from positive to negative (direction < 0).\n"
+"      Default value: 0, i.e., both directions.\n"
+"\n"
+"rtol, atol: float (optional)\n"
+"    The used relative and absolute tolerances. Default values: rtol=1e-6, atol=1e-3.\n"
+"\n"
+"t_eval: array-like (optional)\n"
+"      The requested evaluation points. If not given, 500 equidistance points in t_span are chosen.\n"
+"\n"
+"store_every: int (optional)\n"
+"    Store only every k-th output point. The final state is always stored. Default value: 1.\n"
+"\n"
+"store_last_only: bool (optional)\n"
+"    Store only the final state. Default value: False.\n"
+"\n"
+"Returns\n"
+"-------\n"
+"result : dict\n"
+"    A dictionary containing the results of the integration. In addition to\n"
+"    the keys returned by dae4py.fortran.dassl, it contains\n"
+"    - 'nrejlinear': Number of convergence failures of the linear iteration.\n"
+"    - 'nnewton': Number of nonlinear iterations.\n"
+"    - 'nlinear': Number of linear (Krylov) iterations.\n"
+"    - 'npsolve': Number of calls of psolve.\n"
+"    - 't_events', 'y_events', 'yp_events': Lists with the times and states\n"
+"      at the roots of each event function or None if no events are given.\n"
+"    - 'terminated': True if the integration was stopped by a terminal event."
+);
+
+static PyMethodDef methods[] = {
+    {"daskr", (PyCFunction)daskr, METH_VARARGS | METH_KEYWORDS, doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    "_daskr",
+    NULL,
+    -1,
+    methods,
+};
+
+PyMODINIT_FUNC PyInit__daskr(void)
+{
+    import_array();
+    return PyModule_Create(&module);
+}
@@ -0,0 +1,928 @@
+#include <Python.h>
+#include <pythread.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+#include "../buffer.h"
+#include "../callback.h"
+
+#ifdef HAVE_BLAS_ILP64
+#define F_INT npy_int64
+#define F_INT_NPY NPY_INT64
+#else
+#define F_INT int
+#define F_INT_NPY NPY_INT
+#endif
+
+// Per-call context that is passed to the callbacks through rpar.
+typedef struct _daspk_params {
+    dae_callback f;
+    dae_callback J;
+    dae_callback psetup;
+    dae_callback psolve;
+    int neqn;
+    int ml; // lower bandwidth, -1 for full matrices
+    int mu; // upper bandwidth
+    int error; // reason for interrupting the integration (DAE_ERROR_*)
+    int nfev; // number of residual evaluations, including finite differences
+} daspk_params;
+
+// DDASPK keeps data of the current problem (e.g. LID and NONNEG) in SAVE
+// variables, which are reused by the continuation calls. Hence
+// integrations of different threads are serialized and nested calls are
+// rejected.
+static PyThread_type_lock daspk_lock = NULL;
+static unsigned long daspk_lock_owner = 0;
+
+#if defined(UPPERCASE_FORTRAN)
+    #if defined(NO_APPEND_FORTRAN)
+        /* nothing to do here */
+    #else
+        #define DDASPK  DDASPK_
+    #endif
+#else
+    #if defined(NO_APPEND_FORTRAN)
+        #define DDASPK  ddaspk
+    #else
+        #define DDASPK  ddaspk_
+    #endif
+#endif
+
+typedef void daspk_f_t(double *t, double *y, double *yp, double *cj,
+                       double *f, F_INT *ires,
+                       double *rpar, F_INT *ipar);
+// direct methods, INFO(12) = 0
+typedef void daspk_jac_t(double *t, double *y, double *yp,
+                         double *pd, double *cj,
+                         double *rpar, F_INT *ipar);
+// Krylov method, INFO(12) = 1
+typedef void daspk_psetup_t(daspk_f_t *res, F_INT *ires, F_INT *neq,
+                            double *t, double *y, double *yp,
+                            double *rewt, double *savr, double *wk,
+                            double *h, double *cj, double *wp, F_INT *iwp,
+                            F_INT *ier, double *rpar, F_INT *ipar);
+typedef void daspk_psol_t(F_INT *neq, double *t, double *y, double *yp,
+                          double *savr, double *wk, double *cj, double *wght,
+                          double *wp, F_INT *iwp, double *b, double *eplin,
+                          F_INT *ier, double *rpar, F_INT *ipar);
+
+// JAC is either a daspk_jac_t or a daspk_psetup_t depending on INFO(12)
+void DDASPK(daspk_f_t *res, F_INT *neq, double *t,
+            double *y, double *yp, double *tout,
+            F_INT *info, double *rtol, double *atol,
+            F_INT *idid, double *rwork, F_INT *lrw,
+            F_INT *iwork, F_INT *liw, double *rpar,
+            F_INT *ipar, void *jac, daspk_psol_t *psol);
+
+void daspk_f(double *t, double *y, double *yp, double *cj,
+             double *f, F_INT *ires,
+             double *rpar, F_INT *ipar)
+{
+    daspk_params *params = (daspk_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+    PyArrayObject *result_array = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // a previous callback failed, return control to the calling program
+    if (params->error) {
+        *ires = -2;
+        return;
+    }
+    params->nfev += 1;
+
+    // native residuals are evaluated without the GIL
+    if (params->f.function != NULL) {
+        if (dae_callback_native_f(&params->f, params->neqn, *t, y, yp, f) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ires = -2;
+        }
+        return;
+    }
+
+    // the GIL is released during the integration
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOO",
+        *t,
+        y_obj,
+        yp_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function. */
+    result = PyObject_CallObject(params->f.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+
+    /* Build numpy array from result and copy to f. */
+    result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
+    if (result_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != params->neqn) {
+        PyErr_SetString(PyExc_ValueError, "`f` must return an array of the same size as y0.");
+        goto fail;
+    }
+
+    /* Copy data from the result array to your C array */
+    memcpy(f, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ires = -2;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// pd = dF/dy + cj * dF/dy'
+void daspk_jac(double *t, double *y, double *yp,
+               double *pd, double *cj,
+               double *rpar, F_INT *ipar)
+{
+    daspk_params *params = (daspk_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // pd is set to zero by DDASPK, the next residual call interrupts the
+    // integration if a previous callback failed
+    if (params->error) {
+        return;
+    }
+
+    // native Jacobians are evaluated without the GIL
+    if (params->J.function != NULL) {
+        if (dae_callback_native_jac(&params->J, params->neqn, *t, y, yp, *cj, pd) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOd",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function and copy the result to pd. */
+    result = PyObject_CallObject(params->J.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    if (params->ml < 0) {
+        if (dae_copy_matrix(result, "J", params->neqn, pd, params->neqn) < 0) {
+            goto fail;
+        }
+    } else {
+        // PD(i - j + ML + MU + 1, j) with leading dimension 2 * ML + MU + 1
+        if (dae_copy_band(result, "J", params->neqn, params->ml, params->mu,
+                          pd, 2 * params->ml + params->mu + 1, params->ml + params->mu) < 0) {
+            goto fail;
+        }
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Prepare the preconditioner P ~ dF/dy + cj * dF/dy' by calling
+// psetup(t, y, yp, cj). Native callbacks additionally get the current
+// residual savr as last argument.
+void daspk_psetup(daspk_f_t *res, F_INT *ires, F_INT *neq,
+                  double *t, double *y, double *yp,
+                  double *rewt, double *savr, double *wk,
+                  double *h, double *cj, double *wp, F_INT *iwp,
+                  F_INT *ier, double *rpar, F_INT *ipar)
+{
+    daspk_params *params = (daspk_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // the next residual call interrupts the integration
+    if (params->error) {
+        *ier = 1;
+        return;
+    }
+
+    // native callbacks are evaluated without the GIL
+    if (params->psetup.function != NULL) {
+        if (dae_callback_native_jac(&params->psetup, params->neqn, *t, y, yp, *cj, savr) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ier = 1;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOd",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function, its return value is ignored. */
+    result = PyObject_CallObject(params->psetup.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ier = 1;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Solve P x = b, where b is overwritten by x. Without psolve, P is the
+// identity, i.e., GMRES is applied to the unpreconditioned system.
+void daspk_psol(F_INT *neq, double *t, double *y, double *yp,
+                double *savr, double *wk, double *cj, double *wght,
+                double *wp, F_INT *iwp, double *b, double *eplin,
+                F_INT *ier, double *rpar, F_INT *ipar)
+{
+    daspk_params *params = (daspk_params *) rpar;
+
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *b_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+    PyArrayObject *result_array = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // unrecoverable error, control is returned to the calling program
+    if (params->error) {
+        *ier = -1;
+        return;
+    }
+
+    if (params->psolve.function == NULL && params->psolve.python_function == NULL) {
+        return;
+    }
+
+    // native callbacks are evaluated without the GIL
+    if (params->psolve.function != NULL) {
+        if (dae_callback_native_jac(&params->psolve, params->neqn, *t, y, yp, *cj, b) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ier = -1;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y, yp and b. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+    b_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, b);
+    if (b_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOdO",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj,
+        b_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function. */
+    result = PyObject_CallObject(params->psolve.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+
+    /* Build numpy array from result and copy to b. */
+    result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
+    if (result_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != params->neqn) {
+        PyErr_SetString(PyExc_ValueError, "`psolve` must return an array of the same size as y0.");
+        goto fail;
+    }
+    memmove(b, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ier = -1;
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(b_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// Fill tol with a scalar or array-like tolerance of size 1 or n, returns -1
+// with exception on failure.
+static int daspk_tolerance(PyObject *tol_obj, const char *name, int n, double *tol)
+{
+    PyArrayObject *tol_array = (PyArrayObject *) PyArray_ContiguousFromObject(tol_obj, NPY_DOUBLE, 0, 1);
+    if (tol_array == NULL) {
+        return -1;
+    }
+    double *data = (double *) PyArray_DATA(tol_array);
+    npy_intp size = PyArray_Size((PyObject *) tol_array);
+    if (size == 1) {
+        for (int i = 0; i < n; i++) {
+            tol[i] = data[0];
+        }
+    } else if (size == n) {
+        memcpy(tol, data, n * sizeof(double));
+    } else {
+        PyErr_Format(PyExc_ValueError, "`%s` must be a scalar or an array of the same size as y0.", name);
+        Py_DECREF(tol_array);
+        return -1;
+    }
+    Py_DECREF(tol_array);
+    return 0;
+}
+
+// Fill icnstr with the constraints IWORK(40+i) of the initial condition
+// calculation, returns -1 with exception on failure.
+static int daspk_constraints(PyObject *constraints_obj, int n, int *icnstr)
+{
+    PyArrayObject *constraints_array = (PyArrayObject *) PyArray_FROMANY(constraints_obj, NPY_INT, 1, 1, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_FORCECAST);
+    if (constraints_array == NULL) {
+        return -1;
+    }
+    if (PyArray_Size((PyObject *) constraints_array) != n) {
+        PyErr_SetString(PyExc_ValueError, "`constraints` must be an array of the same size as y0.");
+        Py_DECREF(constraints_array);
+        return -1;
+    }
+    int *data = (int *) PyArray_DATA(constraints_array);
+    for (int i = 0; i < n; i++) {
+        if (data[i] < -2 || data[i] > 2) {
+            PyErr_SetString(PyExc_ValueError, "`constraints` must only contain the values -2, -1, 0, 1 and 2.");
+            Py_DECREF(constraints_array);
+            return -1;
+        }
+        icnstr[i] = data[i];
+    }
+    Py_DECREF(constraints_array);
+    return 0;
+}
+
+// Fill id with IWORK(LID+i) = -1 for algebraic and +1 for differential
+// components, returns -1 with exception on failure.
+static int daspk_algebraic(PyObject *algebraic_obj, int n, int *id)
+{
+    PyArrayObject *algebraic_array = (PyArrayObject *) PyArray_ContiguousFromObject(algebraic_obj, NPY_BOOL, 1, 1);
+    if (algebraic_array == NULL) {
+        return -1;
+    }
+    if (PyArray_Size((PyObject *) algebraic_array) != n) {
+        PyErr_SetString(PyExc_ValueError, "`algebraic` must be an array of the same size as y0.");
+        Py_DECREF(algebraic_array);
+        return -1;
+    }
+    npy_bool *data = (npy_bool *) PyArray_DATA(algebraic_array);
+    for (int i = 0; i < n; i++) {
+        id[i] = data[i] ? -1 : 1;
+    }
+    Py_DECREF(algebraic_array);
+    return 0;
+}
+
+// store the current state, returns -1 if allocation failed
+static int daspk_store(dae_buffer *order_sol, dae_buffer *t_sol,
+                       dae_buffer *y_sol, dae_buffer *yp_sol,
+                       long order, double t, double *y, double *yp) {
+    if (dae_buffer_store(order_sol, &order) < 0
+        || dae_buffer_store(t_sol, &t) < 0
+        || dae_buffer_store(y_sol, y) < 0
+        || dae_buffer_store(yp_sol, yp) < 0) {
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject* daspk(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    PyObject *f_obj = NULL;
+    PyObject *J_obj = Py_None;
+    PyObject *psetup_obj = Py_None;
+    PyObject *psolve_obj = Py_None;
+    PyObject *rtol_obj = NULL;
+    PyObject *atol_obj = NULL;
+    PyObject *constraints_obj = Py_None;
+    PyObject *algebraic_obj = Py_None;
+    PyObject *t_span_obj = NULL;
+    PyObject *t_eval_obj = Py_None;
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyArrayObject *t_eval_array = NULL;
+    PyArrayObject *y_array = NULL;
+    PyArrayObject *yp_array = NULL;
+
+    double *rtol = NULL;
+    double *atol = NULL;
+    double t, t1, tout;
+    double *t_eval_ptr, *y, *yp;
+
+    int nt_eval;
+    int success = 1;
+    int locked = 0;
+
+    int neqn;
+    int ml = -1;
+    int mu = -1;
+    int banded;
+    int krylov = 0;
+    int maxl = 0;
+    int nonnegative = 0;
+    int init_mode = 0;
+    int exclude_algebraic = 0;
+    int lenic, lenid;
+    int ninfo = 20;
+    void *jac;
+
+    int lrwork;
+    int liwork;
+    double *rwork = NULL;
+    int *iwork = NULL;
+    int *info = NULL;
+
+    // solution storage
+    Py_ssize_t store_every = 1;
+    int store_last_only = 0;
+    dae_buffer order_sol = {NULL};
+    dae_buffer t_sol = {NULL};
+    dae_buffer y_sol = {NULL};
+    dae_buffer yp_sol = {NULL};
+    npy_intp capacity;
+
+    daspk_params params = {{NULL}, {NULL}, {NULL}, {NULL}, 0, 0};
+    double *rpar = (double *) &params;
+    int *ipar = NULL;
+    int idid = 0;
+
+    // parse inputs
+    static char *kwlist[] = {"f", "t_span", "y0", "yp0", // mandatory arguments
+                             "rtol", "atol", "J", "t_eval", // optional arguments
+                             "lband", "uband", // bandwidths
+                             "krylov", "psetup", "psolve", "maxl", // Krylov method
+                             "constraints", "nonnegative", // inequality constraints
+                             "init_mode", "algebraic", "exclude_algebraic", // initial conditions and error test
+                             "store_every", "store_last_only", NULL}; // storage options and NULL termination
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|OOOOO&O&pOOiOpiOpnp", kwlist,
+                                     &f_obj, &t_span_obj, &y_obj, &yp_obj, // positional arguments
+                                     &rtol_obj, &atol_obj, &J_obj, &t_eval_obj, // optional arguments
+                                     dae_bandwidth_converter, &ml, dae_bandwidth_converter, &mu, // bandwidths
+                                     &krylov, &psetup_obj, &psolve_obj, &maxl, // Krylov method
+                                     &constraints_obj, &nonnegative, // inequality constraints
+                                     &init_mode, &algebraic_obj, &exclude_algebraic, // initial conditions and error test
+                                     &store_every, &store_last_only)) // storage options
+        return NULL;
+
+    if (store_every < 1) {
+        PyErr_SetString(PyExc_ValueError, "`store_every` must be a positive integer.");
+        goto fail;
+    }
+
+    // the iteration matrix is only formed by the direct methods, whereas
+    // the preconditioner is only used by the Krylov method
+    if (krylov && (J_obj != Py_None || ml >= 0 || mu >= 0)) {
+        PyErr_SetString(PyExc_ValueError, "`J`, `lband` and `uband` are not used by the Krylov method.");
+        goto fail;
+    }
+    if (!krylov && (psetup_obj != Py_None || psolve_obj != Py_None || maxl != 0)) {
+        PyErr_SetString(PyExc_ValueError, "`psetup`, `psolve` and `maxl` require `krylov=True`.");
+        goto fail;
+    }
+
+    // the algebraic components are required by INFO(11) = 1 and INFO(16) = 1
+    if (init_mode < 0 || init_mode > 2) {
+        PyErr_SetString(PyExc_ValueError, "`init_mode` must be 0, 1 or 2.");
+        goto fail;
+    }
+    if ((init_mode == 1 || exclude_algebraic) != (algebraic_obj != Py_None)) {
+        PyErr_SetString(PyExc_ValueError, "`algebraic` is required by and only used with `init_mode=1` or `exclude_algebraic=True`.");
+        goto fail;
+    }
+
+    // check if function (Python or native) and Jacobians (if present) are callable
+    if (dae_callback_prepare(&params.f, f_obj, "f", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+        goto fail;
+    }
+    if (J_obj != Py_None) {
+        if (dae_callback_prepare(&params.J, J_obj, "J", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+    if (psetup_obj != Py_None) {
+        if (dae_callback_prepare(&params.psetup, psetup_obj, "psetup", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+    if (psolve_obj != Py_None) {
+        if (dae_callback_prepare(&params.psolve, psolve_obj, "psolve", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
+        }
+    }
+
+    // unpack t_span tuple
+    if (!PyArg_ParseTuple(t_span_obj, "dd", &t, &t1)) {
+        goto fail;
+    }
+    if (!(t1 > t)) {
+        PyErr_SetString(PyExc_ValueError, "`t1` must larger than `t0`.");
+        goto fail;
+    }
+
+    // check if t_eval is present, otherwise create array with 500 linear spaced points
+    if (t_eval_obj == Py_None) {
+        t_eval_array = (PyArrayObject *) linspace(t, t1, 500);
+    } else {
+        t_eval_array = (PyArrayObject *) PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 0, 0);
+    }
+    if (t_eval_array == NULL) {
+        goto fail;
+    }
+    t_eval_ptr = (double *) PyArray_DATA(t_eval_array);
+    nt_eval = PyArray_Size((PyObject *) t_eval_array);
+
+    // initial conditions (copied, since they are overwritten during integration)
+    y_array = (PyArrayObject *) PyArray_FROM_OTF(y_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
+    if (y_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_NDIM(y_array) > 1) {
+        PyErr_SetString(PyExc_ValueError, "Initial condition y0 must be one-dimensional.");
+        goto fail;
+    }
+    y = (double *) PyArray_DATA(y_array);
+    neqn = PyArray_Size((PyObject *) y_array);
+
+    yp_array = (PyArrayObject *) PyArray_FROM_OTF(yp_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
+    if (yp_array == NULL) {
+        goto fail;
+    }
+    if (PyArray_NDIM(yp_array) > 1) {
+        PyErr_SetString(PyExc_ValueError, "Initial condition yp0 must be one-dimensional.");
+        goto fail;
+    }
+    yp = (double *) PyArray_DATA(yp_array);
+    if (!(neqn == PyArray_Size((PyObject *) yp_array))) {
+        PyErr_SetString(PyExc_ValueError, "Size of y0 and yp0 have to coincide.");
+        goto fail;
+    }
+
+    // tolerances are always passed as arrays (INFO(2) = 1), since
+    // EWT(i) = RTOL(i) * |Y(i)| + ATOL(i) coincides with the scalar case
+    rtol = malloc(neqn * sizeof(double));
+    atol = malloc(neqn * sizeof(double));
+    if (rtol == NULL || atol == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+    for (int i = 0; i < neqn; i++) {
+        rtol[i] = 1.0e-6;
+        atol[i] = 1.0e-3;
+    }
+    if (rtol_obj != NULL && daspk_tolerance(rtol_obj, "rtol", neqn, rtol) < 0) {
+        goto fail;
+    }
+    if (atol_obj != NULL && daspk_tolerance(atol_obj, "atol", neqn, atol) < 0) {
+        goto fail;
+    }
+
+    // full or banded iteration matrix
+    banded = dae_bandwidth_check(&ml, &mu, neqn);
+    if (banded < 0) {
+        goto fail;
+    }
+
+    // maximum dimension of the Krylov subspace, MAXL = min(5, NEQ) by default
+    if (maxl < 0 || maxl > neqn) {
+        PyErr_SetString(PyExc_ValueError, "`maxl` must be a positive integer not larger than len(y0).");
+        goto fail;
+    }
+    if (maxl == 0) {
+        maxl = neqn < 5 ? neqn : 5;
+    }
+
+    // initialize iwork and rwork for MAXORD = 5, the constraints ICNSTR and
+    // the differential/algebraic components ID are stored in IWORK(41...)
+    lenic = constraints_obj != Py_None ? neqn : 0;
+    lenid = algebraic_obj != Py_None ? neqn : 0;
+    if (krylov) {
+        // complete GMRES (KMP = MAXL) without work space for the preconditioner
+        lrwork = 50 + (5 + 5) * neqn + (maxl + 3) * neqn + (maxl + 3) * maxl + 1;
+        liwork = 40 + lenic + lenid;
+    } else if (banded) {
+        lrwork = 50 + (5 + 4) * neqn + (2 * ml + mu + 1) * neqn + 2 * (neqn / (ml + mu + 1) + 1);
+        liwork = 40 + lenic + lenid + neqn;
+    } else {
+        lrwork = 50 + (5 + 4) * neqn + pow(neqn, 2);
+        liwork = 40 + lenic + lenid + neqn;
+    }
+    if (exclude_algebraic) {
+        lrwork += neqn;
+    }
+
+    rwork = calloc(lrwork, sizeof(double));
+    iwork = calloc(liwork, sizeof(int));
+
+    // initialize info
+    info = calloc(ninfo, sizeof(int));
+    if (rwork == NULL || iwork == NULL || info == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // array-valued tolerances
+    info[1] = 1;
+    // get intermediate results
+    info[2] = 1;
+    // compute solution until t == t1
+    info[3] = 1;
+    rwork[0] = t1;
+    if (krylov) {
+        // preconditioned GMRES
+        info[11] = 1;
+        // MAXL, KMP = MAXL, NRMAX = 5 and EPLI = 0.05
+        info[12] = 1;
+        iwork[23] = maxl;
+        iwork[24] = maxl;
+        iwork[25] = 5;
+        rwork[9] = 0.05;
+        // psetup is called through JAC
+        info[14] = psetup_obj != Py_None;
+        jac = (void *) daspk_psetup;
+    } else {
+        // user-defined or numerical jacobian
+        info[4] = J_obj != Py_None;
+        // banded iteration matrix with bandwidths IWORK(1) and IWORK(2)
+        if (banded) {
+            info[5] = 1;
+            iwork[0] = ml;
+            iwork[1] = mu;
+        }
+        jac = (void *) daspk_jac;
+    }
+
+    // constraints in the initial condition calculation (INFO(10) = 1) and
+    // nonnegativity of all components during the integration (INFO(10) = 2)
+    info[9] = (lenic > 0) + 2 * nonnegative;
+    if (lenic > 0 && daspk_constraints(constraints_obj, neqn, iwork + 40) < 0) {
+        goto fail;
+    }
+
+    // consistent initial conditions, returning with IDID = 4 afterwards,
+    // and exclusion of the algebraic components from the error test
+    info[10] = init_mode;
+    info[13] = init_mode > 0;
+    info[15] = exclude_algebraic;
+    if (lenid > 0 && daspk_algebraic(algebraic_obj, neqn, iwork + 40 + lenic) < 0) {
+        goto fail;
+    }
+
+    // set parameters of this call
+    params.neqn = neqn;
+    params.ml = banded ? ml : -1;
+    params.mu = banded ? mu : -1;
+
+    // the number of stored states is known in advance from t_eval
+    capacity = (nt_eval - 1) / store_every + 2;
+    if (dae_buffer_init(&order_sol, 1, NPY_LONG, sizeof(long), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&t_sol, 1, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&y_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&yp_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // acquire the lock without holding the GIL
+    if (daspk_lock == NULL) {
+        daspk_lock = PyThread_allocate_lock();
+        if (daspk_lock == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "Failed to allocate lock.");
+            goto fail;
+        }
+    }
+    if (daspk_lock_owner == PyThread_get_thread_ident()) {
+        PyErr_SetString(PyExc_RuntimeError, "Nested calls of daspk are not supported.");
+        goto fail;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(daspk_lock, WAIT_LOCK);
+    Py_END_ALLOW_THREADS
+    daspk_lock_owner = PyThread_get_thread_ident();
+    locked = 1;
+
+    // compute consistent initial values, the integration is started by
+    // the next call with INFO(11) = 0
+    if (init_mode > 0) {
+        tout = nt_eval > 1 ? t_eval_ptr[1] : t1;
+        Py_BEGIN_ALLOW_THREADS
+        DDASPK(daspk_f, &neqn, &t, y, yp,
+            &tout, info, rtol, atol, &idid,
+            rwork, &lrwork, iwork, &liwork,
+            rpar, ipar, jac, daspk_psol);
+        Py_END_ALLOW_THREADS
+
+        if (params.error) {
+            dae_set_error(params.error);
+            goto fail;
+        }
+        success = idid == 4;
+        info[10] = 0;
+    }
+
+    // start with initial values
+    if (daspk_store(&order_sol, &t_sol, &y_sol, &yp_sol, 1, t, y, yp) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // compute all steps
+    for (int i = 1; i < nt_eval && success; i++) {
+        // call daspk solver until t = t_eval[i] is reached
+        while (t < t_eval_ptr[i]) {
+            Py_BEGIN_ALLOW_THREADS
+            DDASPK(daspk_f, &neqn, &t, y, yp,
+                &(t_eval_ptr[i]), info, rtol, atol, &idid,
+                rwork, &lrwork, iwork, &liwork,
+                rpar, ipar, jac, daspk_psol);
+            Py_END_ALLOW_THREADS
+
+            if (idid == -1) {
+                // about 500 steps were taken, continue integration
+                info[0] = 1;
+            } else if (idid < 0) {
+                success = 0;
+                break;
+            }
+        }
+        if (params.error) {
+            dae_set_error(params.error);
+            goto fail;
+        }
+        if (!success) {
+            break;
+        }
+
+        // store new state
+        if (daspk_store(&order_sol, &t_sol, &y_sol, &yp_sol, iwork[7], t, y, yp) < 0) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+    }
+
+    result = Py_BuildValue(
+        "{s:N,s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
+        "success", PyBool_FromLong(success),
+        "order", dae_buffer_to_array(&order_sol, 1),
+        "t", dae_buffer_to_array(&t_sol, 1),
+        "y", dae_buffer_to_array(&y_sol, 2),
+        "yp", dae_buffer_to_array(&yp_sol, 2),
+        "idid", idid, // IDID reported by the last DDASPK call
+        "nfev", params.nfev, // number of calls of f
+        "nsteps", iwork[10], // IWORK(11) total number of steps
+        "nf", iwork[11], // IWORK(12) number of function evaluations
+        "njac", iwork[12], // IWORK(13) number of jacobian (or psetup) evaluations
+        "nrejerror", iwork[13], // IWORK(14) total number of error test failures
+        "nrejnewton", iwork[14], // IWORK(15) total number of convergence test failures
+        "nrejlinear", iwork[15], // IWORK(16) number of linear convergence failures
+        "nnewton", iwork[18], // IWORK(19) number of nonlinear iterations
+        "nlinear", iwork[19], // IWORK(20) number of linear (Krylov) iterations
+        "npsolve", iwork[20] // IWORK(21) number of preconditioner solves
+    );
+
+    // cleanup (only objects owned by this function are released)
+    fail:
+        if (locked) {
+            daspk_lock_owner = 0;
+            PyThread_release_lock(daspk_lock);
+        }
+        free(rwork);
+        free(iwork);
+        free(info);
+        free(rtol);
+        free(atol);
+        dae_callback_release(&params.f);
+        dae_callback_release(&params.J);
+        dae_callback_release(&params.psetup);
+        dae_callback_release(&params.psolve);
+        Py_XDECREF(t_eval_array);
+        Py_XDECREF(y_array);
+        Py_XDECREF(yp_array);
+        dae_buffer_free(&order_sol);
+        dae_buffer_free(&t_sol);
+        dae_buffer_free(&y_sol);
+        dae_buffer_free(&yp_sol);
+        return result;
+}
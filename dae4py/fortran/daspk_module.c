@@ -0,0 +1,101 @@
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
+#include "numpy/arrayobject.h"
+
+#include "daspk/daspk.h"
+
+PyDoc_STRVAR(doc,
+"Function signature: daspk(f, t_span, y0, yp0, rtol=1e-6, atol=1e-3, J=None, t_eval=None, lband=None, uband=None, krylov=False, psetup=None, psolve=None, maxl=None, constraints=None, nonnegative=False, init_mode=0, algebraic=None, exclude_algebraic=False)\n"
+"\n"
+"Solve a DAE system f(t, y, y') = 0 with the BDF methods of DASPK. The\n"
+"linear systems are solved either with a dense or banded LU-decomposition\n"
+"of the iteration matrix or with the preconditioned Krylov method GMRES,\n"
+"see dae4py.fortran.daskr. In addition, DASPK supports tolerances for each\n"
+"component, inequality constraints and the computation of consistent\n"
+"initial conditions.\n"
+"\n"
+"Parameters\n"
+"----------\n"
+"f : callable\n"
+"    A Python function or native function that defines the DAE system, see\n"
+"    dae4py.fortran.daskr.\n"
+"\n"
+"t_span : array-like\n"
+"    A 2-element list or array defining the time interval `[t_start, t_end]`\n"
+"    over which to integrate the system.\n"
+"\n"
+"y0 : array-like\n"
+"    The initial conditions for the state vector `y` at the start of the integration.\n"
+"\n"
+"yp0 : array-like\n"
+"    The initial conditions for the derivative of the state vector `yp` at the start of the integration.\n"
+"\n"
+"rtol, atol: float or array-like (optional)\n"
+"    The used relative and absolute tolerances, either scalars or arrays\n"
+"    with a tolerance for each component. Default values: rtol=1e-6, atol=1e-3.\n"
+"\n"
+"J, lband, uband: (optional)\n"
+"    Iteration matrix and its bandwidths for the direct methods, see\n"
+"    dae4py.fortran.daskr.\n"
+"\n"
+"krylov, psetup, psolve, maxl: (optional)\n"
+"    Preconditioned Krylov method, see dae4py.fortran.daskr.\n"
+"\n"
+"constraints: array-like (optional)\n"
+"    Inequality constraints of the initial condition calculation, where\n"
+"    y[i] >= 0 (1), y[i] > 0 (2), y[i] <= 0 (-1), y[i] < 0 (-2) or\n"
+"    y[i] is not constrained (0).\n"
+"\n"
+"nonnegative: bool (optional)\n"
+"    Enforce nonnegativity of all components during the integration. Default value: False.\n"
+"\n"
+"init_mode: int (optional)\n"
+"    Computation of consistent initial conditions. Default value: 0.\n"
+"    - 0: y0 and yp0 are consistent.\n"
+"    - 1: Given the differential components of y0, compute the algebraic\n"
+"      components of y0 and the differential components of yp0.\n"
+"    - 2: Given yp0, compute y0.\n"
+"    The remaining components of y0 and yp0 are used as initial guesses.\n"
+"\n"
+"algebraic: array-like (optional)\n"
+"    Boolean mask of the algebraic components, which is required by\n"
+"    init_mode=1 and exclude_algebraic=True.\n"
+"\n"
+"exclude_algebraic: bool (optional)\n"
+"    Exclude the algebraic components from the error test. Default value: False.\n"
+"\n"
+"t_eval: array-like (optional)\n"
+"      The requested evaluation points. If not given, 500 equidistance points in t_span are chosen.\n"
+"\n"
+"store_every: int (optional)\n"
+"    Store only every k-th output point. The final state is always stored. Default value: 1.\n"
+"\n"
+"store_last_only: bool (optional)\n"
+"    Store only the final state. Default value: False.\n"
+"\n"
+"Returns\n"
+"-------\n"
+"result : dict\n"
+"    A dictionary containing the results of the integration with the keys\n"
+"    of dae4py.fortran.daskr apart from the events. If consistent initial\n"
+"    conditions are computed, they are the first stored state."
+);
+
+static PyMethodDef methods[] = {
+    {"daspk", (PyCFunction)daspk, METH_VARARGS | METH_KEYWORDS, doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    "_daspk",
+    NULL,
+    -1,
+    methods,
+};
+
+PyMODINIT_FUNC PyInit__daspk(void)
+{
+    import_array();
+    return PyModule_Create(&module);
+}
@@ -1,6 +1,8 @@
 #include <Python.h>
 #define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
 #include "numpy/arrayobject.h"
+#include "../buffer.h"
+#include "../callback.h"
 
 #ifdef HAVE_BLAS_ILP64
 #define F_INT npy_int64
@@ -10,13 +12,18 @@
 #define F_INT_NPY NPY_INT
 #endif
 
-typedef struct _dassl_globals {
-    PyObject *python_function;
+// Per-call context that is passed to the callbacks through rpar, so that
+// integrations can be nested and run concurrently in different threads.
+typedef struct _dassl_params {
+    dae_callback f;
+    dae_callback J;
     int neqn;
+    int ml; // lower bandwidth, -1 for full matrices
+    int mu; // upper bandwidth
+    int error; // reason for interrupting the integration (DAE_ERROR_*)
+    int nfev; // number of residual evaluations, including finite differences
 } dassl_params;
 
-static dassl_params global_dassl_params = {NULL, 0};
-
 #if defined(UPPERCASE_FORTRAN)
     #if defined(NO_APPEND_FORTRAN)
         /* nothing to do here */
@@ -31,24 +38,26 @@ static dassl_params global_dassl_params = {NULL, 0};
     #endif
 #endif
 
-typedef void dassl_f_t(double *t, double *y, double *ydot, 
-                         double *f, F_INT *ires, 
+typedef void dassl_f_t(double *t, double *y, double *ydot,
+                         double *f, F_INT *ires,
                          double *rpar, F_INT *ipar);
-typedef void dassl_jac_t(double *t, double *y, double *ydot, 
-                         double *J, double* cj, 
+typedef void dassl_jac_t(double *t, double *y, double *ydot,
+                         double *pd, double* cj,
                          double *rpar, F_INT *ipar);
 
-void DDASSL(dassl_f_t *res, F_INT *neq, double *t, 
-           double *y, double *yp, double *tout, 
+void DDASSL(dassl_f_t *res, F_INT *neq, double *t,
+           double *y, double *yp, double *tout,
            F_INT *info, double *rtol, double *atol,
            F_INT *idid, double *rwork, F_INT *lrw,
-           F_INT *iwork, F_INT *liw, double *rpar, 
-           F_INT *ipar);
+           F_INT *iwork, F_INT *liw, double *rpar,
+           F_INT *ipar, dassl_jac_t *jac);
 
-void dassl_f(double *t, double *y, double *yp, 
-             double *f, F_INT *ierr, 
+void dassl_f(double *t, double *y, double *yp,
+             double *f, F_INT *ires,
              double *rpar, F_INT *ipar)
 {
+    dassl_params *params = (dassl_params *) rpar;
+
     PyObject *y_obj = NULL;
     PyObject *yp_obj = NULL;
     PyObject *result = NULL;
@@ -56,17 +65,34 @@ void dassl_f(double *t, double *y, double *yp,
     PyArrayObject *result_array = NULL;
 
     npy_intp dims[1];
-    dims[0] = global_dassl_params.neqn;
+    dims[0] = params->neqn;
+
+    // a previous callback failed, return control to the calling program
+    if (params->error) {
+        *ires = -2;
+        return;
+    }
+    params->nfev += 1;
+
+    // native residuals are evaluated without the GIL
+    if (params->f.function != NULL) {
+        if (dae_callback_native_f(&params->f, params->neqn, *t, y, yp, f) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ires = -2;
+        }
+        return;
+    }
+
+    // the GIL is released during the integration
+    PyGILState_STATE gstate = PyGILState_Ensure();
 
     /* Build numpy arrays from y and yp. */
     y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
     if (y_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y) failed.");
         goto fail;
     }
     yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
     if (yp_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp) failed.");
         goto fail;
     }
 
@@ -78,66 +104,138 @@ void dassl_f(double *t, double *y, double *yp,
         yp_obj
     );
     if (arglist == NULL) {
-        PyErr_SetString(PyExc_ValueError, "Py_BuildValue failed.");
         goto fail;
     }
 
     /* Call the Python function. */
-    result = PyObject_CallObject(global_dassl_params.python_function, arglist);
+    result = PyObject_CallObject(params->f.python_function, arglist);
     if (result == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyObject_CallObject(global_dassl_params.python_function, arglist) failed.");
         goto fail;
     }
 
     /* Build numpy array from result and copy to f. */
     result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
     if (result_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0) failed.");
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != params->neqn) {
+        PyErr_SetString(PyExc_ValueError, "`f` must return an array of the same size as y0.");
         goto fail;
     }
 
     /* Copy data from the result array to your C array */
     memcpy(f, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
 
     fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ires = -2;
+
+    done:
         Py_XDECREF(y_obj);
         Py_XDECREF(yp_obj);
         Py_XDECREF(result);
         Py_XDECREF(arglist);
         Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
         return;
 }
 
 
-void dassl_jac(F_INT ldj, F_INT neqn, F_INT nlj, F_INT nuj, 
-             double *t, double *y, double *ydot, double *J, 
-             double *rpar, F_INT *ipar){}
+// pd = dF/dy + cj * dF/dy'
+void dassl_jac(double *t, double *y, double *yp,
+               double *pd, double *cj,
+               double *rpar, F_INT *ipar)
+{
+    dassl_params *params = (dassl_params *) rpar;
 
-static PyObject* linspace(double start, double stop, int num) {
-    // check for valid number of points
-    if (num <= 0) {
-        PyErr_SetString(PyExc_ValueError, "linspace: Number of points must be greater than 0");
-        return NULL;
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = params->neqn;
+
+    // pd is set to zero by DDASSL, the next residual call interrupts the
+    // integration if a previous callback failed
+    if (params->error) {
+        return;
     }
 
-    // calculate the step-size
-    double step = (num > 1) ? (stop - start) / (num - 1) : 0.0;
+    // native Jacobians are evaluated without the GIL
+    if (params->J.function != NULL) {
+        if (dae_callback_native_jac(&params->J, params->neqn, *t, y, yp, *cj, pd) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+        }
+        return;
+    }
 
-    // create a NumPy array of doubles
-    npy_intp dims[1] = {num};  // dimension of the array
-    PyObject* array = PyArray_SimpleNew(1, dims, NPY_DOUBLE);  // 1D array of type double
-    if (!array) {
-        PyErr_SetString(PyExc_RuntimeError, "linspace: Failed to create NumPy array");
-        return NULL;
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOOd",
+        *t,
+        y_obj,
+        yp_obj,
+        *cj
+    );
+    if (arglist == NULL) {
+        goto fail;
     }
 
-    // Fill the array with linearly spaced values
-    double* data = (double*)PyArray_DATA((PyArrayObject*)array);
-    for (int i = 0; i < num; i++) {
-        data[i] = start + i * step;
+    /* Call the Python function and copy the result to pd. */
+    result = PyObject_CallObject(params->J.python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    if (params->ml < 0) {
+        if (dae_copy_matrix(result, "J", params->neqn, pd, params->neqn) < 0) {
+            goto fail;
+        }
+    } else {
+        // PD(i - j + ML + MU + 1, j) with leading dimension 2 * ML + MU + 1
+        if (dae_copy_band(result, "J", params->neqn, params->ml, params->mu,
+                          pd, 2 * params->ml + params->mu + 1, params->ml + params->mu) < 0) {
+            goto fail;
+        }
     }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
 
-    return array;
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
+
+// store the current state, returns -1 if allocation failed
+static int dassl_store(dae_buffer *order_sol, dae_buffer *t_sol,
+                       dae_buffer *y_sol, dae_buffer *yp_sol,
+                       long order, double t, double *y, double *yp) {
+    if (dae_buffer_store(order_sol, &order) < 0
+        || dae_buffer_store(t_sol, &t) < 0
+        || dae_buffer_store(y_sol, y) < 0
+        || dae_buffer_store(yp_sol, yp) < 0) {
+        return -1;
+    }
+    return 0;
 }
 
 static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
@@ -148,10 +246,7 @@ static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
     PyObject *t_eval_obj = Py_None;
     PyObject *y_obj = NULL;
     PyObject *yp_obj = NULL;
-    PyObject *order_sol;
-    PyObject *t_sol;
-    PyObject *y_sol;
-    PyObject *yp_sol;
+    PyObject *result = NULL;
     PyArrayObject *t_eval_array = NULL;
     PyArrayObject *y_array = NULL;
     PyArrayObject *yp_array = NULL;
@@ -166,62 +261,85 @@ static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
 
     int neqn;
     int jnum;
+    int ml = -1;
+    int mu = -1;
+    int banded;
     int ninfo = 15;
 
     int lrwork;
     int liwork;
-    double *rwork;
-    int *iwork;
-    int *info;
-
-    double *rpar;
-    int *ipar;
-    int idid;
+    double *rwork = NULL;
+    int *iwork = NULL;
+    int *info = NULL;
+
+    // solution storage
+    Py_ssize_t store_every = 1;
+    int store_last_only = 0;
+    dae_buffer order_sol = {NULL};
+    dae_buffer t_sol = {NULL};
+    dae_buffer y_sol = {NULL};
+    dae_buffer yp_sol = {NULL};
+    npy_intp capacity;
+
+    dassl_params params = {{NULL}, {NULL}, 0, 0};
+    double *rpar = (double *) &params;
+    int *ipar = NULL;
+    int idid = 0;
 
     // parse inputs
     static char *kwlist[] = {"f", "t_span", "y0", "yp0", // mandatory arguments
-                             "rtol", "atol", "J", "t_eval", NULL}; // optional arguments and NULL termination
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOO", kwlist, 
+                             "rtol", "atol", "J", "t_eval", // optional arguments
+                             "lband", "uband", // bandwidths
+                             "store_every", "store_last_only", NULL}; // storage options and NULL termination
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOOO&O&np", kwlist,
                                      &f_obj, &t_span_obj, &y_obj, &yp_obj, // positional arguments
-                                     &rtol, &atol, &J_obj, &t_eval_obj)) // optional arguments
+                                     &rtol, &atol, &J_obj, &t_eval_obj, // optional arguments
+                                     dae_bandwidth_converter, &ml, dae_bandwidth_converter, &mu, // bandwidths
+                                     &store_every, &store_last_only)) // storage options
         return NULL;
 
-    // check if function and Jacobians (if present) are callable
-    if (!PyCallable_Check(f_obj)) {
-        PyErr_SetString(PyExc_ValueError, "`f` must be a callable function.");
+    if (store_every < 1) {
+        PyErr_SetString(PyExc_ValueError, "`store_every` must be a positive integer.");
+        goto fail;
+    }
+
+    // check if function (Python or native) and Jacobians (if present) are callable
+    if (dae_callback_prepare(&params.f, f_obj, "f", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+        goto fail;
     }
     if (J_obj != Py_None) {
-        if (!PyCallable_Check(J_obj)) {
-            PyErr_SetString(PyExc_ValueError, "`J` must be a callable function.");
+        if (dae_callback_prepare(&params.J, J_obj, "J", DAE_JAC_SIGNATURE_DATA, DAE_JAC_SIGNATURE) < 0) {
+            goto fail;
         }
-        jnum = 1;
-        PyErr_SetString(PyExc_ValueError, "User-defined Jacobian `J` is not implemented yet.");
+        jnum = 0;
     } else {
-        jnum = 0; 
+        jnum = 1;
     }
 
     // unpack t_span tuple
-    PyArg_ParseTuple(t_span_obj, "dd", &t, &t1);
+    if (!PyArg_ParseTuple(t_span_obj, "dd", &t, &t1)) {
+        goto fail;
+    }
     if (!(t1 > t)) {
         PyErr_SetString(PyExc_ValueError, "`t1` must larger than `t0`.");
+        goto fail;
     }
 
     // check if t_eval is present, otherwise create array with 500 linear spaced points
     if (t_eval_obj == Py_None) {
-        t_eval_obj = linspace(t, t1, 500);
+        t_eval_array = (PyArrayObject *) linspace(t, t1, 500);
+    } else {
+        t_eval_array = (PyArrayObject *) PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 0, 0);
     }
-    t_eval_array = (PyArrayObject *) PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 0, 0);
     if (t_eval_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     t_eval_ptr = (double *) PyArray_DATA(t_eval_array);
     nt_eval = PyArray_Size((PyObject *) t_eval_array);
 
-    // initial conditions
-    y_array = (PyArrayObject *) PyArray_ContiguousFromObject(y_obj, NPY_DOUBLE, 0, 0);
+    // initial conditions (copied, since they are overwritten during integration)
+    y_array = (PyArrayObject *) PyArray_FROM_OTF(y_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
     if (y_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(y_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(y_array) > 1) {
@@ -231,9 +349,8 @@ static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
     y = (double *) PyArray_DATA(y_array);
     neqn = PyArray_Size((PyObject *) y_array);
 
-    yp_array = (PyArrayObject *) PyArray_ContiguousFromObject(yp_obj, NPY_DOUBLE, 0, 0);
+    yp_array = (PyArrayObject *) PyArray_FROM_OTF(yp_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
     if (yp_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(yp_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(yp_array) > 1) {
@@ -246,132 +363,108 @@ static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
         goto fail;
     }
 
+    // full or banded iteration matrix
+    banded = dae_bandwidth_check(&ml, &mu, neqn);
+    if (banded < 0) {
+        goto fail;
+    }
+
     // initialize iwork and rwork
-    lrwork = 40 + (5 + 4) * neqn + pow(neqn, 2);
+    if (banded) {
+        lrwork = 40 + (5 + 4) * neqn + (2 * ml + mu + 1) * neqn + 2 * (neqn / (ml + mu + 1) + 1);
+    } else {
+        lrwork = 40 + (5 + 4) * neqn + pow(neqn, 2);
+    }
     liwork = 20 + neqn;
 
-    rwork = malloc(lrwork * sizeof(double));
-    iwork = malloc(liwork * sizeof(int));
-
-    for (int i=0; i<20; i++) {
-        iwork[i] = 0;
-        rwork[i] = 0.0;
-    }
+    rwork = calloc(lrwork, sizeof(double));
+    iwork = calloc(liwork, sizeof(int));
 
     // initialize info
-    info = malloc(ninfo * sizeof(int));
-    for (int i=0; i<ninfo; i++) {
-        info[i] = 0;
+    info = calloc(ninfo, sizeof(int));
+    if (rwork == NULL || iwork == NULL || info == NULL) {
+        PyErr_NoMemory();
+        goto fail;
     }
+
     // get intermediate results
     info[2] = 1;
     // compute solution until t == t1
     info[3] = 1;
     rwork[0] = t1;
-    // numerical jacobian
-    info[5] = jnum;
-
-    // set global_dassl_params
-    global_dassl_params.neqn = neqn;
-    global_dassl_params.python_function = f_obj;
-
-    // store solution in python list and start with initial values
-    order_sol = PyList_New(0);
-    t_sol = PyList_New(0);
-    y_sol = PyList_New(0);
-    yp_sol = PyList_New(0);
-    PyList_Append(order_sol, PyLong_FromLong(1));
-    PyList_Append(t_sol, PyFloat_FromDouble(t));
-    PyList_Append(y_sol, PyArray_NewCopy(y_array, NPY_ANYORDER));
-    PyList_Append(yp_sol, PyArray_NewCopy(yp_array, NPY_ANYORDER));
-
-    // first DASSL call
-    DDASSL(dassl_f, &neqn, &t, y, yp,
-        &(t_eval_ptr[1]), info, &rtol, &atol, &idid, 
-        rwork, &lrwork, iwork, &liwork, 
-        rpar, ipar);
-
-    // call dassl solver until t = t_eval[1] is reached
-    while (t < t_eval_ptr[1]) {
-        DDASSL(dassl_f, &neqn, &t, y, yp,
-            &(t_eval_ptr[1]), info, &rtol, &atol, &idid, 
-            rwork, &lrwork, iwork, &liwork, 
-            rpar, ipar);
-    }
-
-    // store new state in solution lists
-    PyList_Append(order_sol, PyLong_FromLong(iwork[7]));
-    PyList_Append(t_sol, PyFloat_FromDouble(t));
-    PyList_Append(y_sol, PyArray_NewCopy(y_array, NPY_ANYORDER));
-    PyList_Append(yp_sol, PyArray_NewCopy(yp_array, NPY_ANYORDER));
-
-    // compute all other steps
-    for (int i = 2; i < nt_eval; i++) {
-        // continue integration with a new TOUT
+    // user-defined or numerical jacobian
+    info[4] = !jnum;
+    // banded iteration matrix with bandwidths IWORK(1) and IWORK(2)
+    if (banded) {
+        info[5] = 1;
+        iwork[0] = ml;
+        iwork[1] = mu;
+    }
+
+    // set parameters of this call
+    params.neqn = neqn;
+    params.ml = banded ? ml : -1;
+    params.mu = banded ? mu : -1;
+
+    // the number of stored states is known in advance from t_eval
+    capacity = (nt_eval - 1) / store_every + 2;
+    if (dae_buffer_init(&order_sol, 1, NPY_LONG, sizeof(long), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&t_sol, 1, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&y_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0
+        || dae_buffer_init(&yp_sol, neqn, NPY_DOUBLE, sizeof(double), capacity, store_every, store_last_only) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // start with initial values
+    if (dassl_store(&order_sol, &t_sol, &y_sol, &yp_sol, 1, t, y, yp) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    // compute all steps
+    for (int i = 1; i < nt_eval && success; i++) {
         // call dassl solver until t = t_eval[i] is reached
         while (t < t_eval_ptr[i]) {
+            Py_BEGIN_ALLOW_THREADS
             DDASSL(dassl_f, &neqn, &t, y, yp,
-                &(t_eval_ptr[i]), info, &rtol, &atol, &idid, 
-                rwork, &lrwork, iwork, &liwork, 
-                rpar, ipar);
+                &(t_eval_ptr[i]), info, &rtol, &atol, &idid,
+                rwork, &lrwork, iwork, &liwork,
+                rpar, ipar, dassl_jac);
+            Py_END_ALLOW_THREADS
+
+            if (idid == -1) {
+                // about 500 steps were taken, continue integration
+                info[0] = 1;
+            } else if (idid < 0) {
+                success = 0;
+                break;
+            }
+        }
+        if (params.error) {
+            dae_set_error(params.error);
+            goto fail;
+        }
+        if (!success) {
+            break;
         }
 
-        // store new state in solution lists
-        PyList_Append(order_sol, PyLong_FromLong(iwork[7]));
-        PyList_Append(t_sol, PyFloat_FromDouble(t));
-        PyList_Append(y_sol, PyArray_NewCopy(y_array, NPY_ANYORDER));
-        PyList_Append(yp_sol, PyArray_NewCopy(yp_array, NPY_ANYORDER));
-
-    }
-
-    // cleanup
-    free(rwork);
-    free(iwork);
-    Py_XDECREF(f_obj);
-    Py_XDECREF(J_obj);
-    Py_XDECREF(t_span_obj);
-    Py_XDECREF(t_eval_obj);
-    Py_XDECREF(y_obj);
-    Py_XDECREF(yp_obj);
-    Py_XDECREF(t_eval_array);
-    Py_XDECREF(y_array);
-    Py_XDECREF(yp_array);
-    
-    return Py_BuildValue(
-        "{s:N,s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i}",
-        "success", success ? Py_True : Py_False,
-        "order", PyArray_Return(PyArray_FromAny(
-                                order_sol,              // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
-        "t", PyArray_Return(PyArray_FromAny(
-                                t_sol,                  // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
-        "y", PyArray_Return(PyArray_FromAny(
-                                y_sol,                  // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
-        "yp", PyArray_Return(PyArray_FromAny(
-                                yp_sol,                 // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
+        // store new state
+        if (dassl_store(&order_sol, &t_sol, &y_sol, &yp_sol, iwork[7], t, y, yp) < 0) {
+            PyErr_NoMemory();
+            goto fail;
+        }
+    }
+
+    result = Py_BuildValue(
+        "{s:N,s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
+        "success", PyBool_FromLong(success),
+        "order", dae_buffer_to_array(&order_sol, 1),
+        "t", dae_buffer_to_array(&t_sol, 1),
+        "y", dae_buffer_to_array(&y_sol, 2),
+        "yp", dae_buffer_to_array(&yp_sol, 2),
+        "idid", idid, // IDID reported by the last DDASSL call
+        "nfev", params.nfev, // number of calls of f
         "nsteps", iwork[10], // IWORK(11) total number of steps
         "nf", iwork[11], // IWORK(12) number of function evaluations
         "njac", iwork[12], // IWORK(13) number of jacobian evaluations
@@ -379,17 +472,19 @@ static PyObject* dassl(PyObject *self, PyObject *args, PyObject *kwargs)
         "nrejnewton", iwork[14] // IWORK(15) total number of convergence test failures
     );
 
+    // cleanup (only objects owned by this function are released)
     fail:
         free(rwork);
         free(iwork);
-        Py_XDECREF(f_obj);
-        Py_XDECREF(J_obj);
-        Py_XDECREF(t_span_obj);
-        Py_XDECREF(t_eval_obj);
-        Py_XDECREF(y_obj);
-        Py_XDECREF(yp_obj);
+        free(info);
+        dae_callback_release(&params.f);
+        dae_callback_release(&params.J);
         Py_XDECREF(t_eval_array);
         Py_XDECREF(y_array);
         Py_XDECREF(yp_array);
-        return NULL;
+        dae_buffer_free(&order_sol);
+        dae_buffer_free(&t_sol);
+        dae_buffer_free(&y_sol);
+        dae_buffer_free(&yp_sol);
+        return result;
 }
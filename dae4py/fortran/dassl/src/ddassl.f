@@ -2147,8 +2147,9 @@ C     DUMMY SECTION FOR MTYPE=3
       RETURN
 C
 C     BANDED MATRIX
-400   CALL DGBTRS('N', NEQ, IWM(LML), IWM(LMU), 1, WM(NPD), MEBAND, 
-     *   IWM(LIPVT), DELTA, NEQ, INFO)
+400   MEBAND=2*IWM(LML)+IWM(LMU)+1
+      CALL DGBTRS('N', NEQ, IWM(LML), IWM(LMU), 1, WM(NPD), MEBAND, 
+     *   IWM(LIPVT), DELTA, NEQ, IER)
       RETURN
 C------END OF SUBROUTINE DDASLV------
       END
@@ -18,6 +18,13 @@ PyDoc_STRVAR(doc,
 "    must have the signature `f(t, y, yp)`, where `t` is the\n"
 "    current time, `y` is the state vector, and `yp` is the \n"
 "    derivative of the state vector.\n"
+"    Alternatively, a native function given as scipy.LowLevelCallable,\n"
+"    PyCapsule, ctypes or cffi function pointer (e.g. a Numba cfunc) with\n"
+"    one of the signatures\n"
+"        int f(int n, double t, double *y, double *yp, double *f, void *user_data)\n"
+"        int f(int n, double t, double *y, double *yp, double *f)\n"
+"    can be passed, which writes the residual to f and returns 0 on success.\n"
+"    It is evaluated without any Python overhead and without holding the GIL.\n"
 "\n"
 "t_span : array-like\n"
 "    A 2-element list or array defining the time interval `[t_start, t_end]`\n"
@@ -29,11 +36,43 @@ PyDoc_STRVAR(doc,
 "yp0 : array-like\n"
 "    The initial conditions for the derivative of the state vector `yp` at the start of the integration.\n"
 "\n"
+"J: callable (optional)\n"
+"    Partial derivatives of f. For dassl, the iteration matrix\n"
+"    `J(t, y, yp, cj) = df/dy + cj * df/dyp` of shape (n, n) is returned.\n"
+"    For pside, `J(t, y, yp) = df/dy` and `M(t, y, yp) = df/dyp` are\n"
+"    given separately. For radau and radau5, `J(t, y, yp)` returns the tuple\n"
+"    (df/dy, df/dyp). Both integrate y' = v, 0 = f(t, y, v) of size 2n, but only\n"
+"    these blocks are required, since the identity block is known and the linear algebra\n"
+"    is reduced to dimension n. Dense arrays and scipy.sparse matrices are accepted.\n"
+"    Native functions write the column-major matrix into their last pointer\n"
+"    argument, i.e., `int J(int n, double t, double *y, double *yp, double cj,\n"
+"    double *pd[, void *user_data])` for dassl and the signature of f for pside,\n"
+"    radau and radau5. For the latter, pd stores df/dy and df/dyp side by side.\n"
+"    If not given, the partial derivatives are approximated by finite differences.\n"
+"\n"
+"lband, uband: int (optional)\n"
+"    Lower and upper bandwidths of df/dy and df/dyp, i.e., df_i/dy_j = 0\n"
+"    unless -lband <= j - i <= uband. If only one of them is given, the other\n"
+"    one is zero. If given, banded LU-decompositions are used and the finite\n"
+"    difference approximation requires only lband + uband + 1 evaluations of f.\n"
+"    A dense or sparse J is then reduced to its band. Native Jacobians\n"
+"    write the band storage of the respective Fortran code directly.\n"
+"\n"
 "rtol, atol: float (optional)\n"
 "    The used relative and absolute tolerances. Default values: rtol=1e-6, atol=1e-3.\n"
 "\n"
 "t_eval: array-like (optional)\n"
 "      The requested evaluation points. If not given, 500 equidistance points in t_span are chosen.\n"
+"      For radau and radau5, t, y and yp hold the accepted steps and the sorted points t_eval\n"
+"      (within t_span) are evaluated by the collocation polynomials of the steps (CONTRA/CONTR5)\n"
+"      during the integration. They are returned as 't_eval', 'y_eval' and 'yp_eval', where\n"
+"      points that are not reached are NaN. If not given, no dense output is computed.\n"
+"\n"
+"store_every: int (optional)\n"
+"    Store only every k-th output point. The final state is always stored. Default value: 1.\n"
+"\n"
+"store_last_only: bool (optional)\n"
+"    Store only the final state. Default value: False.\n"
 "\n"
 "Returns\n"
 "-------\n"
@@ -45,7 +84,8 @@ PyDoc_STRVAR(doc,
 "    - 'y': List of stage values corresponding to t.\n"
 "    - 'yp': List of stage derivatives corresponding to t.\n"
 "    - 'nsteps': Total number of steps.\n"
-"    - 'nf': Number of function evaluations.\n"
+"    - 'nf': Number of function evaluations reported by the solver.\n"
+"    - 'nfev': Number of calls of f, including finite difference Jacobians.\n"
 "    - 'njac': Number of jacobian evaluations.\n"
 "    - 'nrejerror': Number of error tests failures.\n"
 "    - 'nrejnewton': Number of convergence tests failures.\n"
@@ -75,13 +115,13 @@ static PyMethodDef methods[] = {
 
 static struct PyModuleDef module = {
     PyModuleDef_HEAD_INIT,
-    "fortran",
+    "_fortran",
     NULL,
     -1,
     methods,
 };
 
-PyMODINIT_FUNC PyInit_fortran(void)
+PyMODINIT_FUNC PyInit__fortran(void)
 {
     import_array();
     return PyModule_Create(&module);
@@ -1,6 +1,9 @@
 #include <Python.h>
+#include <pythread.h>
 #define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
 #include "numpy/arrayobject.h"
+#include "../buffer.h"
+#include "../callback.h"
 
 #ifdef HAVE_BLAS_ILP64
 #define F_INT npy_int64
@@ -10,15 +13,22 @@
 #define F_INT_NPY NPY_INT
 #endif
 
-typedef struct _pside_globals {
-    PyObject *python_function;
-    PyObject *t_sol;
-    PyObject *y_sol;
-    PyObject *yp_sol;
-    int nt;
+// Per-call context that is passed to the callbacks through rpar.
+typedef struct _pside_params {
+    dae_callback f;
+    dae_callback J;
+    dae_callback M;
+    dae_buffer t_sol;
+    dae_buffer y_sol;
+    dae_buffer yp_sol;
+    int error; // reason for interrupting the integration (DAE_ERROR_*)
+    int nfev; // number of residual evaluations, including finite differences
 } pside_params;
 
-static pside_params global_pside_params = {NULL, NULL, NULL, NULL, 0};
+// PSIDE keeps step-size control data in SAVE variables, hence calls of
+// different threads are serialized and nested calls are rejected.
+static PyThread_type_lock pside_lock = NULL;
+static unsigned long pside_lock_owner = 0;
 
 #if defined(UPPERCASE_FORTRAN)
     #if defined(NO_APPEND_FORTRAN)
@@ -35,19 +45,21 @@ static pside_params global_pside_params = {NULL, NULL, NULL, NULL, 0};
 #endif
 
 typedef void pside_f_t(F_INT *neqn, double *t, double *y, double *ydot, double *f, F_INT *ierr, double *rpar, F_INT *ipar);
-typedef void pside_jac_t(F_INT ldj, F_INT neqn, F_INT nlj, F_INT nuj, double *t, double *y, double *ydot, double *J, double *rpar, F_INT *ipar);
-typedef void pside_M_t(F_INT lmj, F_INT neqn, F_INT nlm, F_INT num, double *t, double *y, double *ydot, double *M, double *rpar, F_INT *ipar);
-typedef void pside_solout_t(F_INT *iter, F_INT *neqn, double *t, double *y, double *ydot);
+typedef void pside_jac_t(F_INT *ldj, F_INT *neqn, F_INT *nlj, F_INT *nuj, double *t, double *y, double *ydot, double *J, double *rpar, F_INT *ipar);
+typedef void pside_M_t(F_INT *ldm, F_INT *neqn, F_INT *nlm, F_INT *num, double *t, double *y, double *ydot, double *M, double *rpar, F_INT *ipar);
+typedef void pside_solout_t(F_INT *iter, F_INT *neqn, double *t, double *y, double *ydot, double *rpar, F_INT *ipar, F_INT *irtrn);
 
-void PSIDE(F_INT *neq, double *y, double *yp, pside_f_t *f, 
-           F_INT *jnum /*should be boolean*/, F_INT *nlj, F_INT *nuj, pside_jac_t *J, 
-           F_INT *mnum /*should be boolean*/, F_INT *nlm, F_INT *num, pside_M_t *M, 
+void PSIDE(F_INT *neq, double *y, double *yp, pside_f_t *f,
+           F_INT *jnum /*should be boolean*/, F_INT *nlj, F_INT *nuj, pside_jac_t *J,
+           F_INT *mnum /*should be boolean*/, F_INT *nlm, F_INT *num, pside_M_t *M,
            double *t, double *tend, double *rtol, double *atol, F_INT *IND,
-           F_INT *lrwork, double *rwork, F_INT *liwork, F_INT *iwork, 
+           F_INT *lrwork, double *rwork, F_INT *liwork, F_INT *iwork,
            double *rpar, F_INT *ipar, F_INT *idid, pside_solout_t *solout);
 
 void pside_f(F_INT *neqn, double *t, double *y, double *yp, double *f, F_INT *ierr, double *rpar, F_INT *ipar)
 {
+    pside_params *params = (pside_params *) rpar;
+
     PyObject *y_object = NULL;
     PyObject *yp_object = NULL;
     PyObject *result = NULL;
@@ -57,15 +69,32 @@ void pside_f(F_INT *neqn, double *t, double *y, double *yp, double *f, F_INT *ie
     npy_intp dims[1];
     dims[0] = *neqn;
 
+    // a previous callback failed, the integration is interrupted in solout
+    if (params->error) {
+        *ierr = -1;
+        return;
+    }
+    params->nfev += 1;
+
+    // native residuals are evaluated without the GIL
+    if (params->f.function != NULL) {
+        if (dae_callback_native_f(&params->f, *neqn, *t, y, yp, f) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            *ierr = -1;
+        }
+        return;
+    }
+
+    // the GIL is released during the integration
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
     /* Build numpy arrays from y and yp. */
     y_object = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
     if (y_object == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(*neqn, global_pside_params.dims, NPY_DOUBLE, y) failed.");
         goto fail;
     }
     yp_object = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
     if (yp_object == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(*neqn, global_pside_params.dims, NPY_DOUBLE, yp) failed.");
         goto fail;
     }
 
@@ -77,62 +106,170 @@ void pside_f(F_INT *neqn, double *t, double *y, double *yp, double *f, F_INT *ie
         yp_object
     );
     if (arglist == NULL) {
-        PyErr_SetString(PyExc_ValueError, "Py_BuildValue failed.");
         goto fail;
     }
 
     /* Call the Python function. */
-    result = PyObject_CallObject(global_pside_params.python_function, arglist);
+    result = PyObject_CallObject(params->f.python_function, arglist);
     if (result == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyObject_CallObject(global_pside_params.python_function, arglist) failed.");
         goto fail;
     }
 
     /* Build numpy array from result and copy to f. */
     result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
     if (result_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0) failed.");
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != *neqn) {
+        PyErr_SetString(PyExc_ValueError, "`f` must return an array of the same size as y0.");
         goto fail;
     }
 
     /* Copy data from the result array to your C array */
     memcpy(f, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
+    goto done;
 
     fail:
+        params->error = DAE_ERROR_PYTHON;
+        *ierr = -1;
+
+    done:
         Py_XDECREF(y_object);
         Py_XDECREF(yp_object);
         Py_XDECREF(result);
         Py_XDECREF(arglist);
         Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
         return;
 }
 
 
-void pside_J(F_INT ldj, F_INT neqn, F_INT nlj, F_INT nuj, 
-             double *t, double *y, double *ydot, double *J, 
-             double *rpar, F_INT *ipar){}
+// evaluate a partial derivative dF/dy or dF/dy' with leading dimension ld,
+// which is banded with bandwidths nl and nu if nl < neqn
+static void pside_matrix(pside_params *params, dae_callback *callback, const char *name,
+                         F_INT ld, F_INT neqn, F_INT nl, F_INT nu,
+                         double *t, double *y, double *yp, double *out)
+{
+    PyObject *y_obj = NULL;
+    PyObject *yp_obj = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
+
+    npy_intp dims[1];
+    dims[0] = neqn;
+
+    // JEVAL and MEVAL have no error flag, the next residual call
+    // interrupts the integration if a previous callback failed
+    if (params->error) {
+        memset(out, 0, ld * neqn * sizeof(double));
+        return;
+    }
+
+    // native partial derivatives are evaluated without the GIL
+    if (callback->function != NULL) {
+        if (dae_callback_native_f(callback, neqn, *t, y, yp, out) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
+    /* Build numpy arrays from y and yp. */
+    y_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
+    if (y_obj == NULL) {
+        goto fail;
+    }
+    yp_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+    if (yp_obj == NULL) {
+        goto fail;
+    }
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOO",
+        *t,
+        y_obj,
+        yp_obj
+    );
+    if (arglist == NULL) {
+        goto fail;
+    }
+
+    /* Call the Python function and copy the result. */
+    result = PyObject_CallObject(callback->python_function, arglist);
+    if (result == NULL) {
+        goto fail;
+    }
+    if (nl == neqn) {
+        if (dae_copy_matrix(result, name, neqn, out, ld) < 0) {
+            goto fail;
+        }
+    } else {
+        // DGDY(i - j + NU + 1, j) (LAPACK band storage)
+        if (dae_copy_band(result, name, neqn, nl, nu, out, ld, nu) < 0) {
+            goto fail;
+        }
+    }
+    goto done;
+
+    fail:
+        params->error = DAE_ERROR_PYTHON;
+        memset(out, 0, ld * neqn * sizeof(double));
+
+    done:
+        Py_XDECREF(y_obj);
+        Py_XDECREF(yp_obj);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
+        return;
+}
 
-void pside_M(F_INT lmj, F_INT neqn, F_INT nlm, F_INT num, 
-             double *t, double *y, double *ydot, double *M, 
-             double *rpar, F_INT *ipar){}
+// J = dF/dy
+void pside_J(F_INT *ldj, F_INT *neqn, F_INT *nlj, F_INT *nuj,
+             double *t, double *y, double *ydot, double *J,
+             double *rpar, F_INT *ipar)
+{
+    pside_params *params = (pside_params *) rpar;
+    pside_matrix(params, &params->J, "J", *ldj, *neqn, *nlj, *nuj, t, y, ydot, J);
+}
 
-void pside_solout(F_INT *iter, F_INT *neqn, double *t, double *y, double *yp)
+// M = dF/dy'
+void pside_M(F_INT *ldm, F_INT *neqn, F_INT *nlm, F_INT *num,
+             double *t, double *y, double *ydot, double *M,
+             double *rpar, F_INT *ipar)
 {
-    global_pside_params.nt += 1;
+    pside_params *params = (pside_params *) rpar;
+    pside_matrix(params, &params->M, "M", *ldm, *neqn, *nlm, *num, t, y, ydot, M);
+}
 
-    PyObject *t_value = PyFloat_FromDouble(*t);
-    PyList_Append(global_pside_params.t_sol, t_value);
-    Py_DECREF(t_value);
+// store the current state, returns -1 if allocation failed
+static int pside_store(pside_params *params, double t, double *y, double *yp) {
+    if (dae_buffer_store(&params->t_sol, &t) < 0
+        || dae_buffer_store(&params->y_sol, y) < 0
+        || dae_buffer_store(&params->yp_sol, yp) < 0) {
+        return -1;
+    }
+    return 0;
+}
 
-    npy_intp dims[1] = {*neqn};
-    PyObject *y_array = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, y);
-    PyObject *yp_array = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, yp);
+void pside_solout(F_INT *iter, F_INT *neqn, double *t, double *y, double *yp,
+                  double *rpar, F_INT *ipar, F_INT *irtrn)
+{
+    pside_params *params = (pside_params *) rpar;
 
-    PyList_Append(global_pside_params.y_sol, PyArray_NewCopy(y_array, NPY_ANYORDER));
-    PyList_Append(global_pside_params.yp_sol, PyArray_NewCopy(yp_array, NPY_ANYORDER));
+    // interrupt the integration if a callback failed
+    if (params->error) {
+        *irtrn = -1;
+        return;
+    }
 
-    Py_XDECREF(y_array);
-    Py_XDECREF(yp_array);
+    // no Python objects are involved, hence the GIL is not required
+    if (pside_store(params, *t, y, yp) < 0) {
+        params->error = DAE_ERROR_MEMORY;
+        *irtrn = -1;
+    }
 }
 
 static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
@@ -143,6 +280,7 @@ static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
     PyObject *t_span_obj = NULL;
     PyObject *y0_obj = NULL;
     PyObject *yp0_obj = NULL;
+    PyObject *result = NULL;
     PyArrayObject *y_array = NULL;
     PyArrayObject *yp_array = NULL;
 
@@ -152,60 +290,79 @@ static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
     double *y, *yp;
 
     int neqn;
-    int jnum; 
-    int mnum; 
-
-    int IND;
+    int jnum;
+    int mnum;
+    int ml = -1;
+    int mu = -1;
+    int nl, nu;
+    int banded;
+
+    int IND = 0; // not referenced since IWORK(2) = 0
     int lrwork;
     int liwork;
-    double *rwork;
-    int *iwork;
+    double *rwork = NULL;
+    int *iwork = NULL;
+
+    pside_params params = {{NULL}, {NULL}, {NULL}, {NULL}, {NULL}, {NULL}, 0};
+    double *rpar = (double *) &params;
+    int *ipar = NULL;
+    int idid = 0;
+    int locked = 0;
 
-    double *rpar;
-    int *ipar;
-    int idid;
+    // solution storage
+    Py_ssize_t store_every = 1;
+    int store_last_only = 0;
 
     // parse inputs
     static char *kwlist[] = {"f", "t_span", "y0", "yp0", // mandatory arguments
-                             "rtol", "atol", "J", "M", NULL}; // optional arguments and NULL termination
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOO", kwlist, 
+                             "rtol", "atol", "J", "M", // optional arguments
+                             "lband", "uband", // bandwidths
+                             "store_every", "store_last_only", NULL}; // storage options and NULL termination
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOOO&O&np", kwlist,
                                      &f_obj, &t_span_obj, &y0_obj, &yp0_obj, // positional arguments
-                                     &rtol, &atol, &J_obj, &M_obj)) // optional arguments
+                                     &rtol, &atol, &J_obj, &M_obj, // optional arguments
+                                     dae_bandwidth_converter, &ml, dae_bandwidth_converter, &mu, // bandwidths
+                                     &store_every, &store_last_only)) // storage options
         return NULL;
 
-    // check if function and Jacobians (if present) are callable
-    if (!PyCallable_Check(f_obj)) {
-        PyErr_SetString(PyExc_ValueError, "`f` must be a callable function.");
+    if (store_every < 1) {
+        PyErr_SetString(PyExc_ValueError, "`store_every` must be a positive integer.");
+        goto fail;
+    }
+
+    // check if function (Python or native) and Jacobians (if present) are callable
+    if (dae_callback_prepare(&params.f, f_obj, "f", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+        goto fail;
     }
     if (J_obj != Py_None) {
-        if (!PyCallable_Check(J_obj)) {
-            PyErr_SetString(PyExc_ValueError, "`J` must be a callable function.");
+        if (dae_callback_prepare(&params.J, J_obj, "J", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+            goto fail;
         }
         jnum = 0;
-        PyErr_SetString(PyExc_ValueError, "User-defined Jacobian `J` is not implemented yet.");
     } else {
-        jnum = 1; 
+        jnum = 1;
     }
     if (M_obj != Py_None) {
-        if (!PyCallable_Check(M_obj)) {
-            PyErr_SetString(PyExc_ValueError, "`M` must be a callable function.");
+        if (dae_callback_prepare(&params.M, M_obj, "M", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+            goto fail;
         }
         mnum = 0;
-        PyErr_SetString(PyExc_ValueError, "User-defined Jacobian `M` is not implemented yet.");
     } else {
-        mnum = 1; 
+        mnum = 1;
     }
 
     // unpack t_span tuple
-    PyArg_ParseTuple(t_span_obj, "dd", &t0, &t1);
+    if (!PyArg_ParseTuple(t_span_obj, "dd", &t0, &t1)) {
+        goto fail;
+    }
     if (!(t1 > t0)) {
         PyErr_SetString(PyExc_ValueError, "`t1` must larger than `t0`.");
+        goto fail;
     }
 
-    // initial conditions
-    y_array = (PyArrayObject *) PyArray_ContiguousFromObject(y0_obj, NPY_DOUBLE, 0, 0);
+    // initial conditions (copied, since they are overwritten during integration)
+    y_array = (PyArrayObject *) PyArray_FROM_OTF(y0_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
     if (y_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(y0_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(y_array) > 1) {
@@ -215,9 +372,8 @@ static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
     y = (double *) PyArray_DATA(y_array);
     neqn = PyArray_Size((PyObject *) y_array);
 
-    yp_array = (PyArrayObject *) PyArray_ContiguousFromObject(yp0_obj, NPY_DOUBLE, 0, 0);
+    yp_array = (PyArrayObject *) PyArray_FROM_OTF(yp0_obj, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY | NPY_ARRAY_ENSURECOPY);
     if (yp_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(yp0_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(yp_array) > 1) {
@@ -231,74 +387,84 @@ static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
     }
 
     // initialize iwork and rwork
-    lrwork = 20 + 27 * neqn + 6 * pow(neqn, 2);
+    // full or banded partial derivatives, M has the bandwidths of J
+    banded = dae_bandwidth_check(&ml, &mu, neqn);
+    if (banded < 0) {
+        goto fail;
+    }
+    if (banded) {
+        nl = ml;
+        nu = mu;
+        lrwork = 20 + (27 + 2 * (ml + mu) + 2 + 4 * (2 * ml + mu + 1)) * neqn;
+    } else {
+        nl = neqn;
+        nu = neqn;
+        lrwork = 20 + 27 * neqn + 6 * pow(neqn, 2);
+    }
     liwork = 20 + 4 * neqn;
 
-    rwork = malloc(lrwork * sizeof(double));
-    iwork = malloc(liwork * sizeof(int));
+    rwork = calloc(lrwork, sizeof(double));
+    iwork = calloc(liwork, sizeof(int));
+    if (rwork == NULL || iwork == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
 
-    for (int i=0; i<20; i++) {
-        iwork[i] = 0;
-        rwork[i] = 0.0;
+    // allocate solution storage
+    if (dae_buffer_init(&params.t_sol, 1, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0
+        || dae_buffer_init(&params.y_sol, neqn, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0
+        || dae_buffer_init(&params.yp_sol, neqn, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0) {
+        PyErr_NoMemory();
+        goto fail;
     }
 
-    // set global_pside_params
-    global_pside_params.python_function = f_obj;
-    global_pside_params.t_sol = PyList_New(0);
-    global_pside_params.y_sol = PyList_New(0);
-    global_pside_params.yp_sol = PyList_New(0);
+    // store initial state
+    if (pside_store(&params, t0, y, yp) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
 
-    // store initial state in solution lists
-    global_pside_params.nt = 1;
-    PyList_Append(global_pside_params.t_sol, PyFloat_FromDouble(t0));
-    PyList_Append(global_pside_params.y_sol, PyArray_NewCopy(y_array, NPY_ANYORDER));
-    PyList_Append(global_pside_params.yp_sol, PyArray_NewCopy(yp_array, NPY_ANYORDER));
+    // acquire the lock without holding the GIL
+    if (pside_lock == NULL) {
+        pside_lock = PyThread_allocate_lock();
+        if (pside_lock == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "Failed to allocate lock.");
+            goto fail;
+        }
+    }
+    if (pside_lock_owner == PyThread_get_thread_ident()) {
+        PyErr_SetString(PyExc_RuntimeError, "Nested calls of pside are not supported.");
+        goto fail;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(pside_lock, WAIT_LOCK);
+    Py_END_ALLOW_THREADS
+    pside_lock_owner = PyThread_get_thread_ident();
+    locked = 1;
 
     // call pside solver
-    PSIDE(&neqn, y, yp, pside_f, 
-        &jnum, &neqn, &neqn, pside_J, 
-        &mnum, &neqn, &neqn, pside_M, 
+    Py_BEGIN_ALLOW_THREADS
+    PSIDE(&neqn, y, yp, pside_f,
+        &jnum, &nl, &nu, pside_J,
+        &mnum, &nl, &nu, pside_M,
         &t0, &t1, &rtol, &atol, &IND,
-        &lrwork, rwork, &liwork, iwork, 
+        &lrwork, rwork, &liwork, iwork,
         rpar, ipar, &idid, pside_solout);
+    Py_END_ALLOW_THREADS
 
-    // cleanup
-    free(rwork);
-    free(iwork);
-    Py_XDECREF(f_obj);
-    Py_XDECREF(t_span_obj);
-    Py_XDECREF(y0_obj);
-    Py_XDECREF(yp0_obj);
-    Py_XDECREF(y_array);
-    Py_XDECREF(yp_array);
-    
-    return Py_BuildValue(
-        "{s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
-        "success", Py_True,
-        "t", PyArray_Return(PyArray_FromAny(
-                                global_pside_params.t_sol,    // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
-        "y", PyArray_Return(PyArray_FromAny(
-                                global_pside_params.y_sol,    // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
-        "yp", PyArray_Return(PyArray_FromAny(
-                                global_pside_params.yp_sol,   // Input object
-                                NULL,                   // Desired data type (None means let NumPy decide)
-                                0,                      // Minimum number of dimensions
-                                0,                      // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,      // Flags
-                                NULL)                   // Array description (NULL means default)
-                            ),
+    if (params.error) {
+        dae_set_error(params.error);
+        goto fail;
+    }
+
+    result = Py_BuildValue(
+        "{s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
+        "success", PyBool_FromLong(idid == 1),
+        "t", dae_buffer_to_array(&params.t_sol, 1),
+        "y", dae_buffer_to_array(&params.y_sol, 2),
+        "yp", dae_buffer_to_array(&params.yp_sol, 2),
+        "idid", idid, // IDID reported by PSIDE
+        "nfev", params.nfev, // number of calls of f
         "ncalls", iwork[9], // IWORK(10) number of successive PSIDE calls
         "nf", iwork[10], // IWORK(11) number of function evaluations
         "njac", iwork[11], // IWORK(12) number of jacobian evaluations
@@ -310,14 +476,21 @@ static PyObject* pside(PyObject *self, PyObject *args, PyObject *kwargs)
         "nrejgroth", iwork[17] // IWORK(18) rejected steps due to excessive growth of solution
     );
 
+    // cleanup (only objects owned by this function are released)
     fail:
+        if (locked) {
+            pside_lock_owner = 0;
+            PyThread_release_lock(pside_lock);
+        }
         free(rwork);
         free(iwork);
-        Py_XDECREF(f_obj);
-        Py_XDECREF(t_span_obj);
-        Py_XDECREF(y0_obj);
-        Py_XDECREF(yp0_obj);
+        dae_callback_release(&params.f);
+        dae_callback_release(&params.J);
+        dae_callback_release(&params.M);
         Py_XDECREF(y_array);
         Py_XDECREF(yp_array);
-        return NULL;
+        dae_buffer_free(&params.t_sol);
+        dae_buffer_free(&params.y_sol);
+        dae_buffer_free(&params.yp_sol);
+        return result;
 }
@@ -336,6 +336,9 @@ C     - if IDID .EQ. -2 then something else went wrong.
 C       For example this happens when the input was invalid.  An error
 C       message will be printed.
 C
+C     - if IDID .EQ. -3 then the integration was interrupted by
+C       SOLOUT(NST,NEQN,T,Y,DY,RPAR,IPAR,IRTRN) returning IRTRN < 0.
+C
 C Acknowledgements
 C ================
 C
@@ -831,7 +834,7 @@ CF90 +              AUXS2,AUXS3,IDID
 C-----------------------------------------------------------------------
 C     this is the core integrator called by PSIDE
 C-----------------------------------------------------------------------
-      INTEGER KN,KS,IERR
+      INTEGER KN,KS,IERR,IRTRN
       DOUBLE PRECISION HP,HLU,ALPHA,COMPH0
       LOGICAL FIRST,GROWTH,DIVER,SLOW,SOLVED,EXACT,JACNEW,FACNEW,JACU2D
       IF (H.LE.0D0) H=COMPH0(NEQN,DY,T,TEND,TOLVEC,RTOL,ATOL,INDGT1,IND)
@@ -867,7 +870,12 @@ C-----------------------------------------------------------------------
      +             FIRST,JACNEW,FACNEW,JACU2D,IDID)
          IF (IDID.NE.1) GOTO 40
          NST = NST + 1
-         call SOLOUT(NST,NEQN,T,Y,DY)
+         IRTRN = 0
+         CALL SOLOUT(NST,NEQN,T,Y,DY,RPAR,IPAR,IRTRN)
+         IF (IRTRN.LT.0) THEN
+            IDID = -3
+            GOTO 40
+         ENDIF
          GOTO 30
       ENDIF
    40 RETURN
@@ -1,6 +1,10 @@
 #include <Python.h>
+#include <pythread.h>
 #define NPY_NO_DEPRECATED_API NPY_1_9_API_VERSION
 #include "numpy/arrayobject.h"
+#include "numpy/npy_math.h"
+#include "../buffer.h"
+#include "../callback.h"
 
 #ifdef HAVE_BLAS_ILP64
 #define F_INT npy_int64
@@ -10,14 +14,33 @@
 #define F_INT_NPY NPY_INT
 #endif
 
-typedef struct _radau_globals {
-    PyObject *python_function;
-    PyObject *t_sol;
-    PyObject *y_sol;
-    PyObject *yp_sol;
+// continuous output function CONTRA or CONTR5 of the last accepted step
+typedef double radau_contr_t(F_INT *i, double *x, double *cont, F_INT *lrc);
+
+// Per-call context that is passed to the callbacks through rpar.
+typedef struct _radau_params {
+    dae_callback f;
+    dae_callback J;
+    int ml; // bandwidths of dF/dy and dF/dy', ml < 0 for full matrices
+    int mu;
+    dae_buffer t_sol;
+    dae_buffer y_sol;
+    dae_buffer yp_sol;
+    int error; // reason for interrupting the integration (DAE_ERROR_*)
+    int nfev; // number of residual evaluations, including finite differences
+    // dense output at t_eval, evaluated by CONTRA or CONTR5 in solout
+    radau_contr_t *contr;
+    const double *t_eval;
+    npy_intp nt_eval;
+    npy_intp i_eval; // next point of t_eval that has to be evaluated
+    double *y_eval;
+    double *yp_eval;
 } radau_params;
 
-static radau_params global_radau_params = {NULL, NULL, NULL, NULL};
+// RADAU and RADAU5 share data through COMMON blocks (e.g. /LINAL/), hence
+// calls of different threads are serialized and nested calls are rejected.
+static PyThread_type_lock radau_lock = NULL;
+static unsigned long radau_lock_owner = 0;
 
 #if defined(UPPERCASE_FORTRAN)
     #if defined(NO_APPEND_FORTRAN)
@@ -25,21 +48,27 @@ static radau_params global_radau_params = {NULL, NULL, NULL, NULL};
     #else
         #define RADAU5  RADAU5_
         #define RADAU  RADAU_
+        #define CONTR5  CONTR5_
+        #define CONTRA  CONTRA_
     #endif
 #else
     #if defined(NO_APPEND_FORTRAN)
         #define RADAU5  radau5
         #define RADAU  radau
+        #define CONTR5  contr5
+        #define CONTRA  contra
     #else
         #define RADAU5  radau5_
         #define RADAU  radau_
+        #define CONTR5  contr5_
+        #define CONTRA  contra_
     #endif
 #endif
 
 typedef void radau_f_t(F_INT *neq, double *t, double *y, 
                        double *f, double *rpar, F_INT *ipar);
-typedef void radau_jac_t(double *t, double *y, double *ydot, 
-                         double *J, double* cj, 
+typedef void radau_jac_t(F_INT *neq, double *t, double *y, 
+                         double *dfy, F_INT *ldfy, 
                          double *rpar, F_INT *ipar);
 typedef void radau_mas_t(F_INT *neq, double *am, F_INT *lmas,
                          double *rpar, F_INT *ipar);
@@ -62,6 +91,8 @@ typedef void radau_t(F_INT *neq, radau_f_t *f, double *t,
 
 radau_t RADAU;
 radau_t RADAU5;
+radau_contr_t CONTRA;
+radau_contr_t CONTR5;
 
 // f(t, y) = [
 //  u' = v
@@ -70,13 +101,13 @@ radau_t RADAU5;
 void radau_f(F_INT *neqn, double *t, double *y, 
             double *f, double *rpar, F_INT *ipar)
 {
+    radau_params *params = (radau_params *) rpar;
+
     // python objects
     PyObject *u_obj = NULL;
     PyObject *v_obj = NULL;
     PyObject *result = NULL;
     PyObject *arglist = NULL;
-    PyArrayObject *u_array = NULL;
-    PyArrayObject *v_array = NULL;
     PyArrayObject *result_array = NULL;
 
     // dimension of implicit differential equation since y = (u, v)
@@ -88,15 +119,34 @@ void radau_f(F_INT *neqn, double *t, double *y,
     double *u = y;
     double *v = y + n;
 
+    // RADAU has no error flag for f, hence a failed evaluation returns zeros
+    // and the integration is interrupted in the next call of solout
+    if (params->error) {
+        memset(f, 0, (*neqn) * sizeof(double));
+        return;
+    }
+    params->nfev += 1;
+
+    // native residuals are evaluated without the GIL
+    if (params->f.function != NULL) {
+        memcpy(f, v, n * sizeof(double));
+        if (dae_callback_native_f(&params->f, n, *t, u, v, f + n) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+            memset(f, 0, (*neqn) * sizeof(double));
+        }
+        return;
+    }
+
+    // the GIL is released during the integration
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
     /* Build numpy arrays from u and v. */
     u_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u);
     if (u_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u) failed.");
         goto fail;
     }
     v_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v);
     if (v_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v) failed.");
         goto fail;
     }
 
@@ -108,84 +158,64 @@ void radau_f(F_INT *neqn, double *t, double *y,
         v_obj
     );
     if (arglist == NULL) {
-        PyErr_SetString(PyExc_ValueError, "Py_BuildValue failed.");
         goto fail;
     }
 
     /* Call the Python function. */
-    result = PyObject_CallObject(global_radau_params.python_function, arglist);
+    result = PyObject_CallObject(params->f.python_function, arglist);
     if (result == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyObject_CallObject(global_radau_params.python_function, arglist) failed.");
         goto fail;
     }
 
-    /* Build numpy array from u, v and result. */
-    u_array = (PyArrayObject *) PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0);
-    if (u_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0) failed.");
-        goto fail;
-    }
-    v_array = (PyArrayObject *) PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0);
-    if (v_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0) failed.");
-        goto fail;
-    }
+    /* Build numpy array from result. */
     result_array = (PyArrayObject *) PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0);
     if (result_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(result, NPY_DOUBLE, 0, 0) failed.");
+        goto fail;
+    }
+    if (PyArray_Size((PyObject *) result_array) != n) {
+        PyErr_SetString(PyExc_ValueError, "`f` must return an array of the same size as y0.");
         goto fail;
     }
 
-    /* Copy data from the result array to C array. */
+    /* Copy data to C array. */
     // u' = v
     // 0 = f(t, u, v)
-    memcpy(f, PyArray_DATA(v_array), PyArray_NBYTES(v_array));
+    memcpy(f, v, n * sizeof(double));
     memcpy(f + n, PyArray_DATA(result_array), PyArray_NBYTES(result_array));
-    // double *res = (double *) PyArray_DATA(result_array);
-    // for (int i = 0; i < n; i++) {
-    //     f[i] = v[i];
-    //     f[i + n] = res[i];
-    // }
+    goto done;
 
     fail:
+        params->error = DAE_ERROR_PYTHON;
+        memset(f, 0, (*neqn) * sizeof(double));
+
+    done:
         Py_XDECREF(u_obj);
         Py_XDECREF(v_obj);
         Py_XDECREF(result);
         Py_XDECREF(arglist);
-        Py_XDECREF(v_array);
-        Py_XDECREF(u_array);
         Py_XDECREF(result_array);
+        PyGILState_Release(gstate);
         return;
 }
 
+// Since IWORK(9) = M1 = n, only the rows n + 1, ..., 2n of the Jacobian of
+// y = (u, v) -> (v, F(t, u, v)) are required, the identity block of u' = v
+// is known to RADAU. Hence, dfy stores the two blocks [dF/du, dF/dv] of
+// shape (n, n) side by side with leading dimension ldfy, either full or in
+// the band storage dfy(i - j + mu + 1, j + k * n) of each block k.
 void radau_jac(F_INT *neqn, double *t, double *y, double *dfy, 
-               F_INT *ldfym, double *rpar, F_INT *ipar){}
-
-void radau_mas(F_INT *neqn, double *am, F_INT *lmas,
-               double *rpar, F_INT *ipar) {
-    int n = (*neqn) / 2;
-
-    // banded
-    for (int j = 0; j < (*neqn); j++) {
-        if (j < n) {
-            am[j] = 1.0;
-        } else {
-            am[j] = 0.0;
-        }
-    }
-}
-
-void radau_solout(F_INT *nr, double *told, double *t, double *y, 
-                  double *contr, F_INT *lrc, F_INT *neqn,
-                  double *rpar, F_INT *ipar, F_INT *itrn) {
+               F_INT *ldfy, double *rpar, F_INT *ipar)
+{
+    radau_params *params = (radau_params *) rpar;
 
+    // python objects
     PyObject *u_obj = NULL;
     PyObject *v_obj = NULL;
-    PyArrayObject *u_array = NULL;
-    PyArrayObject *v_array = NULL;
+    PyObject *result = NULL;
+    PyObject *arglist = NULL;
 
-    // dimension of implicit differential equation since y = (u, v)
     F_INT n = (*neqn) / 2;
+    F_INT ld = *ldfy;
     npy_intp dims[1];
     dims[0] = n;
 
@@ -193,61 +223,168 @@ void radau_solout(F_INT *nr, double *told, double *t, double *y,
     double *u = y;
     double *v = y + n;
 
+    // RADAU has no error flag for jac, the next call of solout interrupts
+    // the integration if a previous callback failed
+    if (params->error) {
+        memset(dfy, 0, ld * (*neqn) * sizeof(double));
+        return;
+    }
+
+    // native partial derivatives are evaluated without the GIL
+    if (params->J.function != NULL) {
+        if (dae_callback_native_f(&params->J, n, *t, u, v, dfy) != 0) {
+            params->error = DAE_ERROR_NATIVE;
+        }
+        return;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+
     /* Build numpy arrays from u and v. */
     u_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u);
     if (u_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u) failed.");
         goto fail;
     }
     v_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v);
     if (v_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v) failed.");
         goto fail;
     }
-    u_array = (PyArrayObject *) PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0);
-    if (u_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0) failed.");
+
+    /* Build argument list. */
+    arglist = Py_BuildValue(
+        "dOO",
+        *t,
+        u_obj,
+        v_obj
+    );
+    if (arglist == NULL) {
         goto fail;
     }
-    v_array = (PyArrayObject *) PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0);
-    if (v_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0) failed.");
+
+    /* Call the Python function and copy both partial derivatives. */
+    result = PyObject_CallObject(params->J.python_function, arglist);
+    if (result == NULL) {
         goto fail;
     }
-
-    PyList_Append(global_radau_params.t_sol, PyFloat_FromDouble(*t));
-    PyList_Append(global_radau_params.y_sol, PyArray_NewCopy(u_array, NPY_ANYORDER));
-    PyList_Append(global_radau_params.yp_sol, PyArray_NewCopy(v_array, NPY_ANYORDER));
+    if (!PyTuple_Check(result) || PyTuple_GET_SIZE(result) != 2) {
+        PyErr_SetString(PyExc_ValueError, "`J` must return a tuple (dF/dy, dF/dyp).");
+        goto fail;
+    }
+    for (int k = 0; k < 2; k++) {
+        PyObject *block = PyTuple_GET_ITEM(result, k);
+        double *out = dfy + k * n * ld;
+        if (params->ml < 0) {
+            if (dae_copy_matrix(block, "J", n, out, ld) < 0) {
+                goto fail;
+            }
+        } else {
+            if (dae_copy_band(block, "J", n, params->ml, params->mu, out, ld, params->mu) < 0) {
+                goto fail;
+            }
+        }
+    }
+    goto done;
 
     fail:
+        params->error = DAE_ERROR_PYTHON;
+        memset(dfy, 0, ld * (*neqn) * sizeof(double));
+
+    done:
         Py_XDECREF(u_obj);
         Py_XDECREF(v_obj);
-        Py_XDECREF(v_array);
-        Py_XDECREF(u_array);
+        Py_XDECREF(result);
+        Py_XDECREF(arglist);
+        PyGILState_Release(gstate);
         return;
 }
 
+// Since IWORK(9) = M1 = n, only the lower right block of the mass matrix
+// diag(I, 0) has to be given, which is zero. It is stored as a banded
+// matrix with MLMAS = MUMAS = 0, i.e., am has the shape (1, neqn).
+void radau_mas(F_INT *neqn, double *am, F_INT *lmas,
+               double *rpar, F_INT *ipar) {
+    memset(am, 0, (*lmas) * (*neqn) * sizeof(double));
+}
+
+// store the current state y = (u, v), returns -1 if allocation failed
+static int radau_store(radau_params *params, double t, double *y, F_INT n) {
+    if (dae_buffer_store(&params->t_sol, &t) < 0
+        || dae_buffer_store(&params->y_sol, y) < 0
+        || dae_buffer_store(&params->yp_sol, y + n) < 0) {
+        return -1;
+    }
+    return 0;
+}
+
+// Evaluate all points of t_eval that are reached by the step from told to
+// t. The collocation polynomial of y = (u, v) gives u in its first n and
+// u' = v in its last n components. In the first call (nr = 1), no step has
+// been made yet and the initial values are used.
+static void radau_dense_output(radau_params *params, F_INT nr, double t, double *y,
+                               double *contr, F_INT *lrc, F_INT n) {
+    while (params->i_eval < params->nt_eval && params->t_eval[params->i_eval] <= t) {
+        double x = params->t_eval[params->i_eval];
+        double *y_eval = params->y_eval + params->i_eval * n;
+        double *yp_eval = params->yp_eval + params->i_eval * n;
+
+        if (nr == 1 || x == t) {
+            memcpy(y_eval, y, n * sizeof(double));
+            memcpy(yp_eval, y + n, n * sizeof(double));
+        } else {
+            for (F_INT i = 1; i <= n; i++) {
+                F_INT j = i + n;
+                y_eval[i - 1] = params->contr(&i, &x, contr, lrc);
+                yp_eval[i - 1] = params->contr(&j, &x, contr, lrc);
+            }
+        }
+        params->i_eval += 1;
+    }
+}
+
+void radau_solout(F_INT *nr, double *told, double *t, double *y, 
+                  double *contr, F_INT *lrc, F_INT *neqn,
+                  double *rpar, F_INT *ipar, F_INT *irtrn) {
+    radau_params *params = (radau_params *) rpar;
+
+    // interrupt the integration if a callback failed
+    if (params->error) {
+        *irtrn = -1;
+        return;
+    }
+
+    // no Python objects are involved, hence the GIL is not required
+    if (radau_store(params, *t, y, (*neqn) / 2) < 0) {
+        params->error = DAE_ERROR_MEMORY;
+        *irtrn = -1;
+        return;
+    }
+    radau_dense_output(params, *nr, *t, y, contr, lrc, (*neqn) / 2);
+}
+
 // TODO:
-// - add dense output for solout
 // - add possibility for index 2 and 3 varibles to iwork
 // - allow for more options in iwork
-static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs, radau_t *radau_)
+static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs,
+                            radau_t *radau_, radau_contr_t *contr)
 {
     PyObject *f_obj = NULL;
     PyObject *J_obj = Py_None;
+    PyObject *t_eval_obj = Py_None;
     PyObject *t_span_obj = NULL;
     PyObject *u_obj = NULL;
     PyObject *v_obj = NULL;
+    PyObject *result = NULL;
     PyArrayObject *u_array = NULL;
     PyArrayObject *v_array = NULL;
+    PyArrayObject *t_eval_array = NULL;
+    PyArrayObject *y_eval_array = NULL;
+    PyArrayObject *yp_eval_array = NULL;
 
     double rtol = 1.0e-3;
     double atol = 1.0e-6;
     double h = 1e-3;
     double t, t1;
-    double *u, *v, *y;
-
-    int success;
+    double *y = NULL;
 
     int n;
     int neqn;
@@ -256,6 +393,10 @@ static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs, ra
     int ijac;
     int mljac;
     int mujac;
+    int ml = -1;
+    int mu = -1;
+    int banded;
+    int ljac, le;
     
     int imas;
     int mlmas;
@@ -265,145 +406,192 @@ static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs, ra
 
     int lrwork;
     int liwork;
-    double *rwork;
-    int *iwork;
+    double *rwork = NULL;
+    int *iwork = NULL;
 
-    double *rpar;
-    int *ipar;
-    int idid;
+    radau_params params = {{NULL}, {NULL}, -1, -1, {NULL}, {NULL}, {NULL}, 0};
+    double *rpar = (double *) &params;
+    int *ipar = NULL;
+    int idid = 0;
+    int locked = 0;
+
+    // solution storage
+    Py_ssize_t store_every = 1;
+    int store_last_only = 0;
 
     // parse inputs
     static char *kwlist[] = {"f", "t_span", "y0", "yp0", // mandatory arguments
-                             "rtol", "atol", "J", NULL}; // optional arguments and NULL termination
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOOO", kwlist, 
+                             "rtol", "atol", "J", "t_eval", // optional arguments
+                             "lband", "uband", // bandwidths
+                             "store_every", "store_last_only", NULL}; // storage options and NULL termination
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOOO|ddOOO&O&np", kwlist, 
                                      &f_obj, &t_span_obj, &u_obj, &v_obj, // positional arguments
-                                     &rtol, &atol, &J_obj)) // optional arguments
+                                     &rtol, &atol, &J_obj, &t_eval_obj, // optional arguments
+                                     dae_bandwidth_converter, &ml, dae_bandwidth_converter, &mu, // bandwidths
+                                     &store_every, &store_last_only)) // storage options
         return NULL;
 
-    // check if function and Jacobians (if present) are callable
-    if (!PyCallable_Check(f_obj)) {
-        PyErr_SetString(PyExc_ValueError, "`f` must be a callable function.");
+    if (store_every < 1) {
+        PyErr_SetString(PyExc_ValueError, "`store_every` must be a positive integer.");
+        goto fail;
+    }
+
+    // check if function (Python or native) and Jacobians (if present) are callable
+    if (dae_callback_prepare(&params.f, f_obj, "f", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+        goto fail;
     }
     if (J_obj != Py_None) {
-        if (!PyCallable_Check(J_obj)) {
-            PyErr_SetString(PyExc_ValueError, "`J` must be a callable function.");
+        if (dae_callback_prepare(&params.J, J_obj, "J", DAE_F_SIGNATURE_DATA, DAE_F_SIGNATURE) < 0) {
+            goto fail;
         }
         ijac = 1;
-        PyErr_SetString(PyExc_ValueError, "User-defined Jacobian `J` is not implemented yet.");
     } else {
         ijac = 0; 
     }
 
     // unpack t_span tuple
-    PyArg_ParseTuple(t_span_obj, "dd", &t, &t1);
+    if (!PyArg_ParseTuple(t_span_obj, "dd", &t, &t1)) {
+        goto fail;
+    }
     if (!(t1 > t)) {
         PyErr_SetString(PyExc_ValueError, "`t1` must larger than `t0`.");
+        goto fail;
+    }
+
+    // sorted evaluation points for dense output
+    if (t_eval_obj != Py_None) {
+        t_eval_array = (PyArrayObject *) PyArray_ContiguousFromObject(t_eval_obj, NPY_DOUBLE, 1, 1);
+        if (t_eval_array == NULL) {
+            goto fail;
+        }
+        params.t_eval = (double *) PyArray_DATA(t_eval_array);
+        params.nt_eval = PyArray_Size((PyObject *) t_eval_array);
+        for (npy_intp i = 0; i < params.nt_eval; i++) {
+            if (!(params.t_eval[i] >= t && params.t_eval[i] <= t1)
+                || (i > 0 && params.t_eval[i] < params.t_eval[i - 1])) {
+                PyErr_SetString(PyExc_ValueError, "`t_eval` must be sorted and lie within `t_span`.");
+                goto fail;
+            }
+        }
+        params.contr = contr;
     }
 
     // initial conditions
     u_array = (PyArrayObject *) PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0);
     if (u_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(u_array) > 1) {
         PyErr_SetString(PyExc_ValueError, "Initial condition y0 must be one-dimensional.");
         goto fail;
     }
-    u = (double *) PyArray_DATA(u_array);
     n = PyArray_Size((PyObject *) u_array);
     neqn = 2 * n;
 
     v_array = (PyArrayObject *) PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0);
     if (v_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0) failed");
         goto fail;
     }
     if (PyArray_NDIM(v_array) > 1) {
         PyErr_SetString(PyExc_ValueError, "Initial condition yp0 must be one-dimensional.");
         goto fail;
     }
-    v = (double *) PyArray_DATA(v_array);
     if (!(n == PyArray_Size((PyObject *) v_array))) {
         PyErr_SetString(PyExc_ValueError, "Size of y0 and yp0 have to coincide.");
         goto fail;
     }
 
-    // allocate state array and fill with initial conditions
-    y = malloc(neqn * sizeof(double));
-    memcpy(y, PyArray_DATA(u_array), PyArray_NBYTES(u_array));
-    memcpy(y + n, PyArray_DATA(v_array), PyArray_NBYTES(v_array));
-
-    // decompose y = (u, v)
-    u = y;
-    v = y + n;
-
-    /* Build numpy arrays from u and v. */
-    npy_intp dims[1];
-    dims[0] = n;
-
-    u_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u);
-    if (u_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, u) failed.");
+    // full or banded jacobian, for the second order system only the
+    // blocks df/du and df/dv of size n have to be banded
+    banded = dae_bandwidth_check(&ml, &mu, n);
+    if (banded < 0) {
         goto fail;
     }
-    v_obj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v);
-    if (v_obj == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, v) failed.");
-        goto fail;
+    if (banded) {
+        mljac = ml;
+        mujac = mu;
+        ljac = ml + mu + 1;
+        le = 2 * ml + mu + 1;
+        params.ml = ml;
+        params.mu = mu;
+    } else {
+        mljac = neqn;
+        mujac = neqn;
+        ljac = n;
+        le = n;
     }
 
-    u_array = (PyArrayObject *) PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0);
-    if (u_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(u_obj, NPY_DOUBLE, 0, 0) failed");
-        goto fail;
-    }
-    v_array = (PyArrayObject *) PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0);
-    if (v_array == NULL) {
-        PyErr_SetString(PyExc_ValueError, "PyArray_ContiguousFromObject(v_obj, NPY_DOUBLE, 0, 0) failed");
+    // initialize iwork and rwork for at most 7 stages and M1 = n
+    lrwork = neqn * (ljac + 3 * 7 + 3) + n * (1 + 7 * le) + 20;
+    liwork = (2 + (7 - 1) / 2) * neqn + 20;
+
+    // allocate state array and fill with initial conditions y = (u, v)
+    y = malloc(neqn * sizeof(double));
+    rwork = calloc(lrwork, sizeof(double));
+    iwork = calloc(liwork, sizeof(int));
+    if (y == NULL || rwork == NULL || iwork == NULL) {
+        PyErr_NoMemory();
         goto fail;
     }
+    memcpy(y, PyArray_DATA(u_array), PyArray_NBYTES(u_array));
+    memcpy(y + n, PyArray_DATA(v_array), PyArray_NBYTES(v_array));
 
-    // initialize iwork and rwork
-    lrwork = 20 + neqn * (neqn + 1 + 7 * neqn + 3 * 7 + 3);
-    liwork = 3 * neqn + 20;
-
-    rwork = malloc(lrwork * sizeof(double));
-    iwork = malloc(liwork * sizeof(int));
-
-    for (int i=0; i<liwork; i++) {
-        iwork[i] = 0;
-    }
-    for (int i=0; i<lrwork; i++) {
-        rwork[i] = 0.0;
+    // preallocated dense output, points that are not reached remain NaN
+    if (t_eval_array != NULL) {
+        npy_intp dims[2] = {params.nt_eval, n};
+        y_eval_array = (PyArrayObject *) PyArray_SimpleNew(2, dims, NPY_DOUBLE);
+        yp_eval_array = (PyArrayObject *) PyArray_SimpleNew(2, dims, NPY_DOUBLE);
+        if (y_eval_array == NULL || yp_eval_array == NULL) {
+            goto fail;
+        }
+        params.y_eval = (double *) PyArray_DATA(y_eval_array);
+        params.yp_eval = (double *) PyArray_DATA(yp_eval_array);
+        for (npy_intp i = 0; i < params.nt_eval * n; i++) {
+            params.y_eval[i] = NPY_NAN;
+            params.yp_eval[i] = NPY_NAN;
+        }
     }
 
-    // second order system
+    // second order system, the linear algebra of RADAU is reduced to
+    // systems of dimension n and only [dF/du, dF/dv] is required, see
+    // radau_jac, otherwise they are approximated by 2n evaluations of F
     iwork[8] = n;
     iwork[9] = n;
 
-    // full jacobian with finite differences
-    ijac = 0;
-    mljac = neqn;
-    mujac = neqn;
-    
-    // banded user-defined jacobian
+    // mass matrix, see radau_mas
     imas = 1;
-    mlmas = 1;
-    mumas = 1;
-
-    // set global parameters
-    global_radau_params.python_function = f_obj;
+    mlmas = 0;
+    mumas = 0;
+
+    // allocate solution storage and start with initial values
+    if (dae_buffer_init(&params.t_sol, 1, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0
+        || dae_buffer_init(&params.y_sol, n, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0
+        || dae_buffer_init(&params.yp_sol, n, NPY_DOUBLE, sizeof(double), DAE_BUFFER_CAPACITY, store_every, store_last_only) < 0
+        || radau_store(&params, t, y, n) < 0) {
+        PyErr_NoMemory();
+        goto fail;
+    }
 
-    // store solution in python list and start with initial values
-    global_radau_params.t_sol = PyList_New(0);
-    global_radau_params.y_sol = PyList_New(0);
-    global_radau_params.yp_sol = PyList_New(0);
-    PyList_Append(global_radau_params.t_sol, PyFloat_FromDouble(t));
-    PyList_Append(global_radau_params.y_sol, PyArray_NewCopy(u_array, NPY_ANYORDER));
-    PyList_Append(global_radau_params.yp_sol, PyArray_NewCopy(v_array, NPY_ANYORDER));
+    // acquire the lock without holding the GIL
+    if (radau_lock == NULL) {
+        radau_lock = PyThread_allocate_lock();
+        if (radau_lock == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "Failed to allocate lock.");
+            goto fail;
+        }
+    }
+    if (radau_lock_owner == PyThread_get_thread_ident()) {
+        PyErr_SetString(PyExc_RuntimeError, "Nested calls of radau/radau5 are not supported.");
+        goto fail;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(radau_lock, WAIT_LOCK);
+    Py_END_ALLOW_THREADS
+    radau_lock_owner = PyThread_get_thread_ident();
+    locked = 1;
 
     // call radau solver
+    Py_BEGIN_ALLOW_THREADS
     radau_(&neqn, radau_f, &t, y, &t1, &h, 
            &rtol, &atol, &itol, 
            radau_jac, &ijac, &mljac, &mujac,
@@ -411,48 +599,21 @@ static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs, ra
            radau_solout, &iout, 
            rwork, &lrwork, iwork, &liwork, 
            rpar, ipar, &idid);
+    Py_END_ALLOW_THREADS
 
-    success = idid > 0;
-
-    // cleanup
-    free(rwork);
-    free(iwork);
-    free(y);
-    Py_XDECREF(f_obj);
-    Py_XDECREF(J_obj);
-    Py_XDECREF(t_span_obj);
-    Py_XDECREF(u_obj);
-    Py_XDECREF(v_obj);
-    Py_XDECREF(u_array);
-    Py_XDECREF(v_array);
-    
-    return Py_BuildValue(
-        "{s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i}",
-        "success", success ? Py_True : Py_False,
-        "t", PyArray_Return(PyArray_FromAny(
-                                global_radau_params.t_sol, // Input object
-                                NULL,                      // Desired data type (None means let NumPy decide)
-                                0,                         // Minimum number of dimensions
-                                0,                         // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,         // Flags
-                                NULL)                      // Array description (NULL means default)
-                            ),
-        "y", PyArray_Return(PyArray_FromAny(
-                                global_radau_params.y_sol, // Input object
-                                NULL,                      // Desired data type (None means let NumPy decide)
-                                0,                         // Minimum number of dimensions
-                                0,                         // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,         // Flags
-                                NULL)                      // Array description (NULL means default)
-                            ),
-        "yp", PyArray_Return(PyArray_FromAny(
-                                global_radau_params.yp_sol, // Input object
-                                NULL,                       // Desired data type (None means let NumPy decide)
-                                0,                          // Minimum number of dimensions
-                                0,                          // Maximum number of dimensions
-                                NPY_ARRAY_DEFAULT,          // Flags
-                                NULL)                       // Array description (NULL means default)
-                            ),
+    if (params.error) {
+        dae_set_error(params.error);
+        goto fail;
+    }
+
+    result = Py_BuildValue(
+        "{s:N,s:N,s:N,s:N,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i,s:i}",
+        "success", PyBool_FromLong(idid > 0),
+        "t", dae_buffer_to_array(&params.t_sol, 1),
+        "y", dae_buffer_to_array(&params.y_sol, 2),
+        "yp", dae_buffer_to_array(&params.yp_sol, 2),
+        "idid", idid,
+        "nfev", params.nfev, // number of calls of f
         "nf", iwork[13],
         "njac", iwork[14],
         "nsteps", iwork[15],
@@ -462,24 +623,41 @@ static PyObject* radau_call(PyObject *self, PyObject *args, PyObject *kwargs, ra
         "nsol", iwork[19]
     );
 
+    // dense output
+    if (result != NULL && t_eval_array != NULL) {
+        if (PyDict_SetItemString(result, "t_eval", (PyObject *) t_eval_array) < 0
+            || PyDict_SetItemString(result, "y_eval", (PyObject *) y_eval_array) < 0
+            || PyDict_SetItemString(result, "yp_eval", (PyObject *) yp_eval_array) < 0) {
+            Py_CLEAR(result);
+        }
+    }
+
+    // cleanup (only objects owned by this function are released)
     fail:
+        if (locked) {
+            radau_lock_owner = 0;
+            PyThread_release_lock(radau_lock);
+        }
         free(rwork);
         free(iwork);
         free(y);
-        Py_XDECREF(f_obj);
-        Py_XDECREF(J_obj);
-        Py_XDECREF(t_span_obj);
-        Py_XDECREF(u_obj);
-        Py_XDECREF(v_obj);
+        dae_callback_release(&params.f);
+        dae_callback_release(&params.J);
         Py_XDECREF(u_array);
         Py_XDECREF(v_array);
-        return NULL;
+        Py_XDECREF(t_eval_array);
+        Py_XDECREF(y_eval_array);
+        Py_XDECREF(yp_eval_array);
+        dae_buffer_free(&params.t_sol);
+        dae_buffer_free(&params.y_sol);
+        dae_buffer_free(&params.yp_sol);
+        return result;
 }
 
 static PyObject* radau(PyObject *self, PyObject *args, PyObject *kwargs) {
-    return radau_call(self, args, kwargs, RADAU);
+    return radau_call(self, args, kwargs, RADAU, CONTRA);
 }
 
 static PyObject* radau5(PyObject *self, PyObject *args, PyObject *kwargs) {
-    return radau_call(self, args, kwargs, RADAU5);
+    return radau_call(self, args, kwargs, RADAU5, CONTR5);
 }
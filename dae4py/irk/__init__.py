@@ -1,2 +1,9 @@
-from .irk import solve_dae_IRK
-from .irk_richardson import solve_dae_IRK_generic
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "irk": ["solve_dae_IRK", "iter_dae_IRK"],
+        "irk_richardson": ["solve_dae_IRK_generic"],
+    },
+)
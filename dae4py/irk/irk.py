@@ -1,12 +1,33 @@
 import numpy as np
-from tqdm import tqdm
 from scipy._lib._util import _RichResult
-from dae4py.math import newton
+from scipy.sparse import issparse, csc_matrix
+from dae4py.math import DAEJacobian, stage_transformation, transformed_newton
+from dae4py.solution import collect_steps
 
 
-def solve_dae_IRK(F, y0, yp0, t_span, h, tableau, atol=1e-6, rtol=1e-6):
+def solve_dae_IRK(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h,
+    tableau,
+    atol=1e-6,
+    rtol=1e-6,
+    newton_max_iter=50,
+    jac_sparsity=None,
+    vectorized=False,
+    max_jac_age=20,
+    max_rate=0.5,
+    observer=None,
+    store_stages=True,
+    buffer_size=None,
+):
     """
-    Solves a system of DAEs using implicit Runge-Kutta methods.
+    Solves a system of DAEs using implicit Runge-Kutta methods. The linear
+    systems of the simplified Newton iteration are decoupled by the
+    transformation of the coefficient matrix A to real block diagonal form,
+    so that only s LU-decompositions of the size of the DAE are required.
 
     Parameters
     ----------
@@ -21,11 +42,44 @@ def solve_dae_IRK(F, y0, yp0, t_span, h, tableau, atol=1e-6, rtol=1e-6):
     h: float
         Step-size.
     tableau:
-        Butcher tableau defining the IRK method.
+        Butcher tableau defining the IRK method. The coefficient matrix A
+        has to have distinct eigenvalues.
     atol: float, defaul: 1e-6
         Absolute tolerance for the Newton solver.
     rtol: float, default: 1e-6
         Relative tolerance for the Newton solver.
+    newton_max_iter: int, default: 50
+        Maximum number of simplified Newton iterations. Since the partial
+        derivatives are shared by all stages, the iteration converges only
+        linearly and may require more iterations than a full Newton method.
+    jac_sparsity: array-like, sparse matrix, tuple or DAEJacobian, optional
+        Sparsity structure of dF/dy and dF/dy', either as a single (m, m)
+        structure or as a tuple (sparsity_y, sparsity_yp). Structurally
+        independent columns are grouped, so that only one residual
+        evaluation per group is required. If given, the partial derivatives
+        are stored as sparse matrices and sparse LU-decompositions are used.
+    vectorized: bool, default: False
+        If True, F is called as F(T, Y, Yp) with arrays T of shape (k,) and
+        Y, Yp of shape (k, m) and has to return an array of shape (k, m).
+        All stages and all columns of the finite difference approximation
+        are then evaluated by a single call. It counts as k function
+        evaluations in nfev.
+    max_jac_age: int, default: 20
+        Maximum number of steps for which the LU-decompositions of the
+        decoupled iteration matrices are reused. They are recomputed earlier
+        if the Newton iteration does not converge. A value of 1 evaluates a
+        new Jacobian in each step.
+    max_rate: float, default: 0.5
+        The LU-decompositions are not reused for the next step if the
+        estimated convergence rate of the Newton iteration exceeds max_rate.
+    observer: callable, optional
+        Function observer(step) that is called after each accepted step with
+        the step yielded by iter_dae_IRK.
+    store_stages: bool, default: True
+        If False, the stage values Y and Yp are not stored.
+    buffer_size: int or None, default: None
+        If given, only the last buffer_size points of the time grid are
+        stored in a ring buffer, see solve_dae_radau.
 
     Returns
     -------
@@ -34,8 +88,78 @@ def solve_dae_IRK(F, y0, yp0, t_span, h, tableau, atol=1e-6, rtol=1e-6):
         - t (array-like): Time grid.
         - y (array-like): State at the time grid.
         - yp (array-like): Derivative at the time grid.
-        - Y (array-like): Stage values at the time grid.
-        - Yp (array-like): Stage derivative at the time grid.
+        - Y (array-like): Stage values at the time grid (None if
+          store_stages is False).
+        - Yp (array-like): Stage derivative at the time grid (None if
+          store_stages is False).
+        - nsteps (int): Number of steps.
+        - nfev (int): Number of function evaluations.
+        - njev (int): Number of Jacobian evaluations.
+        - nlu (int): Number of LU decompositions.
+        - nlgs (int): Number of solutions of linear systems.
+    """
+    y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
+
+    # the initial guess of the stages is stored at the initial time
+    Yp0 = np.tile(yp0, tableau.s).reshape(tableau.s, -1)
+    initial = dict(t=t_span[0], y=y0, yp=yp0, Y=y0 + h * tableau.A.dot(Yp0), Yp=Yp0)
+
+    steps = iter_dae_IRK(
+        F,
+        y0,
+        yp0,
+        t_span,
+        h,
+        tableau,
+        atol=atol,
+        rtol=rtol,
+        newton_max_iter=newton_max_iter,
+        jac_sparsity=jac_sparsity,
+        vectorized=vectorized,
+        max_jac_age=max_jac_age,
+        max_rate=max_rate,
+    )
+    return collect_steps(
+        steps,
+        initial,
+        observer=observer,
+        store_stages=store_stages,
+        buffer_size=buffer_size,
+    )
+
+
+def iter_dae_IRK(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h,
+    tableau,
+    atol=1e-6,
+    rtol=1e-6,
+    newton_max_iter=50,
+    jac_sparsity=None,
+    vectorized=False,
+    max_jac_age=20,
+    max_rate=0.5,
+):
+    """
+    Generator that solves a system of DAEs using implicit Runge-Kutta
+    methods and yields the steps one by one. The parameters are described
+    in solve_dae_IRK.
+
+    Yields
+    ------
+    step: _RichResult
+        Container that stores
+        - t (float): Time at the end of the step.
+        - y (array-like): State at t.
+        - yp (array-like): Derivative at t.
+        - Y (array-like): Stage values of the step.
+        - Yp (array-like): Stage derivatives of the step.
+        - h (float): Step-size.
+        - nsteps, nfev, njev, nlu, nlgs (int): Counters up to this step,
+          see solve_dae_IRK.
     """
     t0, t1 = t_span
     if t1 <= t0:
@@ -47,67 +171,139 @@ def solve_dae_IRK(F, y0, yp0, t_span, h, tableau, atol=1e-6, rtol=1e-6):
     m = len(y0)
     s = len(c)
 
+    # decoupling transformation of the stage equations, i.e.,
+    # d(F_i)/d(Yp_j) = delta_ij dF/dy' + h A_ij dF/dy
+    transformation = stage_transformation(A)
+
+    # finite difference approximation of the partial derivatives
+    if isinstance(jac_sparsity, DAEJacobian):
+        fd_jac = jac_sparsity
+    else:
+        fd_jac = DAEJacobian(jac_sparsity)
+
     # initial guess for stage derivatives
     Yp = np.tile(yp0, s).reshape(s, -1)
     Y = y0 + h * A.dot(Yp)
 
-    # initialize solution arrays
-    t = [t0]
-    y = [y0]
-    yp = [yp0]
-    Ys = [Y]
-    Yps = [Yp]
+    # wrap function calls
+    nsteps = 0
+    nfev = 0
+    njev = 0
+    nlu = 0
+    nlgs = 0
+
+    def fun(t, y, yp):
+        # vectorized calls evaluate the residuals at all points of t
+        nonlocal nfev
+        nfev += np.size(t)
+        return F(t, y, yp)
+
+    def jacobian(t, y, yp):
+        J, M = fd_jac(fun, t, y, yp, vectorized=vectorized)
+
+        # use sparse matrices for both partial derivatives if one of them
+        # is sparse, otherwise the iteration matrices become dense
+        if issparse(J) or issparse(M):
+            return csc_matrix(M), csc_matrix(J)
+        return np.atleast_2d(M), np.atleast_2d(J)
+
+    # LU-decompositions of the decoupled iteration matrices and the number
+    # of steps they have been used for, since the step-size is constant
+    # they only change with the solution
+    LU = None
+    LU_age = 0
 
     steps = int(np.ceil((t1 - t0) / h))
+    from tqdm import tqdm
+
     with tqdm(total=steps, desc="IRK integration") as pbar:
         while t0 < t1:
             # precompute stage times
             T = t0 + c * h
 
-            def residual(Yp_flat):
-                # reshape flat input to stage derivatives
-                Yp = Yp_flat.reshape(s, -1)
+            if vectorized:
+
+                def residual(Yp):
+                    # compute stage solutions
+                    Y = y0 + h * A.dot(Yp)
+
+                    # residuals for all stages
+                    return fun(T, Y, Yp)
+
+            else:
 
-                # compute stage solutions
-                Y = y0 + h * A.dot(Yp)
+                def residual(Yp):
+                    # compute stage solutions
+                    Y = y0 + h * A.dot(Yp)
 
-                # residuals for all stages
-                FF = np.zeros((s, m))
-                for i in range(s):
-                    FF[i] = F(T[i], Y[i], Yp[i])
-                return FF.flatten()
+                    # residuals for all stages
+                    FF = np.zeros((s, m))
+                    for i in range(s):
+                        FF[i] = fun(T[i], Y[i], Yp[i])
+                    return FF
+
+            if LU_age >= max_jac_age:
+                LU = None
+
+            # solve the nonlinear system, retry with a new Jacobian if the
+            # reused LU-decompositions fail, the partial derivatives are
+            # evaluated at the last stage of the initial guess
+            while True:
+                sol = transformed_newton(
+                    residual,
+                    Yp,
+                    lambda: jacobian(T[-1], y0 + h * A[-1].dot(Yp), Yp[-1]),
+                    transformation,
+                    h,
+                    atol=atol,
+                    rtol=rtol,
+                    max_iter=newton_max_iter,
+                    LU=LU,
+                )
+                njev += sol.njev
+                nlu += sol.nlu
+                nlgs += sol.nlgs
+                if sol.success or LU is None:
+                    break
+                LU = None
 
-            # solve the nonlinear system
-            sol = newton(residual, Yp.flatten(), atol=atol, rtol=rtol)
             if not sol.success:
                 raise RuntimeError(
                     f"Newton solver failed at t={t0 + h} with error={sol.error:.2e}"
                 )
 
+            # keep the LU-decompositions for the next step
+            if sol.njev > 0:
+                LU_age = 0
+            LU = sol.LU
+            LU_age += 1
+            if sol.rate is not None and sol.rate > max_rate:
+                LU = None
+
             # extract the solution for stages
-            Yp = sol.x.reshape(s, -1)
+            Yp = sol.x
             Y = y0 + h * A.dot(Yp)
 
             # update y and y'
             y1 = y0 + h * b.dot(Yp)
             yp1 = Yp[-1]  # only correct for stiffly accurate methods
 
-            # append to solution arrays
-            t.append(t0 + h)
-            y.append(y1)
-            yp.append(yp1)
-            Ys.append(Y)
-            Yps.append(Yp)
-
             # advance time, update initial values and progress bar
             t0 += h
             y0 = y1.copy()
+            nsteps += 1
             pbar.update(1)
 
-    return _RichResult(
-        t=np.array(t),
-        y=np.array(y),
-        yp=np.array(yp),
-        Y=np.array(Ys),
-        Yp=np.array(Yps),
-    )
+            yield _RichResult(
+                t=t0,
+                y=y1,
+                yp=yp1,
+                Y=Y,
+                Yp=Yp,
+                h=h,
+                nsteps=nsteps,
+                nfev=nfev,
+                njev=njev,
+                nlu=nlu,
+                nlgs=nlgs,
+            )
@@ -1,18 +1,32 @@
 import numpy as np
-from tqdm import tqdm
 from abc import ABC, abstractmethod
 from scipy._lib._util import _RichResult
 
-from dae4py.math import newton, simplified_newton
-
-from scipy.optimize import root, fsolve
+from dae4py.math import (
+    DAEJacobian,
+    simplified_newton,
+    stage_transformation,
+    transformed_newton,
+)
+from dae4py.solution import collect_steps
 
 
 class RungeKuttaBase(ABC):
     def __init__(
-        self, f, y0, yp0, t_span, h0, tableau, atol, rtol, newton_max_iter=None
+        self,
+        f,
+        y0,
+        yp0,
+        t_span,
+        h0,
+        tableau,
+        atol,
+        rtol,
+        newton_max_iter=None,
+        vectorized=False,
     ):
         self.f = f
+        self.vectorized = vectorized
 
         self.t0, self.t1 = t_span
         if self.t1 <= self.t0:
@@ -31,6 +45,16 @@ class RungeKuttaBase(ABC):
 
         self.newton_max_iter = newton_max_iter
 
+        # decoupling transformation of the stage equations and finite
+        # difference approximation of the partial derivatives
+        self.transformation = stage_transformation(tableau.A)
+        self.fd_jac = DAEJacobian()
+
+    def jacobian(self, tn, yn, ypn):
+        # partial derivatives (dF/dy', dF/dy) for the iteration matrices
+        J, M = self.fd_jac(self.f, tn, yn, ypn, vectorized=self.vectorized)
+        return np.atleast_2d(M), np.atleast_2d(J)
+
     def residual(self, tn, yn, hn):
         # extract necessary parts of the Butcher talbuea
         A, c, s = self.tableau.A, self.tableau.c, self.tableau.s
@@ -38,6 +62,22 @@ class RungeKuttaBase(ABC):
         # precompute stage times
         T = tn + c * hn
 
+        if self.vectorized:
+            m = self.m
+
+            def fun(Yp_flat):
+                # reshape (stacked) flat input to stage derivatives
+                Yp = Yp_flat.reshape(-1, s, m)
+
+                # compute stage values
+                Y = yn + hn * np.einsum("ij,kjl->kil", A, Yp)
+
+                # residuals for all stages (and all stacked inputs)
+                F = self.f(np.tile(T, len(Yp)), Y.reshape(-1, m), Yp.reshape(-1, m))
+                return np.reshape(F, Yp_flat.shape)
+
+            return fun
+
         def fun(Yp_flat):
             # reshape flat input to stage derivatives
             Yp = Yp_flat.reshape(s, -1)
@@ -73,6 +113,9 @@ class RungeKuttaBase(ABC):
             self.rtol,
             self.newton_max_iter,
             *args,
+            tn=tn,
+            yn=yn,
+            hn=hn,
             **kwargs,
         )
         # if not sol.success:
@@ -97,21 +140,43 @@ class RungeKuttaBase(ABC):
             y1=y1, yp1=yp1, Y=Y, Yp=Yp, nit=sol.nit, rate=sol.rate, newton_sol=sol
         )
 
-    def solve(self):
-        A = self.tableau.A
-        s = self.tableau.s
-
+    def initial_guess(self):
         # initial guess for stage derivatives
+        s = self.tableau.s
         Yp = np.tile(self.yp0, s).reshape(s, -1)
-        Y = self.y0 + self.h0 * A.dot(Yp)
+        Y = self.y0 + self.h0 * self.tableau.A.dot(Yp)
+        return Y, Yp
 
-        # initialize solution arrays
-        h_sol = [self.h0]
-        t_sol = [self.t0]
-        y_sol = [self.y0]
-        yp_sol = [self.yp0]
-        Y_sol = [Y]
-        Yp_sol = [Yp]
+    def solve(self, observer=None, store_stages=True, buffer_size=None):
+        """
+        Solve the DAE and store the accepted steps, see iter_steps.
+
+        Parameters
+        ----------
+        observer: callable, optional
+            Function observer(step) that is called after each accepted step.
+        store_stages: bool, default: True
+            If False, the stage values Y and Yp are not stored.
+        buffer_size: int or None, default: None
+            If given, only the last buffer_size points of the time grid are
+            stored in a ring buffer.
+        """
+        Y, Yp = self.initial_guess()
+        initial = dict(t=self.t0, h=self.h0, y=self.y0, yp=self.yp0, Y=Y, Yp=Yp)
+        return collect_steps(
+            self.iter_steps(),
+            initial,
+            observer=observer,
+            store_stages=store_stages,
+            buffer_size=buffer_size,
+        )
+
+    def iter_steps(self):
+        """
+        Generator that yields the accepted steps, i.e., containers with the
+        time t, step-size h, state y, derivative yp and the stages Y and Yp.
+        """
+        Y, Yp = self.initial_guess()
 
         tn = self.t0
         hn = self.h0
@@ -120,6 +185,8 @@ class RungeKuttaBase(ABC):
         # build progress bar
         offset = min(self.t0, self.t1)
         frac = (self.t1 - self.t0) / 100
+        from tqdm import tqdm
+
         pbar = tqdm(total=100, leave=True)
         i = 0
 
@@ -141,12 +208,14 @@ class RungeKuttaBase(ABC):
                     # only update step-size if step is not accepted
                     hn *= factor
 
-            t_sol.append(tn + hn)
-            h_sol.append(hn)
-            y_sol.append(sol.y1.copy())
-            yp_sol.append(sol.yp1.copy())
-            Y_sol.append(sol.Y.copy())
-            Yp_sol.append(sol.Yp.copy())
+            step = _RichResult(
+                t=tn + hn,
+                h=hn,
+                y=sol.y1.copy(),
+                yp=sol.yp1.copy(),
+                Y=sol.Y.copy(),
+                Yp=sol.Yp.copy(),
+            )
 
             yn = sol.y1.copy()
             tn = tn + hn
@@ -164,14 +233,7 @@ class RungeKuttaBase(ABC):
             # update next step-size
             hn *= factor
 
-        return _RichResult(
-            t=np.array(t_sol),
-            h=np.array(h_sol),
-            y=np.array(y_sol),
-            yp=np.array(yp_sol),
-            Y=np.array(Y_sol),
-            Yp=np.array(Yp_sol),
-        )
+            yield step
 
 
 class SimpleRungeKutta(RungeKuttaBase):
@@ -179,6 +241,8 @@ class SimpleRungeKutta(RungeKuttaBase):
     def solve_nonlinear_system(
         self, fun, x, atol, rtol, newton_max_iter, *args, **kwargs
     ):
+        from scipy.optimize import root
+
         sol = root(fun, x, tol=atol, method="lm")
         sol.rate = None
         sol.nit = sol.nfev
@@ -197,9 +261,34 @@ class SimpleRungeKutta(RungeKuttaBase):
 class AdaptiveRungeKuttaRichardson(RungeKuttaBase):
 
     def solve_nonlinear_system(
-        self, fun, x, atol, rtol, newton_max_iter, *args, LU=None, **kwargs
+        self,
+        fun,
+        x,
+        atol,
+        rtol,
+        newton_max_iter,
+        *args,
+        tn=None,
+        yn=None,
+        hn=None,
+        LU=None,
+        **kwargs,
     ):
-        return newton(fun, x, atol=atol, rtol=rtol, max_iter=newton_max_iter)
+        # simplified Newton iteration with decoupled linear systems, the
+        # partial derivatives are evaluated with the last stage derivative
+        # of the initial guess
+        Yp = x.reshape(self.tableau.s, -1)
+        return transformed_newton(
+            lambda Yp: fun(Yp.reshape(-1)),
+            Yp,
+            lambda: self.jacobian(tn, yn, Yp[-1]),
+            self.transformation,
+            hn,
+            atol=atol,
+            rtol=rtol,
+            max_iter=newton_max_iter,
+            LU=LU,
+        )
         # return simplified_newton(
         #     fun, x, atol=atol, rtol=rtol, max_iter=newton_max_iter, LU=LU
         # )
@@ -213,6 +302,10 @@ class AdaptiveRungeKuttaRichardson(RungeKuttaBase):
         sol_half = self.step(tn, yn, hn / 2, Yp, LU=LU)
         sol1 = self.step(tn + hn / 2, sol_half.y1, hn / 2, sol_half.Yp, LU=LU)
 
+        # reject the step if one of the simplified Newton iterations failed
+        if not all(sol_i.newton_sol.success for sol_i in (sol, sol_half, sol1)):
+            return np.inf
+
         # richardson extrapolation (error estimate)
         error = (sol1.y1 - w1) / (2**self.tableau.p - 1)
         scale = self.atol + np.maximum(np.abs(yn), np.abs(sol1.y1)) * self.rtol
@@ -223,7 +316,7 @@ class AdaptiveRungeKuttaRichardson(RungeKuttaBase):
     def predict_factor(self, h, h_old, error_norm, error_norm_old, newton_sol):
         rate = newton_sol.rate
         nit = newton_sol.nit
-        if rate > 1:
+        if rate is not None and rate > 1:
             # print(f"Newton rate > 1; half step-size")
             return 0.5
         else:
@@ -417,6 +510,9 @@ if True:
         rtol=1e-4,
         newton_max_iter=None,
         *args,
+        observer=None,
+        store_stages=True,
+        buffer_size=None,
         **kwargs,
     ):
         method = Method(
@@ -432,7 +528,9 @@ if True:
             *args,
             **kwargs,
         )
-        return method.solve()
+        return method.solve(
+            observer=observer, store_stages=store_stages, buffer_size=buffer_size
+        )
 
 
 if __name__ == "__main__":
@@ -1,2 +1,6 @@
+from .jacobian import DAEJacobian, approx_jacobian, group_columns, prepare_sparsity
+from .linalg import BandedLU, banded_sparsity, factor_lu, solve_lu
 from .newton import newton
 from .simplified_newton import simplified_newton
+from .stage_transformation import StageTransformation, stage_transformation
+from .transformed_newton import transformed_newton
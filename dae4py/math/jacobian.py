@@ -0,0 +1,273 @@
+import numpy as np
+from functools import cached_property
+from scipy.sparse import csc_matrix, hstack
+
+EPS = np.finfo(float).eps
+
+
+def group_columns(sparsity):
+    """
+    Group the columns of a sparse matrix such that no two columns of the
+    same group have a nonzero entry in a common row (greedy graph coloring).
+    Each group can be estimated by a single finite difference.
+
+    Parameters
+    ----------
+    sparsity: array-like or sparse matrix, shape (m, n)
+        Sparsity structure of the Jacobian.
+
+    Returns
+    -------
+    groups: ndarray, shape (n,)
+        Group (color) index of each column.
+    """
+    structure = csc_matrix(sparsity, dtype=bool)
+    structure.eliminate_zeros()
+    m, n = structure.shape
+    indptr, indices = structure.indptr, structure.indices
+
+    groups = np.empty(n, dtype=int)
+    occupied_rows = []
+    for j in range(n):
+        rows = indices[indptr[j] : indptr[j + 1]]
+        for color, occupied in enumerate(occupied_rows):
+            if not np.any(occupied[rows]):
+                break
+        else:
+            color = len(occupied_rows)
+            occupied_rows.append(np.zeros(m, dtype=bool))
+        occupied_rows[color][rows] = True
+        groups[j] = color
+
+    return groups
+
+
+def prepare_sparsity(sparsity):
+    """
+    Convert a sparsity structure into the tuple (structure, groups) that is
+    accepted by `approx_jacobian`, i.e., compute the column grouping once
+    such that it can be reused for all subsequent Jacobian evaluations.
+
+    Parameters
+    ----------
+    sparsity: {None, array-like, sparse matrix, 2-tuple}
+        Sparsity structure or the tuple (structure, groups).
+
+    Returns
+    -------
+    sparsity: {None, 2-tuple}
+        The tuple (structure, groups) with structure in CSC format.
+    """
+    if sparsity is None:
+        return None
+    if isinstance(sparsity, tuple):
+        structure, groups = sparsity
+        groups = np.asarray(groups)
+    else:
+        structure, groups = sparsity, None
+
+    structure = csc_matrix(structure, dtype=bool)
+    structure.eliminate_zeros()
+    if groups is None:
+        groups = group_columns(structure)
+    return structure, groups
+
+
+def approx_jacobian(fun, x, f0=None, sparsity=None, rel_step=None, vectorized=False):
+    """
+    Forward finite difference approximation of the Jacobian of fun at x.
+    If a sparsity structure is given, all columns of the same group are
+    perturbed simultaneously, so that only one function evaluation per
+    group is required.
+
+    Parameters
+    ----------
+    fun: callable
+        Function fun(x) returning an array of shape (m,).
+    x: array-like, shape (n,)
+        Point at which the Jacobian is approximated.
+    f0: array-like, shape (m,), optional
+        Function value at x. If None, it is computed.
+    sparsity: {None, array-like, sparse matrix, 2-tuple}, default: None
+        Sparsity structure of the Jacobian or the tuple (structure, groups)
+        returned by `prepare_sparsity`. If None, a dense Jacobian is
+        computed with one function evaluation per column.
+    rel_step: float, optional
+        Relative step-size. Defaults to the square root of the machine
+        precision.
+    vectorized: bool, default: False
+        If True, fun is called with an array of shape (k, n) and has to
+        return an array of shape (k, m). All perturbed points are then
+        evaluated by a single call.
+
+    Returns
+    -------
+    J: ndarray or csc_matrix, shape (m, n)
+        Finite difference approximation of the Jacobian. A sparse matrix is
+        returned if a sparsity structure is given.
+    """
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    if f0 is None:
+        f0 = fun(x[None, :])[0] if vectorized else fun(x)
+    f0 = np.atleast_1d(np.asarray(f0, dtype=float))
+    n = x.size
+
+    if rel_step is None:
+        rel_step = EPS**0.5
+
+    # step-sizes that are exactly representable in floating point arithmetic
+    sign_x = np.where(x >= 0, 1.0, -1.0)
+    h = rel_step * sign_x * np.maximum(1.0, np.abs(x))
+    h = (x + h) - x
+
+    if sparsity is None:
+        if vectorized:
+            X = x + np.diag(h)
+            df = np.reshape(fun(X), (n, f0.size)) - f0
+            return (df / h[:, None]).T
+
+        J = np.empty((f0.size, n))
+        for j in range(n):
+            x_pert = x.copy()
+            x_pert[j] += h[j]
+            J[:, j] = (np.atleast_1d(fun(x_pert)) - f0) / h[j]
+        return J
+
+    structure, groups = prepare_sparsity(sparsity)
+    ngroups = groups.max() + 1 if n > 0 else 0
+
+    # one perturbed function evaluation per group
+    if vectorized:
+        X = x + h * (groups == np.arange(ngroups)[:, None])
+        df = np.reshape(fun(X), (ngroups, f0.size)) - f0
+    else:
+        df = np.empty((ngroups, f0.size))
+        for k in range(ngroups):
+            e = groups == k
+            x_pert = x.copy()
+            x_pert[e] += h[e]
+            df[k] = np.atleast_1d(fun(x_pert)) - f0
+
+    # distribute the differences to the nonzero entries of each column
+    rows = structure.indices
+    cols = np.repeat(np.arange(n), np.diff(structure.indptr))
+    data = df[groups[cols], rows] / h[cols]
+    return csc_matrix((data, rows, structure.indptr), shape=(f0.size, n))
+
+
+class DAEJacobian:
+    def __init__(self, sparsity=None):
+        """
+        Finite difference approximation of the partial derivatives dF/dy and
+        dF/dy' of a DAE system F(t, y, y') = 0. The column grouping of the
+        sparsity structures is computed once and reused for all evaluations,
+        so that a single instance can be shared by all solver calls of the
+        same problem.
+
+        Parameters
+        ----------
+        sparsity: {None, array-like, sparse matrix, 2-tuple}, default: None
+            Sparsity structure of the partial derivatives. A single (m, m)
+            structure is used for dF/dy and dF/dy', whereas a tuple
+            (sparsity_y, sparsity_yp) specifies them separately. If None,
+            dense partial derivatives are computed.
+        """
+        if isinstance(sparsity, tuple):
+            sparsity_y, sparsity_yp = sparsity
+        else:
+            sparsity_y = sparsity_yp = sparsity
+
+        self.sparsity_y = prepare_sparsity(sparsity_y)
+        if sparsity_yp is sparsity_y:
+            self.sparsity_yp = self.sparsity_y
+        else:
+            self.sparsity_yp = prepare_sparsity(sparsity_yp)
+
+    @property
+    def sparse(self):
+        return self.sparsity_y is not None or self.sparsity_yp is not None
+
+    @cached_property
+    def sparsity(self):
+        """
+        Union of the sparsity structures of dF/dy and dF/dy' together with
+        its column grouping, i.e., the sparsity structure of linear
+        combinations a * dF/dy + b * dF/dy'.
+        """
+        if self.sparsity_y is None or self.sparsity_yp is None:
+            return None
+        return prepare_sparsity(self.sparsity_y[0] + self.sparsity_yp[0])
+
+    @cached_property
+    def sparsity_combined(self):
+        """
+        Sparsity structure [dF/dy, dF/dy'] with respect to the stacked
+        vector (y, y') together with its column grouping.
+        """
+        if self.sparsity_y is None or self.sparsity_yp is None:
+            return None
+        return prepare_sparsity(hstack([self.sparsity_y[0], self.sparsity_yp[0]]))
+
+    def __call__(self, F, t, y, yp, f=None, combined=False, vectorized=False):
+        """
+        Approximate the partial derivatives of F at (t, y, yp).
+
+        Parameters
+        ----------
+        F: callable
+            Function defining the DAE system, F(t, y, yp) = 0.
+        t: float
+            Current time.
+        y: array-like
+            Current state.
+        yp: array-like
+            Current derivative.
+        f: array-like, optional
+            Residual F(t, y, yp). If None, it is computed.
+        combined: bool, default: False
+            If True, both partial derivatives are computed in a single pass
+            over the stacked vector (y, y'). In the sparse case, columns of
+            dF/dy and dF/dy' can then share the same perturbed residual
+            evaluation.
+        vectorized: bool, default: False
+            If True, F is called as F(T, Y, Yp) with arrays T of shape (k,)
+            and Y, Yp of shape (k, m) and has to return an array of shape
+            (k, m). All perturbed points of a sweep are then evaluated by a
+            single call.
+
+        Returns
+        -------
+        Jy: ndarray or csc_matrix
+            Partial derivative dF/dy.
+        Jyp: ndarray or csc_matrix
+            Partial derivative dF/dy'.
+        """
+        m = len(y)
+        if vectorized:
+            if f is None:
+                f = np.reshape(F(np.array([t]), y[None, :], yp[None, :]), -1)
+
+            def fun(Y, Yp):
+                return F(np.full(len(Y), t), Y, Yp)
+
+            fun_y = lambda _Y: fun(_Y, np.tile(yp, (len(_Y), 1)))
+            fun_yp = lambda _Yp: fun(np.tile(y, (len(_Yp), 1)), _Yp)
+            fun_z = lambda _Z: fun(_Z[:, :m], _Z[:, m:])
+        else:
+            if f is None:
+                f = F(t, y, yp)
+
+            fun_y = lambda _y: F(t, _y, yp)
+            fun_yp = lambda _yp: F(t, y, _yp)
+            fun_z = lambda _z: F(t, _z[:m], _z[m:])
+
+        if combined:
+            z = np.concatenate((y, yp))
+            J = approx_jacobian(
+                fun_z, z, f, self.sparsity_combined, vectorized=vectorized
+            )
+            return J[:, :m], J[:, m:]
+
+        Jy = approx_jacobian(fun_y, y, f, self.sparsity_y, vectorized=vectorized)
+        Jyp = approx_jacobian(fun_yp, yp, f, self.sparsity_yp, vectorized=vectorized)
+        return Jy, Jyp
@@ -0,0 +1,143 @@
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve, get_lapack_funcs
+from scipy.sparse import issparse, csc_matrix, diags
+
+
+def banded_sparsity(n, lband=None, uband=None):
+    """
+    Sparsity structure of a banded matrix.
+
+    Parameters
+    ----------
+    n: int
+        Dimension of the matrix.
+    lband: int or None, default: None
+        Lower bandwidth. None means zero.
+    uband: int or None, default: None
+        Upper bandwidth. None means zero.
+
+    Returns
+    -------
+    sparsity: csc_matrix, shape (n, n)
+        Boolean matrix with nonzero entries inside the band.
+    """
+    lband, uband = _check_bandwidths(n, lband, uband)
+    offsets = np.arange(-lband, uband + 1)
+    return csc_matrix(diags(np.ones(len(offsets)), offsets, shape=(n, n), dtype=bool))
+
+
+class BandedLU:
+    """
+    LU-decomposition of a banded matrix using the LAPACK routines gbtrf
+    and gbtrs. Only the entries inside the band are used, so that the cost
+    of the decomposition is O(n * lband * (lband + uband)) instead of O(n^3).
+
+    Parameters
+    ----------
+    A: array-like or sparse matrix, shape (n, n)
+        Matrix to be factorized.
+    lband: int or None, default: None
+        Lower bandwidth. None means zero.
+    uband: int or None, default: None
+        Upper bandwidth. None means zero.
+    """
+
+    def __init__(self, A, lband=None, uband=None):
+        if not issparse(A):
+            A = np.atleast_2d(A)
+        n = A.shape[0]
+        lband, uband = _check_bandwidths(n, lband, uband)
+
+        # LAPACK band storage with lband additional rows for the fill-in of
+        # the pivoting, i.e., ab[lband + uband + i - j, j] = A[i, j]
+        dtype = np.result_type(A.dtype, float)
+        ab = np.zeros((2 * lband + uband + 1, n), dtype=dtype)
+        for k in range(-lband, uband + 1):
+            row = lband + uband - k
+            if k >= 0:
+                ab[row, k:] = A.diagonal(k)
+            else:
+                ab[row, : n + k] = A.diagonal(k)
+
+        gbtrf, self._gbtrs = get_lapack_funcs(("gbtrf", "gbtrs"), (ab,))
+        self.lu, self.piv, info = gbtrf(ab, lband, uband, overwrite_ab=True)
+        if info > 0:
+            raise np.linalg.LinAlgError("Singular matrix")
+        self.lband = lband
+        self.uband = uband
+        self.shape = (n, n)
+
+    def solve(self, b):
+        """
+        Solve the linear system A x = b.
+
+        Parameters
+        ----------
+        b: array-like
+            Right-hand side.
+
+        Returns
+        -------
+        x: ndarray
+            Solution of the linear system.
+        """
+        x, info = self._gbtrs(self.lu, self.lband, self.uband, b, self.piv)
+        return x
+
+
+def factor_lu(A, lband=None, uband=None):
+    """
+    Compute the LU-decomposition of a dense or sparse matrix. Sparse
+    matrices are factorized with SuperLU. If one of the bandwidths is
+    given, a banded LU-decomposition is computed instead.
+
+    Parameters
+    ----------
+    A: array-like or sparse matrix, shape (n, n)
+        Matrix to be factorized.
+    lband: int or None, default: None
+        Lower bandwidth of A.
+    uband: int or None, default: None
+        Upper bandwidth of A.
+
+    Returns
+    -------
+    LU: tuple, SuperLU or BandedLU
+        LU-decomposition that can be passed to `solve_lu`.
+    """
+    if lband is not None or uband is not None:
+        return BandedLU(A, lband, uband)
+    if issparse(A):
+        from scipy.sparse.linalg import splu
+
+        return splu(csc_matrix(A))
+    return lu_factor(A)
+
+
+def solve_lu(LU, b):
+    """
+    Solve the linear system A x = b with a given LU-decomposition of A.
+
+    Parameters
+    ----------
+    LU: tuple, SuperLU or BandedLU
+        LU-decomposition computed by `factor_lu`.
+    b: array-like
+        Right-hand side.
+
+    Returns
+    -------
+    x: ndarray
+        Solution of the linear system.
+    """
+    if isinstance(LU, tuple):
+        return lu_solve(LU, b)
+    return LU.solve(b)
+
+
+def _check_bandwidths(n, lband, uband):
+    lband = 0 if lband is None else int(lband)
+    uband = 0 if uband is None else int(uband)
+    if lband < 0 or uband < 0:
+        raise ValueError("`lband` and `uband` must be non-negative integers or None.")
+    return min(lband, max(n - 1, 0)), min(uband, max(n - 1, 0))
@@ -1,7 +1,8 @@
 import numpy as np
 from scipy._lib._util import _RichResult
-from scipy.optimize._numdiff import approx_derivative
-from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import issparse
+from .jacobian import approx_jacobian, prepare_sparsity
+from .linalg import banded_sparsity, factor_lu, solve_lu
 
 
 def newton(
@@ -12,6 +13,11 @@ def newton(
     rtol=1e-6,
     max_iter=20,
     chord=True,
+    jac_sparsity=None,
+    vectorized=False,
+    lband=None,
+    uband=None,
+    LU=None,
 ):
     """
     This function implements the Newton-Raphson method for solving nonlinear
@@ -37,6 +43,29 @@ def newton(
         Maximum number of iterations.
     chord: bool, default: True
         If True, uses the chord method by computing the Jacobian once.
+    jac_sparsity: {None, array-like, sparse matrix, 2-tuple}, default: None
+        Sparsity structure of the Jacobian or the tuple (structure, groups)
+        computed by `prepare_sparsity`. If given, the finite difference
+        approximation requires only one function evaluation per group of
+        structurally independent columns and the linear systems are solved
+        with a sparse LU-decomposition.
+    vectorized: bool, default: False
+        If True, fun additionally accepts an array of shape (k, n) and
+        returns an array of shape (k, m). This is used to evaluate all
+        columns of the finite difference approximation by a single call.
+    lband: int or None, default: None
+        Lower bandwidth of the Jacobian.
+    uband: int or None, default: None
+        Upper bandwidth of the Jacobian. If one of the bandwidths is given,
+        the Jacobian is assumed to be banded and the linear systems are
+        solved with a banded LU-decomposition. If no jac_sparsity is given,
+        the finite difference approximation uses the band structure.
+    LU: LU-decomposition or None, default: None
+        LU-decomposition of the Jacobian of a previous call (returned as
+        LU), which is used by the chord method instead of a new Jacobian.
+        This allows to reuse the factorization over multiple calls with
+        slowly varying Jacobians. The iteration is stopped as soon as the
+        reused factorization leads to divergence.
 
     Returns
     -------
@@ -49,10 +78,16 @@ def newton(
             - nit (int): Number of iterations performed.
             - nfev (int): Number of function evaluations.
             - njev (int): Number of Jacobian evaluations.
+            - nlu (int): Number of LU decompositions.
+            - nlgs (int): Number of solutions of linear systems.
             - rate (float or None): Estimated convergence rate.
+            - LU (LU-decomposition or None): LU-decomposition of the
+              Jacobian that was used by the chord method.
     """
     nfev = 0
     njev = 0
+    nlu = 0
+    nlgs = 0
 
     # wrap function
     def fun(x, f=fun):
@@ -60,23 +95,40 @@ def newton(
         nfev += 1
         return np.atleast_1d(f(x))
 
+    # band structure for the finite difference approximation
+    banded = lband is not None or uband is not None
+    if banded and jac_sparsity is None and not callable(jac):
+        jac_sparsity = banded_sparsity(np.size(x0), lband, uband)
+
     # wrap jacobian or use a finite difference approximation
     if callable(jac):
 
-        def jacobian(x):
+        def jacobian(x, f=None):
             nonlocal njev
             njev += 1
             return jac(x)
 
-    elif jac in ["2-point", "3-point", "cs"]:
+    elif jac == "2-point":
+        jac_sparsity = prepare_sparsity(jac_sparsity)
 
-        def jacobian(x):
+        def jacobian(x, f=None):
+            nonlocal njev
+            njev += 1
+            return approx_jacobian(
+                fun, x, f0=f, sparsity=jac_sparsity, vectorized=vectorized
+            )
+
+    elif jac in ["3-point", "cs"]:
+        from scipy.optimize._numdiff import approx_derivative
+
+        def jacobian(x, f=None):
             nonlocal njev
             njev += 1
             return approx_derivative(
                 lambda y: fun(y),
                 x,
                 method=jac,
+                sparsity=jac_sparsity,
             )
 
     # eliminate round-off errors
@@ -97,20 +149,30 @@ def newton(
     norm_dx_old = 1
     rate = None
     i = 0
-    LU = None
+    reused = LU is not None
     if not converged:
         for i in range(1, max_iter + 1):
             # evaluate Jacobian
             if chord and LU is None:
-                J = np.atleast_2d(jacobian(x))
-                LU = lu_factor(J)
+                J = jacobian(x, f)
+                LU = factor_lu(J if issparse(J) else np.atleast_2d(J), lband, uband)
+                nlu += 1
 
             # Newton update
+            nlgs += 1
             if chord:
-                dx = lu_solve(LU, f)
+                dx = solve_lu(LU, f)
             else:
-                J = np.atleast_2d(jacobian(x))
-                dx = np.linalg.solve(J, f)
+                nlu += 1
+                J = jacobian(x, f)
+                if banded:
+                    dx = solve_lu(factor_lu(J, lband, uband), f)
+                elif issparse(J):
+                    from scipy.sparse.linalg import spsolve
+
+                    dx = spsolve(J.tocsc(), f)
+                else:
+                    dx = np.linalg.solve(np.atleast_2d(J), f)
 
             # estimate rate of convergence
             norm_dx = np.linalg.norm(dx)
@@ -118,6 +180,10 @@ def newton(
                 rate = norm_dx / norm_dx_old
             norm_dx_old = norm_dx
 
+            # the reused LU-decomposition is too far off
+            if chord and reused and rate is not None and rate >= 1:
+                break
+
             # perform Newton step
             Delta_x -= dx
             x = x0 + Delta_x
@@ -137,5 +203,8 @@ def newton(
         nit=i,
         nfev=nfev,
         njev=njev,
+        nlu=nlu,
+        nlgs=nlgs,
         rate=rate,
+        LU=LU if chord else None,
     )
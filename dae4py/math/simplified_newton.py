@@ -1,8 +1,8 @@
 import numpy as np
 from scipy._lib._util import _RichResult
-from scipy.linalg import lu_factor, lu_solve
-from scipy.optimize._numdiff import approx_derivative
-from scipy.integrate._ivp.common import EPS
+from scipy.sparse import issparse
+from .jacobian import EPS, approx_jacobian, prepare_sparsity
+from .linalg import factor_lu, solve_lu
 
 
 def simplified_newton(
@@ -13,6 +13,7 @@ def simplified_newton(
     rtol=1e-6,
     max_iter=20,
     LU=None,
+    jac_sparsity=None,
 ):
     nfev = 0
     njev = 0
@@ -31,7 +32,16 @@ def simplified_newton(
             njev += 1
             return jac(x)
 
-    elif jac in ["2-point", "3-point", "cs"]:
+    elif jac == "2-point":
+        jac_sparsity = prepare_sparsity(jac_sparsity)
+
+        def jacobian(x):
+            nonlocal njev
+            njev += 1
+            return approx_jacobian(fun, x, sparsity=jac_sparsity)
+
+    elif jac in ["3-point", "cs"]:
+        from scipy.optimize._numdiff import approx_derivative
 
         def jacobian(x):
             nonlocal njev
@@ -40,6 +50,7 @@ def simplified_newton(
                 lambda y: fun(y),
                 x,
                 method=jac,
+                sparsity=jac_sparsity,
             )
 
     else:
@@ -57,8 +68,8 @@ def simplified_newton(
 
     # evaluate Jacobian at initial point
     if LU is None:
-        J = np.atleast_2d(jacobian(x))
-        LU = lu_factor(J)
+        J = jacobian(x)
+        LU = factor_lu(J if issparse(J) else np.atleast_2d(J))
 
     # scaling with relative and absolute tolerances
     scale = atol + np.abs(x) * rtol
@@ -77,7 +88,7 @@ def simplified_newton(
 
             # Newton update
             # dx = np.linalg.solve(J, f)
-            dx = lu_solve(LU, f)
+            dx = solve_lu(LU, f)
 
             # perform Newton step
             Delta_x -= dx
@@ -0,0 +1,167 @@
+import numpy as np
+from functools import lru_cache
+from scipy.linalg import eig, cdf2rdf
+from .linalg import factor_lu as _factor_lu, solve_lu as _solve_lu
+
+
+class StageTransformation:
+    def __init__(self, A):
+        """
+        Transformation that decouples the linear systems of the simplified
+        Newton iteration of an s-stage implicit Runge-Kutta method,
+
+            (I x M + h A x J) dYp = F,
+
+        with M = dF/dy' and J = dF/dy. With the real block diagonal form
+        TI A T = Lambda of the coefficient matrix A, the system splits into
+        one m x m system (M + h gamma J) for each real eigenvalue gamma and
+        one complex m x m system (M + h (alpha - i beta) J) for each pair of
+        complex eigenvalues alpha +- i beta. Hence, only s m x m matrices
+        are factorized instead of a single (s m) x (s m) matrix.
+
+        Parameters
+        ----------
+        A: array-like, shape (s, s)
+            Coefficient matrix of the Butcher tableau with distinct
+            eigenvalues, e.g., of the Radau IIA or Gauss-Legendre methods.
+        """
+        A = np.atleast_2d(A)
+        s = A.shape[0]
+
+        # eigenvalues and corresponding eigenvectors of coefficient matrix
+        lambdas, U = eig(A)
+
+        # sort the real eigenvalues and the complex eigenvalues with positive
+        # imaginary part in descending order and put the real ones first,
+        # each complex eigenvalue is followed by its conjugate
+        is_real = np.abs(lambdas.imag) <= 1e3 * np.finfo(float).eps * np.abs(lambdas)
+        lambdas[is_real] = lambdas[is_real].real
+        idx_real = np.flatnonzero(is_real)
+        idx_real = idx_real[np.argsort(lambdas[idx_real].real)[::-1]]
+        idx_complex = np.flatnonzero(~is_real & (lambdas.imag > 0))
+        idx_complex = idx_complex[np.argsort(lambdas[idx_complex])[::-1]]
+        idx_conj = [
+            np.flatnonzero(~is_real & np.isclose(lambdas, lambdas[i].conj()))[0]
+            for i in idx_complex
+        ]
+        idx = np.concatenate(
+            [idx_real, np.ravel(np.column_stack([idx_complex, idx_conj]))]
+        )
+        idx = idx.astype(int)
+        assert len(idx) == s
+        lambdas = lambdas[idx]
+        U = U[:, idx]
+
+        # convert complex eigenvalues and eigenvectors to real eigenvalues
+        # in a block diagonal form and the associated real eigenvectors
+        Lambda, T = cdf2rdf(lambdas, U)
+        TI = np.linalg.inv(T)
+
+        # sanity checks
+        if __debug__:
+            assert np.allclose(T @ Lambda @ TI, A)
+            assert np.allclose(TI @ A @ T, Lambda)
+
+        self.s = s
+        self.T = T
+        self.TI = TI
+        self.Lambda = Lambda
+        self.gammas = lambdas[: len(idx_real)].real
+        self.alphas = lambdas[len(idx_real) :: 2].real
+        self.betas = lambdas[len(idx_real) :: 2].imag
+
+        # instances are shared by `stage_transformation`
+        for array in (T, TI, Lambda, self.gammas, self.alphas, self.betas):
+            array.setflags(write=False)
+
+    @property
+    def n_real(self):
+        return len(self.gammas)
+
+    @property
+    def n_complex(self):
+        return len(self.alphas)
+
+    def factor(self, M, J, h, factor_lu=_factor_lu):
+        """
+        LU-decompositions of the decoupled iteration matrices.
+
+        Parameters
+        ----------
+        M: array-like or sparse matrix, shape (m, m)
+            Partial derivative dF/dy'.
+        J: array-like or sparse matrix, shape (m, m)
+            Partial derivative dF/dy.
+        h: float
+            Step-size.
+        factor_lu: callable, default: dae4py.math.factor_lu
+            Function that computes an LU-decomposition of a matrix, e.g., a
+            wrapper that counts the decompositions.
+
+        Returns
+        -------
+        LU: list
+            LU-decompositions of M + h gamma J for the real eigenvalues
+            followed by those of M + h (alpha - i beta) J for the complex
+            eigenvalues.
+        """
+        return [factor_lu(M + h * gamma * J) for gamma in self.gammas] + [
+            factor_lu(M + h * (alpha - 1j * beta) * J)
+            for (alpha, beta) in zip(self.alphas, self.betas)
+        ]
+
+    def solve(self, LU, F, solve_lu=_solve_lu):
+        """
+        Solve (I x M + h A x J) X = F with the LU-decompositions computed by
+        `factor`.
+
+        Parameters
+        ----------
+        LU: list
+            LU-decompositions returned by `factor`.
+        F: array-like, shape (s, m)
+            Right-hand side of all stages.
+        solve_lu: callable, default: dae4py.math.solve_lu
+            Function that solves a linear system with a given
+            LU-decomposition.
+
+        Returns
+        -------
+        X: ndarray, shape (s, m)
+            Solution of all stages.
+        """
+        n_real = self.n_real
+        G = self.TI @ F
+        W = np.empty_like(G, dtype=float)
+        for i in range(n_real):
+            W[i] = solve_lu(LU[i], G[i])
+        for i in range(self.n_complex):
+            k = n_real + 2 * i
+            w = solve_lu(LU[n_real + i], G[k] + 1j * G[k + 1])
+            W[k] = w.real
+            W[k + 1] = w.imag
+        return self.T @ W
+
+
+def stage_transformation(A):
+    """
+    Cached `StageTransformation` of the coefficient matrix A, such that the
+    eigenvalue decomposition is only computed once for each tableau.
+
+    Parameters
+    ----------
+    A: array-like, shape (s, s)
+        Coefficient matrix of the Butcher tableau.
+
+    Returns
+    -------
+    transformation: StageTransformation
+        Shared transformation with read-only arrays.
+    """
+    A = np.ascontiguousarray(np.atleast_2d(A), dtype=float)
+    return _stage_transformation(A.shape, A.tobytes())
+
+
+@lru_cache(maxsize=64)
+def _stage_transformation(shape, data):
+    return StageTransformation(np.frombuffer(data).reshape(shape))
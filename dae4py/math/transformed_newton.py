@@ -0,0 +1,157 @@
+import numpy as np
+from scipy._lib._util import _RichResult
+from .linalg import factor_lu, solve_lu
+
+
+def transformed_newton(
+    fun,
+    x0,
+    jac,
+    transformation,
+    h,
+    atol=1e-6,
+    rtol=1e-6,
+    max_iter=20,
+    lband=None,
+    uband=None,
+    LU=None,
+):
+    """
+    Simplified Newton method for the stage equations of an implicit
+    Runge-Kutta method F(t0 + c_i h, y0 + h sum_j A_ij Yp_j, Yp_i) = 0. The
+    iteration matrix I x M + h A x J is decoupled by the given
+    `StageTransformation` of A, such that only s LU-decompositions of
+    m x m matrices are required instead of one of the (s m) x (s m) matrix.
+
+    Parameters
+    ----------
+    fun: callable
+        Function that takes the stage derivatives Yp of shape (s, m) and
+        returns the residuals of all stages with the same shape.
+    x0: array-like, shape (s, m)
+        Initial guess for the stage derivatives.
+    jac: callable
+        Function without arguments that returns the tuple (M, J) of the
+        partial derivatives M = dF/dy' and J = dF/dy. It is only called if
+        no LU-decompositions are given.
+    transformation: StageTransformation
+        Transformation of the coefficient matrix A.
+    h: float
+        Step-size.
+    atol: float, default: 1e-6
+        Absolute tolerance for convergence.
+    rtol: float, default: 1e-6
+        Relative tolerance for convergence.
+    max_iter: int, default: 20
+        Maximum number of iterations.
+    lband: int or None, default: None
+        Lower bandwidth of M and J.
+    uband: int or None, default: None
+        Upper bandwidth of M and J. If one of the bandwidths is given, the
+        decoupled systems are solved with banded LU-decompositions.
+    LU: list or None, default: None
+        LU-decompositions of a previous call (returned as LU) with the same
+        step-size. The iteration is stopped as soon as the reused
+        factorizations lead to divergence.
+
+    Returns
+    -------
+    solution: _RichResult
+        Container that stores
+            - x (array-like): Computed stage derivatives.
+            - success (bool): Indicates if the method converged.
+            - error (float): Final error norm.
+            - fun (array-like): Residuals at the solution.
+            - nit (int): Number of iterations performed.
+            - nfev (int): Number of function evaluations.
+            - njev (int): Number of Jacobian evaluations.
+            - nlu (int): Number of LU decompositions.
+            - nlgs (int): Number of solutions of linear systems.
+            - rate (float or None): Estimated convergence rate.
+            - LU (list): LU-decompositions of the decoupled systems.
+    """
+    nfev = 0
+    njev = 0
+    nlu = 0
+    nlgs = 0
+
+    # wrap function
+    def fun(x, f=fun):
+        nonlocal nfev
+        nfev += 1
+        return np.reshape(f(x), x.shape)
+
+    def factor(A):
+        nonlocal nlu
+        nlu += 1
+        return factor_lu(A, lband, uband)
+
+    def solve(LU, b):
+        nonlocal nlgs
+        nlgs += 1
+        return solve_lu(LU, b)
+
+    # eliminate round-off errors
+    Delta_x = np.zeros_like(x0, dtype=float)
+    x = x0 + Delta_x
+
+    # initial function value
+    f = fun(x)
+
+    # scaling with relative and absolute tolerances
+    scale = atol + np.abs(f) * rtol
+
+    # error of initial guess
+    error = np.linalg.norm(f / scale) / scale.size**0.5
+    converged = error < 1
+
+    # Newton loop
+    norm_dx_old = 1
+    rate = None
+    i = 0
+    reused = LU is not None
+    if not converged:
+        for i in range(1, max_iter + 1):
+            # decompose the decoupled iteration matrices
+            if LU is None:
+                njev += 1
+                M, J = jac()
+                LU = transformation.factor(M, J, h, factor)
+
+            # Newton update
+            dx = transformation.solve(LU, f, solve)
+
+            # estimate rate of convergence
+            norm_dx = np.linalg.norm(dx)
+            if i > 1:
+                rate = norm_dx / norm_dx_old
+            norm_dx_old = norm_dx
+
+            # the reused LU-decompositions are too far off
+            if reused and rate is not None and rate >= 1:
+                break
+
+            # perform Newton step
+            Delta_x -= dx
+            x = x0 + Delta_x
+
+            # new function value, error and convergence check
+            f = fun(x)
+            error = np.linalg.norm(f / scale) / scale.size**0.5
+            converged = error < 1
+            if converged:
+                break
+
+    return _RichResult(
+        x=x,
+        success=converged,
+        error=error,
+        fun=f,
+        nit=i,
+        nfev=nfev,
+        njev=njev,
+        nlu=nlu,
+        nlgs=nlgs,
+        rate=rate,
+        LU=LU,
+    )
@@ -1 +1,9 @@
-from .radau import solve_dae_radau
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    submodule_attributes={
+        "radau": ["solve_dae_radau", "iter_dae_radau", "RadauDenseOutput"],
+        "ensemble": ["solve_dae_radau_ensemble"],
+    },
+)
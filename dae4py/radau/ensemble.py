@@ -0,0 +1,433 @@
+import numpy as np
+from scipy._lib._util import _RichResult
+from dae4py.math import DAEJacobian
+from dae4py.math.jacobian import EPS
+from .radau import radau_constants
+
+
+def solve_dae_radau_ensemble(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h0=1e-3,
+    s=3,
+    t_eval=None,
+    atol=1e-6,
+    rtol=1e-3,
+    kappa=1.0,
+    eta=0.05,
+    jac_sparsity=None,
+    theta_jac=0.1,
+):
+    """
+    Solves an ensemble of N DAE systems of the same dimension with Radau IIA
+    methods with variable step-sizes. All trajectories are advanced in
+    lockstep, each with its own step-size, and finished or failed
+    trajectories are masked out. Trajectories with singular iteration
+    matrices halve their step-size until they succeed or fail, without
+    aborting the others. Residuals, finite difference Jacobians and
+    the inversions of the iteration matrices are evaluated batched over
+    all trajectories.
+
+    Parameters
+    ----------
+    F: callable
+        Vectorized function defining the DAE systems, F(t, y, yp) = 0. It is
+        called with arrays t of shape (N,) and y, yp of shape (N, m) and has
+        to return an array of shape (N, m). Row n always belongs to
+        trajectory n, so that parameters of the individual trajectories can
+        be broadcast along the first axis.
+    y0: array-like, shape (N, m)
+        Initial conditions for y.
+    yp0: array-like, shape (N, m)
+        Initial conditions for y'.
+    t_span: Tuple
+        (t0, t1) defining the time span.
+    h0: float or array-like, shape (N,), default: 1e-3
+        Initial step-size(s).
+    s: int, default: 3
+        Number of stages (has to be odd).
+    t_eval, array-like, optional
+        Array of evaluation points for dense output (shared by all
+        trajectories).
+    atol: float, defaul: 1e-6
+        Absolute tolerance for the step-size controller.
+    rtol: float, default: 1e-3
+        Relative tolerance for the step-size controller.
+    kappa: float, default: 1.0
+        Scalng factor of the smooth limiter.
+    eta: float, default: 0.05
+        Absolute value of the stability function of the implicit embedded
+        method at infinity.
+    jac_sparsity: array-like, sparse matrix or tuple, optional
+        Sparsity structure of dF/dy and dF/dy' of a single trajectory,
+        either as a single (m, m) structure or as a tuple
+        (sparsity_y, sparsity_yp). Structurally independent columns are
+        perturbed simultaneously.
+    theta_jac: float, default: 0.1
+        The partial derivatives of a trajectory are reused for its next step
+        if the contraction rate of its simplified Newton iteration is below
+        theta_jac. They are reevaluated for all trajectories by a single
+        batched evaluation as soon as one active trajectory requires them.
+        Independently, they are reevaluated if the simplified Newton
+        iteration does not converge with outdated ones.
+
+    Returns
+    -------
+    solution: _RichResult
+        Container that stores
+        - t (array-like): Final time of each trajectory.
+        - y (array-like): Final state of each trajectory, shape (N, m).
+        - yp (array-like): Final derivative of each trajectory, shape (N, m).
+        - success (array-like): Whether the trajectories reached t1.
+        - t_eval (array-like): Time grid (dense output).
+        - y_eval (array-like): State (dense output), shape (N, len(t_eval), m).
+        - yp_eval (array-like): Derivative (dense output), shape
+          (N, len(t_eval), m).
+        - nsteps (array-like): Number of accepted steps of each trajectory.
+        - nrejected (array-like): Number of rejected steps of each
+          trajectory.
+        - nfev (int): Number of batched function evaluations.
+        - njev (int): Number of batched Jacobian evaluations.
+        - ninv (int): Number of batched inversions of iteration matrices.
+        - napply (int): Number of batched products with the inverted
+          iteration matrices, i.e., solutions of linear systems.
+    """
+    t0, t1 = t_span
+    if t1 <= t0:
+        raise ValueError("t1 must be greater than t0")
+
+    # prepare initial values
+    y0 = np.atleast_2d(np.asarray(y0, dtype=float))
+    yp0 = np.atleast_2d(np.asarray(yp0, dtype=float))
+    if y0.shape != yp0.shape:
+        raise ValueError("Shapes of y0 and yp0 have to coincide.")
+    N, m = y0.shape
+
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval)
+        t_eval_i = np.zeros(N, dtype=int)
+        y_eval = np.full((N, len(t_eval), m), np.nan)
+        yp_eval = np.full((N, len(t_eval), m), np.nan)
+    else:
+        y_eval = None
+        yp_eval = None
+
+    # wrap function calls
+    nfev = 0
+    njev = 0
+    ninv = 0
+    napply = 0
+
+    def fun(t, y, yp):
+        nonlocal nfev
+        nfev += 1
+        return np.reshape(F(t, y, yp), (N, m))
+
+    fd_jac = DAEJacobian(jac_sparsity)
+
+    def approx_jacobian(fun, x, f0, sparsity):
+        # step-sizes for all trajectories
+        sign_x = np.where(x >= 0, 1.0, -1.0)
+        h = EPS**0.5 * sign_x * np.maximum(1.0, np.abs(x))
+        h = (x + h) - x
+
+        J = np.zeros((N, m, m))
+        if sparsity is None:
+            for j in range(m):
+                x_pert = x.copy()
+                x_pert[:, j] += h[:, j]
+                J[:, :, j] = (fun(x_pert) - f0) / h[:, j, None]
+        else:
+            structure, groups = sparsity
+            ngroups = groups.max() + 1
+            df = np.empty((N, ngroups, m))
+            for k in range(ngroups):
+                e = groups == k
+                x_pert = x.copy()
+                x_pert[:, e] += h[:, e]
+                df[:, k] = fun(x_pert) - f0
+
+            rows = structure.indices
+            cols = np.repeat(np.arange(m), np.diff(structure.indptr))
+            J[:, rows, cols] = df[:, groups[cols], rows] / h[:, cols]
+        return J
+
+    def jac(t, y, yp):
+        nonlocal njev
+        njev += 1
+        f = fun(t, y, yp)
+        J = approx_jacobian(lambda _y: fun(t, _y, yp), y, f, fd_jac.sparsity_y)
+        M = approx_jacobian(lambda _yp: fun(t, y, _yp), yp, f, fd_jac.sparsity_yp)
+        return M, J
+
+    # the iteration matrices of all trajectories are explicitly inverted at
+    # once, since numpy has no stacked LU-decomposition with separate
+    # forward and backward substitutions, and the linear systems are solved
+    # by batched matrix-vector products
+    def invert(A):
+        nonlocal ninv
+        ninv += 1
+        try:
+            return np.linalg.inv(A), np.zeros(len(A), dtype=bool)
+        except np.linalg.LinAlgError:
+            # a single singular matrix makes the batched inversion fail, so
+            # the members are inverted separately to find the singular ones
+            A_inv = np.zeros_like(A)
+            singular = np.zeros(len(A), dtype=bool)
+            for n, A_n in enumerate(A):
+                try:
+                    A_inv[n] = np.linalg.inv(A_n)
+                except np.linalg.LinAlgError:
+                    singular[n] = True
+            return A_inv, singular
+
+    def apply_inverse(A_inv, rhs):
+        nonlocal napply
+        napply += 1
+        return np.einsum("nij,nj->ni", A_inv, rhs)
+
+    newton_tol = 0.03 * rtol
+    newton_max_iter = 7 + int((s - 3) * 2.5)
+
+    # method constants
+    constants = radau_constants(s, eta)
+    A, b, c, s = constants.A, constants.b, constants.c, constants.s
+    T, TI = constants.T, constants.TI
+    gamma, alphas, betas = constants.gamma, constants.alphas, constants.betas
+    b_tilde, b_tilde_1, b_tilde_s2 = (
+        constants.b_tilde,
+        constants.b_tilde_1,
+        constants.b_tilde_s2,
+    )
+    Q = constants.Q
+    s_complex = len(alphas)
+    exponent = np.arange(1, s + 1)[:, None]
+
+    # initial guess for stage derivatives
+    Yp = np.repeat(yp0[:, None, :], s, axis=1)
+    Y = np.repeat(y0[:, None, :], s, axis=1)
+    tau = np.full((N, s), float(t0))
+
+    tn = np.full(N, float(t0))
+    hn = np.broadcast_to(np.asarray(h0, dtype=float), N).copy()
+    yn = y0.copy()
+    ypn = yp0.copy()
+    hn_old = np.full(N, np.nan)
+    error_norm_old = np.full(N, np.nan)
+    nsteps = np.zeros(N, dtype=int)
+    nrejected = np.zeros(N, dtype=int)
+    success = np.ones(N, dtype=bool)
+    active = tn < t1
+
+    # partial derivatives, whether they are evaluated at the current point
+    # and whether they have to be reevaluated before the next step
+    M = J = None
+    jac_current = np.zeros(N, dtype=bool)
+    jac_outdated = np.ones(N, dtype=bool)
+    from tqdm import tqdm
+
+    with tqdm(total=100, desc="Radau IIA ensemble") as pbar:
+        while np.any(active):
+            # ensure that last step exactly hits t1
+            hn = np.where(active & (tn + hn > t1), t1 - tn, hn)
+
+            # estimate Jacobians of all trajectories if one of the active
+            # trajectories requires them
+            if np.any(jac_outdated & active):
+                M, J = jac(tn, yn, ypn)
+                jac_current[:] = True
+                jac_outdated[:] = False
+
+            # batched inversions of the iteration matrices of the active
+            # trajectories
+            a = np.flatnonzero(active)
+            ha = hn[a][:, None, None]
+            inv_real, singular = invert(M[a] + ha * gamma * J[a])
+            inv_complex = []
+            for alpha, beta in zip(alphas, betas):
+                inv, singular_complex = invert(M[a] + ha * (alpha - 1j * beta) * J[a])
+                inv_complex.append(inv)
+                singular |= singular_complex
+
+            # quadrature
+            tau[a] = tn[a, None] + c * hn[a, None]
+            Y[a] = yn[a, None, :] + ha * np.einsum("ij,njk->nik", A, Yp[a])
+
+            # simplified Newton iterations of all active trajectories with
+            # regular iteration matrices, the others fail below
+            newton_scale = atol + np.abs(yn[a]) * rtol
+            iterating = ~singular
+            converged = np.zeros(len(a), dtype=bool)
+            dY_norm_old = np.full(len(a), np.nan)
+            rate_converged = np.full(len(a), np.nan)
+            nit = np.zeros(len(a), dtype=int)
+            for _ in range(newton_max_iter):
+                Fs = np.stack([fun(tau[:, i], Y[:, i], Yp[:, i]) for i in range(s)], 1)
+                G = np.einsum("ij,njk->nik", TI, Fs[a])
+
+                dW_dot = np.empty_like(G)
+                dW_dot[:, 0] = apply_inverse(inv_real, -G[:, 0])
+                for i in range(s_complex):
+                    G_complex = -(G[:, 2 * i + 1] + 1j * G[:, 2 * i + 2])
+                    dW_dot_complex = apply_inverse(inv_complex[i], G_complex)
+                    dW_dot[:, 2 * i + 1] = dW_dot_complex.real
+                    dW_dot[:, 2 * i + 2] = dW_dot_complex.imag
+
+                dYp = np.einsum("ij,njk->nik", T, dW_dot)
+                dY = ha * np.einsum("ij,njk->nik", A, dYp)
+
+                # only update trajectories that are still iterating
+                dYp[~iterating] = 0
+                dY[~iterating] = 0
+                Yp[a] += dYp
+                Y[a] += dY
+                nit += iterating
+
+                dY_norm = np.linalg.norm(
+                    dY / newton_scale[:, None, :], axis=(1, 2)
+                ) / np.sqrt(m)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rate = dY_norm / dY_norm_old
+                    diverged = iterating & (rate >= 1)
+                    converged_k = (
+                        iterating
+                        & (rate < 1)
+                        & (rate / (1 - rate) * dY_norm < newton_tol)
+                    )
+
+                converged |= converged_k
+                rate_converged[converged_k] = rate[converged_k]
+                iterating &= ~(diverged | converged_k)
+                dY_norm_old = dY_norm
+
+                if not np.any(iterating):
+                    break
+
+            # failed simplified Newton iterations are repeated with a new
+            # Jacobian or with halved step-size if the Jacobian is current
+            failed = a[~converged]
+            halved = failed[jac_current[failed]]
+            hn[halved] *= 0.5
+            nrejected[halved] += 1
+            jac_outdated[failed[~jac_current[failed]]] = True
+
+            # stiffly accurate method
+            tn1 = tau[a, -1]
+            yn1 = Y[a, -1]
+            ypn1 = Yp[a, -1]
+
+            # error estimate of the implicit embedded method with a single
+            # Newton iteration
+            yp_tilde = (
+                np.einsum("i,nik->nk", b - b_tilde, Yp[a]) - b_tilde_1 * ypn[a]
+            ) / b_tilde_s2
+            tn1_full, yn1_full, yp_tilde_full = tn.copy(), yn.copy(), ypn.copy()
+            tn1_full[a], yn1_full[a], yp_tilde_full[a] = tn1, yn1, yp_tilde
+            F_tilde = fun(tn1_full, yn1_full, yp_tilde_full)[a]
+            dy_tilde = apply_inverse(inv_real, F_tilde).real
+            error = (hn[a] * b_tilde_s2)[:, None] * dy_tilde
+
+            scale = atol + np.maximum(np.abs(yn[a]), np.abs(yn1)) * rtol
+            error_norm = np.linalg.norm(error / scale, axis=1) / np.sqrt(m)
+
+            # step-size control
+            with np.errstate(divide="ignore", invalid="ignore"):
+                multiplier = np.where(
+                    np.isnan(error_norm_old[a]) | (error_norm == 0),
+                    1.0,
+                    hn[a]
+                    / hn_old[a]
+                    * (error_norm_old[a] / error_norm) ** (1 / (s + 1)),
+                )
+                factor = np.minimum(1, multiplier) * error_norm ** (-1 / (s + 1))
+
+            # smooth limiter
+            factor = 1 + kappa * np.arctan((factor - 1) / kappa)
+
+            # add safety factor
+            safety = 0.9 * (2 * newton_max_iter + 1) / (2 * newton_max_iter + nit)
+            factor *= safety
+
+            # rejected steps
+            rejected = converged & (error_norm > 1)
+            hn[a[rejected]] *= factor[rejected]
+            nrejected[a[rejected]] += 1
+            jac_outdated[a[rejected]] |= ~jac_current[a[rejected]]
+
+            # accepted steps
+            accepted = converged & (error_norm <= 1)
+            acc = a[accepted]
+            if acc.size > 0:
+                nsteps[acc] += 1
+                h_acc = hn[acc]
+
+                # coefficients of the collocation polynomials
+                Z = Y[acc] - yn[acc, None, :]
+                C = np.einsum("ij,njk->nik", Q, Z)
+
+                # dense output
+                if t_eval is not None:
+                    t_eval_i1 = np.searchsorted(t_eval, tn[acc] + h_acc, side="right")
+                    for n, i0, i1, tn_n, hn_n, C_n in zip(
+                        acc, t_eval_i[acc], t_eval_i1, tn[acc], h_acc, C
+                    ):
+                        if i1 > i0:
+                            theta = (t_eval[i0:i1] - tn_n) / hn_n
+                            theta_vec = theta**exponent
+                            theta_hat_vec = exponent * theta ** (exponent - 1)
+                            y_eval[n, i0:i1] = yn[n] + theta_vec.T @ C_n
+                            yp_eval[n, i0:i1] = theta_hat_vec.T @ C_n / hn_n
+                    t_eval_i[acc] = t_eval_i1
+
+                # initial guess for next step by extrapolating the
+                # collocation polynomials
+                factor_acc = factor[accepted]
+                theta = 1 + c * factor_acc[:, None]
+                theta_hat_vec = exponent * theta[:, None, :] ** (exponent - 1)
+                Yp[acc] = (
+                    np.einsum("njk,nji->nik", C, theta_hat_vec) / h_acc[:, None, None]
+                )
+
+                # update values and step-sizes of accepted trajectories
+                tn[acc] = tn1[accepted]
+                yn[acc] = yn1[accepted]
+                ypn[acc] = ypn1[accepted]
+                hn[acc] = h_acc * factor_acc
+                hn_old[acc] = hn[acc]
+                error_norm_old[acc] = error_norm[accepted]
+
+                # reuse the partial derivatives if the simplified Newton
+                # iteration converged fast
+                jac_current[acc] = False
+                jac_outdated[acc] = rate_converged[accepted] > theta_jac
+
+            # trajectories with vanishing step-sizes failed
+            too_small = active & (hn < 10 * EPS * np.maximum(1.0, np.abs(tn)))
+            success[too_small] = False
+            active = (tn < t1) & success
+
+            # update progress bar
+            progress = min(100, int(100 * (tn.min() - t0) / (t1 - t0)))
+            pbar.n = progress
+            pbar.set_description(
+                f"t: {tn.min():0.2e}s < {t1:0.2e}s; active: {active.sum()}/{N}"
+            )
+            pbar.refresh()
+
+    return _RichResult(
+        t=tn,
+        y=yn,
+        yp=ypn,
+        success=success,
+        t_eval=t_eval,
+        y_eval=y_eval,
+        yp_eval=yp_eval,
+        nsteps=nsteps,
+        nrejected=nrejected,
+        nfev=nfev,
+        njev=njev,
+        ninv=ninv,
+        napply=napply,
+    )
@@ -1,10 +1,11 @@
 import numpy as np
-from tqdm import tqdm
+from functools import lru_cache
 from scipy._lib._util import _RichResult
-from scipy.optimize._numdiff import approx_derivative
-from scipy.linalg import lu_factor, lu_solve
-from scipy.linalg import eig, cdf2rdf
+from scipy.sparse import issparse, csc_matrix
 from dae4py.butcher_tableau import radau_tableau
+from dae4py.math import DAEJacobian, banded_sparsity, stage_transformation
+from dae4py.math import factor_lu as _factor_lu, solve_lu as _solve_lu
+from dae4py.solution import collect_steps
 
 
 def solve_dae_radau(
@@ -21,6 +22,18 @@ def solve_dae_radau(
     eta=0.05,
     newton_iter_embedded=1,
     extrapolate_dense_output=True,
+    jac=None,
+    jac_sparsity=None,
+    jac_mode="separate",
+    vectorized=False,
+    lband=None,
+    uband=None,
+    theta_jac=0.1,
+    h_ratio_band=(1.0, 1.2),
+    observer=None,
+    store_stages=True,
+    buffer_size=None,
+    dense_output=False,
 ):
     """
     Solves a system of DAEs using implicit Runge-Kutta methods with variable step-sizes.
@@ -59,6 +72,72 @@ def solve_dae_radau(
     extrapolate_dense_output: boolean, defaul: True
         Use dense output function to extrapolate a new initial guess for the
         next time step.
+    jac: callable, optional
+        Function jac(t, y, yp) returning the partial derivatives
+        (dF/dy, dF/dy'). They can be dense arrays or scipy.sparse matrices.
+        In the latter case, the iteration matrices are factorized with a
+        sparse LU-decomposition (SuperLU). If None, the partial derivatives
+        are approximated by finite differences.
+    jac_sparsity: array-like, sparse matrix, tuple or DAEJacobian, optional
+        Sparsity structure of dF/dy and dF/dy' that is used for the finite
+        difference approximation. A single (m, m) structure is used for both
+        partial derivatives, whereas a tuple (sparsity_y, sparsity_yp)
+        specifies them separately. Structurally independent columns are
+        grouped, so that only one residual evaluation per group is required.
+        A DAEJacobian instance can be passed to reuse its column grouping
+        for multiple solver calls. If given, the partial derivatives are
+        stored as sparse matrices and sparse LU-decompositions are used.
+    jac_mode: str, default: "separate"
+        Finite difference approximation of the partial derivatives:
+            - "separate": dF/dy and dF/dy' are approximated by two separate
+              sweeps that share the residual at (t, y, yp).
+            - "combined": Both partial derivatives are approximated in a
+              single sweep over the stacked vector (y, y'). The residual of
+              the last simplified Newton iterate of the previous step is
+              reused, so that no additional residual evaluation is required.
+        Only used if jac is None.
+    vectorized: bool, default: False
+        If True, F is called as F(T, Y, Yp) with arrays T of shape (k,) and
+        Y, Yp of shape (k, m) and has to return an array of shape (k, m).
+        All stages of a simplified Newton iteration and all columns of a
+        finite difference sweep are then evaluated by a single call. It
+        counts as k function evaluations in nfev.
+    lband: int or None, default: None
+        Lower bandwidth of dF/dy and dF/dy'.
+    uband: int or None, default: None
+        Upper bandwidth of dF/dy and dF/dy'. If one of the bandwidths is
+        given, the iteration matrices are factorized with a banded
+        LU-decomposition. If jac is None and no jac_sparsity is given, the
+        finite difference approximation uses the band structure.
+    theta_jac: float, default: 0.1
+        The partial derivatives are reused for the next step if the
+        contraction rate of the simplified Newton iteration is below
+        theta_jac, otherwise they are reevaluated. Smaller values, e.g.,
+        1e-3, reevaluate them after almost every step. Independently, the
+        partial derivatives are reevaluated if the simplified Newton
+        iteration does not converge with outdated ones.
+    h_ratio_band: tuple, default: (1.0, 1.2)
+        If the partial derivatives are reused and the ratio h_new / h_old
+        of the proposed step-size lies inside this band, the step-size is
+        not changed, such that the LU-decompositions of the iteration
+        matrices can be reused as well. Otherwise, the iteration matrices
+        are refactorized with the new step-size.
+    observer: callable, optional
+        Function observer(step) that is called after each accepted step with
+        the step yielded by iter_dae_radau.
+    store_stages: bool, default: True
+        If False, the stage values Y and Yp are not stored.
+    buffer_size: int or None, default: None
+        If given, only the last buffer_size points of the time grid are
+        stored in a ring buffer, such that the required memory does not
+        grow with the number of steps. Use iter_dae_radau to process all
+        steps without storing them.
+    dense_output: bool, default: False
+        If True, the coefficients of the collocation polynomials of all
+        steps are stored and returned as a RadauDenseOutput object, which
+        evaluates y and y' at arbitrary times after the integration. In
+        contrast to t_eval, the evaluation points need not be known in
+        advance. The stored steps are not affected by buffer_size.
 
     Returns
     -------
@@ -67,34 +146,223 @@ def solve_dae_radau(
         - t (array-like): Time grid.
         - y (array-like): State at the time grid.
         - yp (array-like): Derivative at the time grid.
-        - Y (array-like): Stage values at the time grid.
-        - Yp (array-like): Stage derivative at the time grid.
+        - Y (array-like): Stage values at the time grid (None if
+          store_stages is False).
+        - Yp (array-like): Stage derivative at the time grid (None if
+          store_stages is False).
         - t_eval (array-like): Time grid (dense output).
         - y_eval (array-like): State (dense output).
         - yp_eval (array-like): Derivative (dense output).
+        - sol (RadauDenseOutput): Continuous extension, i.e.,
+          sol(t) = (y(t), yp(t)), if dense_output is True, otherwise None.
         - nsteps (int): Number of steps.
         - nfev (int): Number of function evaluations.
+        - nfev_saved (int): Number of function evaluations saved by reusing
+          residuals of the simplified Newton iterations for the Jacobian.
         - njev (int): Number of Jacobian evaluations.
         - nlu (int): Number of LU decompositions.
         - nlgs (int): Number of forward + backward substitutions to solve a
           linear system of equations with given LU-decompositions.
     """
+    y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
+
+    # the initial guess of the stages is stored at the initial time
+    A = radau_constants(s, eta).A
+    Yp0 = np.tile(yp0, s).reshape(s, -1)
+    initial = dict(t=t_span[0], y=y0, yp=yp0, Y=y0 + h0 * A.dot(Yp0), Yp=Yp0)
+
+    steps = iter_dae_radau(
+        F,
+        y0,
+        yp0,
+        t_span,
+        h0=h0,
+        s=s,
+        t_eval=t_eval,
+        atol=atol,
+        rtol=rtol,
+        kappa=kappa,
+        eta=eta,
+        newton_iter_embedded=newton_iter_embedded,
+        extrapolate_dense_output=extrapolate_dense_output,
+        jac=jac,
+        jac_sparsity=jac_sparsity,
+        jac_mode=jac_mode,
+        vectorized=vectorized,
+        lband=lband,
+        uband=uband,
+        theta_jac=theta_jac,
+        h_ratio_band=h_ratio_band,
+    )
+    # collect the collocation polynomials of all steps
+    if dense_output:
+        t_steps = [initial["t"]]
+        y_steps = [y0]
+        coefficients = []
+        user_observer = observer
+
+        def observer(step):
+            t_steps.append(step.t)
+            y_steps.append(step.y)
+            coefficients.append(step.coefficients)
+            if user_observer is not None:
+                user_observer(step)
+
+    solution = collect_steps(
+        steps,
+        initial,
+        observer=observer,
+        store_stages=store_stages,
+        buffer_size=buffer_size,
+        dense_output=True,
+    )
+    solution.t_eval = t_eval if t_eval is None else np.asarray(t_eval)
+    solution.sol = None
+    if dense_output:
+        solution.sol = RadauDenseOutput(
+            np.array(t_steps), np.array(y_steps[:-1]), np.array(coefficients)
+        )
+    return solution
+
+
+class RadauDenseOutput:
+    def __init__(self, t, y, coefficients):
+        """
+        Continuous extension of the Radau IIA solution given by the
+        collocation polynomials of all steps. In step i with t[i] <= t <=
+        t[i + 1] and step-size h = t[i + 1] - t[i], the collocation
+        polynomial and its derivative are
+
+            y(t) = y[i] + sum_k C[i, :, k] theta^(k + 1),
+            y'(t) = sum_k C[i, :, k] (k + 1) theta^k / h,
+
+        with theta = (t - t[i]) / h and C = coefficients.
+
+        Parameters
+        ----------
+        t: array-like, shape (n + 1,)
+            Step boundaries.
+        y: array-like, shape (n, m)
+            State at the beginning of each step.
+        coefficients: array-like, shape (n, m, s)
+            Coefficients of the collocation polynomials.
+        """
+        self.t = np.ascontiguousarray(t, dtype=float)
+        self.h = np.diff(self.t)
+        self.y = np.ascontiguousarray(y)
+        self.coefficients = np.ascontiguousarray(coefficients)
+        self.s = self.coefficients.shape[-1]
+
+    @property
+    def t_min(self):
+        return self.t[0]
+
+    @property
+    def t_max(self):
+        return self.t[-1]
+
+    def __call__(self, t):
+        """
+        Evaluate the continuous extension. Points outside of [t_min, t_max]
+        are extrapolated by the first or last collocation polynomial.
+
+        Parameters
+        ----------
+        t: float or array-like, shape (q,)
+            Evaluation points.
+
+        Returns
+        -------
+        y: array-like, shape (m,) or (q, m)
+            State at t.
+        yp: array-like, shape (m,) or (q, m)
+            Derivative at t.
+        """
+        t = np.asarray(t, dtype=float)
+        t_flat = np.atleast_1d(t)
+
+        # index of the step that contains each point
+        i = np.searchsorted(self.t, t_flat, side="right") - 1
+        i = np.clip(i, 0, len(self.h) - 1)
+
+        # batched evaluation of theta^k and (k + 1) theta^k / h
+        h = self.h[i]
+        theta = (t_flat - self.t[i]) / h
+        exponent = np.arange(self.s)
+        theta_powers = theta[:, None] ** exponent
+        C = self.coefficients[i]
+
+        y = self.y[i] + np.einsum("qmk,qk->qm", C, theta_powers * theta[:, None])
+        yp = np.einsum("qmk,qk->qm", C, theta_powers * (exponent + 1) / h[:, None])
+
+        if t.ndim == 0:
+            return y[0], yp[0]
+        return y, yp
+
+
+def iter_dae_radau(
+    F,
+    y0,
+    yp0,
+    t_span,
+    h0=1e-3,
+    s=3,
+    t_eval=None,
+    atol=1e-6,
+    rtol=1e-3,
+    kappa=1.0,
+    eta=0.05,
+    newton_iter_embedded=1,
+    extrapolate_dense_output=True,
+    jac=None,
+    jac_sparsity=None,
+    jac_mode="separate",
+    vectorized=False,
+    lband=None,
+    uband=None,
+    theta_jac=0.1,
+    h_ratio_band=(1.0, 1.2),
+):
+    """
+    Generator that solves a system of DAEs with Radau IIA methods with
+    variable step-sizes and yields the accepted steps one by one. The
+    parameters are described in solve_dae_radau. Nothing is stored, so that
+    arbitrarily long time spans can be integrated with constant memory.
+
+    Yields
+    ------
+    step: _RichResult
+        Container that stores
+        - t (float): Time at the end of the step.
+        - y (array-like): State at t.
+        - yp (array-like): Derivative at t.
+        - Y (array-like): Stage values of the step.
+        - Yp (array-like): Stage derivatives of the step.
+        - h (float): Step-size.
+        - t_eval (array-like): Points of t_eval inside the step (None if
+          there are none).
+        - y_eval (array-like): State at these points (dense output).
+        - yp_eval (array-like): Derivative at these points (dense output).
+        - coefficients (array-like): Coefficients of the collocation
+          polynomial of the step, see RadauDenseOutput.
+        - nsteps, nfev, nfev_saved, njev, nlu, nlgs (int): Counters up to
+          this step, see solve_dae_radau.
+    """
     t0, t1 = t_span
     if t1 <= t0:
         raise ValueError("t1 must be greater than t0")
 
+    if jac_mode not in ["separate", "combined"]:
+        raise ValueError(f"jac_mode has to be 'separate' or 'combined', got {jac_mode}")
+
     if t_eval is not None:
         t_eval_i = 0
         t_eval = np.asarray(t_eval)
-        y_eval = []
-        yp_eval = []
-    else:
-        y_eval = None
-        yp_eval = None
 
     # wrap function calls
     nsteps = 0
     nfev = 0
+    nfev_saved = 0
     njev = 0
     nlu = 0
     nlgs = 0
@@ -102,106 +370,114 @@ def solve_dae_radau(
     def fun(t, y, yp):
         nonlocal nfev
         nfev += 1
+        if vectorized:
+            return np.reshape(F(np.array([t]), y[None, :], yp[None, :]), -1)
         return np.atleast_1d(F(t, y, yp))
 
-    def jac(t, y, yp):
+    def fun_vectorized(T, Y, Yp):
+        # a single call evaluates the residuals at all len(T) points
+        nonlocal nfev
+        nfev += len(T)
+        return np.reshape(F(T, Y, Yp), Y.shape)
+
+    def fun_stages(T, Y, Yp):
+        if vectorized:
+            return fun_vectorized(T, Y, Yp)
+        return np.array([fun(Ti, Yi, Ypi) for (Ti, Yi, Ypi) in zip(T, Y, Yp)])
+
+    # the residual at the last simplified Newton iterate of the previous
+    # step, i.e., (t, y, yp, F(t, y, yp)), which is the baseline of the
+    # combined finite difference approximation
+    jac_baseline = None
+
+    if jac is None:
+        if jac_sparsity is None and (lband is not None or uband is not None):
+            jac_sparsity = banded_sparsity(np.size(y0), lband, uband)
+
+        if isinstance(jac_sparsity, DAEJacobian):
+            fd_jac = jac_sparsity
+        else:
+            fd_jac = DAEJacobian(jac_sparsity)
+
+        fd_fun = fun_vectorized if vectorized else fun
+
+        if jac_mode == "combined":
+
+            def jac(t, y, yp):
+                nonlocal nfev_saved
+                if jac_baseline is None:
+                    return fd_jac(
+                        fd_fun, t, y, yp, combined=True, vectorized=vectorized
+                    )
+
+                nfev_saved += 1
+                return fd_jac(
+                    fd_fun, *jac_baseline, combined=True, vectorized=vectorized
+                )
+
+        else:
+
+            def jac(t, y, yp):
+                return fd_jac(fd_fun, t, y, yp, vectorized=vectorized)
+
+    def jacobian(t, y, yp, jac=jac):
         nonlocal njev
         njev += 1
-        J = approx_derivative(lambda _y: F(t, _y, yp), y)
-        M = approx_derivative(lambda _yp: F(t, y, _yp), y)
-        return M, J
+        J, M = jac(t, y, yp)
+
+        # use sparse matrices for both partial derivatives if one of them
+        # is sparse, otherwise the iteration matrices become dense
+        if issparse(J) or issparse(M):
+            return csc_matrix(M), csc_matrix(J)
+        return np.atleast_2d(M), np.atleast_2d(J)
 
     def factor_lu(A):
         nonlocal nlu
         nlu += 1
-        return lu_factor(A)
+        return _factor_lu(A, lband, uband)
 
     def solve_lu(LU, rhs):
         nonlocal nlgs
         nlgs += 1
-        return lu_solve(LU, rhs)
+        return _solve_lu(LU, rhs)
 
     newton_tol = 0.03 * rtol
     newton_max_iter = 7 + int((s - 3) * 2.5)
 
-    # Butcher tableau
-    assert s % 2 == 1
-    tableau = radau_tableau(s)
-    A, b, c, s = tableau.A, tableau.b, tableau.c, tableau.s
-
-    # eigenvalues and corresponding eigenvectors of coefficient matrix
-    lambdas, U = eig(A)
-
-    # sort eigenvalues and permut eigenvectors accordingly
-    idx = np.argsort(lambdas)[::-1]
-    lambdas = lambdas[idx]
-    U = U[:, idx]
-
-    # convert complex eigenvalues and eigenvectors to real eigenvalues
-    # in a block diagonal form and the associated real eigenvectors
-    Gammas, T = cdf2rdf(lambdas, U)
-    TI = np.linalg.inv(T)
-
-    # sanity checks
-    assert np.allclose(U @ np.diag(lambdas) @ np.linalg.inv(U), A)
-    assert np.allclose(np.linalg.inv(U) @ A @ U, np.diag(lambdas))
-    assert np.allclose(T @ Gammas @ TI, A)
-    assert np.allclose(TI @ A @ T, Gammas)
-
-    # extract real and complex eigenvalues
-    real_idx = lambdas.imag == 0
-    complex_idx = ~real_idx
-    gammas = lambdas[real_idx].real
-    gamma = gammas[0]
-    alphas_betas = lambdas[complex_idx]
-    alphas = alphas_betas[::2].real
-    betas = alphas_betas[::2].imag
-
-    # extended quadrature nodes and Vandermonde matrix
-    c_hat = np.array([0, *c])
-    Vc_hat = np.vander(c_hat, increasing=True)
-
-    # quadrature weights for explicit embedded method
-    rhs = 1 / np.arange(1, s + 1)
-    b_hat_1 = gamma
-    rhs[0] -= b_hat_1
-    b_hat = np.linalg.solve(Vc_hat.T[:-1, 1:], rhs)
-
-    # quadrature weights for implicit embedded method
-    rhs = 1 / np.arange(1, s + 1)
-    b_tilde_s2 = gamma
-    b_tilde_1 = eta * b_tilde_s2
-    rhs[0] -= b_tilde_1
-    rhs -= b_tilde_s2
-    b_tilde = np.linalg.solve(Vc_hat.T[:-1, 1:], rhs)
-
-    # compute the inverse Vandermonde matrix to get the inverse
-    # interpolation matrix
-    Q = np.linalg.inv(Vc_hat[1:, 1:])
+    # method constants
+    constants = radau_constants(s, eta)
+    A, b, c, s = constants.A, constants.b, constants.c, constants.s
+    transformation = constants.transformation
+    b_hat, b_hat_1 = constants.b_hat, constants.b_hat_1
+    b_tilde, b_tilde_1, b_tilde_s2 = (
+        constants.b_tilde,
+        constants.b_tilde_1,
+        constants.b_tilde_s2,
+    )
+    Q = constants.Q
 
     # prepare initial values
     y0, yp0 = np.atleast_1d(y0), np.atleast_1d(yp0)
-    m = len(y0)
 
     # initial guess for stage derivatives
     Yp = np.tile(yp0, s).reshape(s, -1)
     Y = y0 + h0 * A.dot(Yp)
 
-    # initialize solution arrays
-    t = [t0]
-    y = [y0]
-    yp = [yp0]
-    Ys = [Y]
-    Yps = [Yp]
-
     hn = h0
     tn = t0
     yn = y0
     ypn = yp0
     hn_old = None
     error_norm_old = None
-    LU_real = None
-    LU_complex = None
+
+    # partial derivatives, whether they are evaluated at the current point
+    # and LU-decompositions of the iteration matrices with their step-size
+    M = J = None
+    current_jac = False
+    LU = None
+    h_LU = None
+    from tqdm import tqdm
+
     with tqdm(total=100, desc="Radau IIA") as pbar:
         while tn < t1:
             # ensure that last step exactly hits t1
@@ -217,48 +493,39 @@ def solve_dae_radau(
                 newton_scale = atol + np.abs(yn) * rtol
                 converged = False
                 while not converged:
-                    # estimate Jacobians and compute factorizations
-                    current_jac = False
-                    if LU_real is None or LU_complex is None:
-                        M, J = jac(tn, yn, ypn)
+                    # evaluate the partial derivatives only if required and
+                    # refactorize if the step-size has changed
+                    if J is None:
+                        M, J = jacobian(tn, yn, ypn)
                         current_jac = True
-
-                        LU_real = factor_lu(M + hn * gamma * J)
-                        LU_complex = [
-                            factor_lu(M + hn * (alpha - 1j * beta) * J)
-                            for (alpha, beta) in zip(alphas, betas)
-                        ]
+                        LU = None
+                    if LU is None or hn != h_LU:
+                        LU = transformation.factor(M, J, hn, factor_lu)
+                        h_LU = hn
 
                     # quadrature
                     tau = tn + c * hn
                     Y = yn + hn * A.dot(Yp)
 
-                    Fs = np.empty((s, m))
                     dY_norm_old = None
-                    dW_dot = np.empty_like(Fs)
                     rate = None
-                    s_complex = len(LU_complex)
                     for k in range(newton_max_iter):
-                        for i in range(s):
-                            Fs[i] = fun(tau[i], Y[i], Yp[i])
-
-                        G = TI @ Fs
-                        G_real = -G[0]
-                        G_complex = np.empty((s_complex, m), dtype=complex)
-                        for i in range(s_complex):
-                            G_complex[i] = -(G[2 * i + 1] + 1j * G[2 * i + 2])
-
-                        dW_dot_real = solve_lu(LU_real, G_real)
-                        dW_dot_complex = np.empty_like(G_complex)
-                        for i in range(s_complex):
-                            dW_dot_complex[i] = solve_lu(LU_complex[i], G_complex[i])
-
-                        dW_dot[0] = dW_dot_real
-                        for i in range(s_complex):
-                            dW_dot[2 * i + 1] = dW_dot_complex[i].real
-                            dW_dot[2 * i + 2] = dW_dot_complex[i].imag
-
-                        dYp = T.dot(dW_dot)
+                        Fs = fun_stages(tau, Y, Yp)
+
+                        # diverged with outdated partial derivatives
+                        if not np.all(np.isfinite(Fs)):
+                            break
+
+                        if jac_mode == "combined":
+                            newton_baseline = (
+                                tau[-1],
+                                Y[-1].copy(),
+                                Yp[-1].copy(),
+                                Fs[-1].copy(),
+                            )
+
+                        # decoupled solution of the linear systems
+                        dYp = -transformation.solve(LU, Fs, solve_lu)
                         dY = hn * A.dot(dYp)
 
                         Yp += dYp
@@ -286,13 +553,10 @@ def solve_dae_radau(
                         if current_jac:
                             break
 
-                        LU_real = None
-                        LU_complex = None
+                        J = None
 
                 if not converged:
                     hn *= 0.5
-                    LU_real = None
-                    LU_complex = None
                     continue
 
                 # stiffly accurate method
@@ -307,7 +571,7 @@ def solve_dae_radau(
                     case 1:
                         yp_tilde = ((b - b_tilde) @ Yp - b_tilde_1 * ypn) / b_tilde_s2
                         F_tilde = fun(tn1, yn1, yp_tilde)
-                        error = hn * b_tilde_s2 * solve_lu(LU_real, F_tilde)
+                        error = hn * b_tilde_s2 * solve_lu(LU[0], F_tilde)
                     case _:
                         yp_tilde0 = (
                             -(yn / hn + b_tilde_1 * ypn + b_tilde @ Yp) / b_tilde_s2
@@ -316,7 +580,7 @@ def solve_dae_radau(
                         for _ in range(newton_iter_embedded):
                             yp_tilde = yp_tilde0 + y_tilde / (hn * b_tilde_s2)
                             F_tilde = fun(tn1, y_tilde, yp_tilde)
-                            y_tilde -= hn * b_tilde_s2 * solve_lu(LU_real, F_tilde)
+                            y_tilde -= hn * b_tilde_s2 * solve_lu(LU[0], F_tilde)
 
                         error = yn1 - y_tilde
 
@@ -343,24 +607,45 @@ def solve_dae_radau(
 
                 # can the step be accepted
                 if error_norm > 1:
-                    LU_real = None
-                    LU_complex = None
                     hn *= factor
+                    if not current_jac:
+                        J = None
                 else:
                     step_accepted = True
 
-            # append to solution arrays
+            # the last stage of the previous step is the baseline for the
+            # next Jacobian evaluation
+            if jac_mode == "combined":
+                jac_baseline = newton_baseline
+
+            # the accepted step
             nsteps += 1
-            t.append(tn1)
-            y.append(yn1.copy())
-            yp.append(ypn1.copy())
-            Ys.append(Y.copy())
-            Yps.append(Yp.copy())
+            step = _RichResult(
+                t=tn1,
+                y=yn1.copy(),
+                yp=ypn1.copy(),
+                Y=Y.copy(),
+                Yp=Yp.copy(),
+                h=hn,
+                t_eval=None,
+                y_eval=None,
+                yp_eval=None,
+            )
+
+            # reuse the partial derivatives if the simplified Newton
+            # iteration converged fast and keep the step-size (and the
+            # LU-decompositions) if it would only change slightly
+            current_jac = False
+            if rate > theta_jac:
+                J = None
+            elif h_ratio_band[0] <= factor <= h_ratio_band[1]:
+                factor = 1.0
 
             # initial guess for next iteration by extrapolating
             # collocation polynomial
             Z = Y - yn
             ZTQT = Z.T @ Q.T
+            step.coefficients = ZTQT
             if extrapolate_dense_output:
                 theta = 1 + c * factor
                 exponent = np.arange(1, s + 1)[:, None]
@@ -383,8 +668,9 @@ def solve_dae_radau(
                     y_eval_step = yn[:, None] + ZTQT @ theta_vec
                     yp_eval_step = ZTQT @ (theta_hat_vec / hn)
 
-                    y_eval.append(y_eval_step.T)
-                    yp_eval.append(yp_eval_step.T)
+                    step.t_eval = t_eval_step
+                    step.y_eval = y_eval_step.T
+                    step.yp_eval = yp_eval_step.T
 
             # fianlly update the step-size for the next step
             hn *= factor
@@ -402,18 +688,103 @@ def solve_dae_radau(
             pbar.set_description(f"t: {tn:0.2e}s < {t1:0.2e}s; h: {hn:0.2e}")
             pbar.refresh()
 
+            yield _RichResult(
+                step,
+                nsteps=nsteps,
+                nfev=nfev,
+                nfev_saved=nfev_saved,
+                njev=njev,
+                nlu=nlu,
+                nlgs=nlgs,
+            )
+
+
+@lru_cache(maxsize=32)
+def radau_constants(s, eta):
+    """
+    Compute the constants of the s-stage Radau IIA method that are required
+    by the variable step-size implementation. The constants are cached for
+    each pair (s, eta), hence all arrays are read-only.
+
+    Parameters
+    ----------
+    s: int
+        Number of stages (has to be odd).
+    eta: float
+        Absolute value of the stability function of the implicit embedded
+        method at infinity.
+
+    Returns
+    -------
+    constants: _RichResult
+        Container that stores
+        - A, b, c, s: Butcher tableau.
+        - transformation (StageTransformation): Transformation that
+          decouples the stages.
+        - T, TI (array-like): Transformation matrix and its inverse.
+        - gamma (float): Real eigenvalue of A.
+        - alphas, betas (array-like): Real and imaginary parts of the
+          complex eigenvalues of A.
+        - b_hat, b_hat_1: Quadrature weights of the explicit embedded
+          method.
+        - b_tilde, b_tilde_1, b_tilde_s2: Quadrature weights of the implicit
+          embedded method.
+        - Q (array-like): Inverse interpolation matrix of the collocation
+          polynomial.
+    """
+    # Butcher tableau
+    assert s % 2 == 1
+    tableau = radau_tableau(s)
+    A, b, c, s = tableau.A, tableau.b, tableau.c, tableau.s
+
+    # transformation to real block diagonal form with a single real
+    # eigenvalue (first) and (s - 1) / 2 pairs of complex eigenvalues
+    transformation = stage_transformation(A)
+    if __debug__:
+        assert transformation.n_real == 1
+    gamma = transformation.gammas[0]
+
+    # extended quadrature nodes and Vandermonde matrix
+    c_hat = np.array([0, *c])
+    Vc_hat = np.vander(c_hat, increasing=True)
+
+    # quadrature weights for explicit embedded method
+    rhs = 1 / np.arange(1, s + 1)
+    b_hat_1 = gamma
+    rhs[0] -= b_hat_1
+    b_hat = np.linalg.solve(Vc_hat.T[:-1, 1:], rhs)
+
+    # quadrature weights for implicit embedded method
+    rhs = 1 / np.arange(1, s + 1)
+    b_tilde_s2 = gamma
+    b_tilde_1 = eta * b_tilde_s2
+    rhs[0] -= b_tilde_1
+    rhs -= b_tilde_s2
+    b_tilde = np.linalg.solve(Vc_hat.T[:-1, 1:], rhs)
+
+    # compute the inverse Vandermonde matrix to get the inverse
+    # interpolation matrix
+    Q = np.linalg.inv(Vc_hat[1:, 1:])
+
+    # the cached arrays are shared by all solver calls
+    for array in (b_hat, b_tilde, Q):
+        array.setflags(write=False)
+
     return _RichResult(
-        t=np.array(t),
-        y=np.array(y),
-        yp=np.array(yp),
-        Y=np.array(Ys),
-        Yp=np.array(Yps),
-        t_eval=t_eval,
-        y_eval=np.concatenate(y_eval) if y_eval is not None else y_eval,
-        yp_eval=np.concatenate(yp_eval) if y_eval is not None else yp_eval,
-        nsteps=nsteps,
-        nfev=nfev,
-        njev=njev,
-        nlu=nlu,
-        nlgs=nlgs,
+        A=A,
+        b=b,
+        c=c,
+        s=s,
+        transformation=transformation,
+        T=transformation.T,
+        TI=transformation.TI,
+        gamma=gamma,
+        alphas=transformation.alphas,
+        betas=transformation.betas,
+        b_hat=b_hat,
+        b_hat_1=b_hat_1,
+        b_tilde=b_tilde,
+        b_tilde_1=b_tilde_1,
+        b_tilde_s2=b_tilde_s2,
+        Q=Q,
     )
@@ -0,0 +1,88 @@
+import numpy as np
+from collections import deque
+from scipy._lib._util import _RichResult
+
+# stage values are only stored if requested
+STAGES = ("Y", "Yp")
+
+# values of a single step that are not copied to the solution
+STEP_VALUES = ("h", "t_eval", "y_eval", "yp_eval", "coefficients")
+
+
+def collect_steps(
+    steps,
+    initial,
+    observer=None,
+    store_stages=True,
+    buffer_size=None,
+    dense_output=False,
+):
+    """
+    Consume the accepted steps of a step iterator, e.g., iter_dae_radau,
+    and store them in contiguous arrays.
+
+    Parameters
+    ----------
+    steps: iterable
+        Accepted steps. Each step is a mapping that stores at least the keys
+        of initial.
+    initial: dict
+        Values at the initial time, e.g., t, y, yp and optionally the stages
+        Y and Yp. Its keys define which values are stored.
+    observer: callable, optional
+        Function observer(step) that is called after each accepted step.
+    store_stages: bool, default: True
+        If False, the stages Y and Yp are not stored and None is returned
+        for them.
+    buffer_size: int or None, default: None
+        If given, only the last buffer_size points are stored in a ring
+        buffer, such that the required memory does not grow with the number
+        of steps. Otherwise, all points are stored.
+    dense_output: bool, default: False
+        Concatenate the dense output y_eval and yp_eval of all steps.
+
+    Returns
+    -------
+    solution: _RichResult
+        Container that stores the arrays of all keys of initial, the dense
+        output (if requested) and all remaining values of the last step,
+        e.g., the counters nsteps, nfev, ...
+    """
+    if buffer_size is not None and buffer_size < 1:
+        raise ValueError(f"buffer_size has to be positive, got {buffer_size}")
+
+    storage = {
+        name: deque([value], maxlen=buffer_size)
+        for name, value in initial.items()
+        if store_stages or name not in STAGES
+    }
+    y_eval = []
+    yp_eval = []
+
+    step = {}
+    for step in steps:
+        for name, values in storage.items():
+            values.append(step[name])
+
+        if dense_output and step["y_eval"] is not None:
+            y_eval.append(step["y_eval"])
+            yp_eval.append(step["yp_eval"])
+
+        if observer is not None:
+            observer(step)
+
+    solution = _RichResult()
+    for name in initial:
+        values = storage.get(name)
+        solution[name] = np.array(values) if values is not None else None
+
+    if dense_output:
+        solution.y_eval = np.concatenate(y_eval) if y_eval else None
+        solution.yp_eval = np.concatenate(yp_eval) if yp_eval else None
+
+    # counters and other values of the last step
+    for name, value in step.items():
+        if name not in initial and name not in STEP_VALUES:
+            solution[name] = value
+
+    return solution
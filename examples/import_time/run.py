@@ -0,0 +1,32 @@
+import sys
+import argparse
+from dae4py.benchmark import (
+    import_time,
+    save_benchmark,
+    load_benchmark,
+    compare_import_time,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time benchmark.")
+    parser.add_argument("--output", default="import_time.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = import_time(repeat=args.repeat)
+    save_benchmark(records, args.output)
+
+    for record in records:
+        print(
+            f"{record['statement']:>55s}; success: {record['success']}; "
+            f"import time: {record.get('import_time')}; "
+            f"heavy modules: {record.get('heavy_modules')}"
+        )
+
+    baseline = None if args.baseline is None else load_benchmark(args.baseline)
+    regressions = compare_import_time(records, baseline)
+    for regression in regressions:
+        print(f"regression: {regression}")
+    if regressions:
+        sys.exit(1)
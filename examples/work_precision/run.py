@@ -0,0 +1,68 @@
+import sys
+import argparse
+import numpy as np
+from pathlib import Path
+from dae4py.benchmark import (
+    work_precision,
+    save_benchmark,
+    load_benchmark,
+    compare_benchmark,
+)
+
+examples = Path(__file__).resolve().parents[1]
+for directory in [
+    "index0/van_der_pol",
+    "index1/robertson",
+    "index1/brenan",
+    "index2/knife_edge",
+    "index3/particle_circular_track",
+]:
+    sys.path.insert(0, str(examples / directory))
+
+from van_der_pol import problem as van_der_pol
+from robertson import problem as robertson
+from brenan import problem as brenan
+from knife_edge import problem as knife_edge
+from particle_circular_track import problem as particle_circular_track
+
+rtols = np.array([1e-4, 1e-6, 1e-8])
+
+# problems and step-sizes for the solvers with fixed step-size (the
+# Robertson problem on [0, 1e6] is only solved with adaptive step-sizes)
+benchmarks = [
+    (van_der_pol, np.array([1e-3, 5e-4, 2.5e-4])),
+    (robertson, None),
+    (brenan, np.array([1e-1, 5e-2, 2.5e-2])),
+    (knife_edge, np.array([1e-2, 5e-3, 2.5e-3])),
+    (particle_circular_track, np.array([1e-2, 5e-3, 2.5e-3])),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Work-precision benchmark.")
+    parser.add_argument("--output", default="work_precision.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    records = []
+    for problem, h0s in benchmarks:
+        records.extend(
+            work_precision(problem, rtols, h0s=h0s, memory=not args.no_memory)
+        )
+    save_benchmark(records, args.output)
+
+    for record in records:
+        print(
+            f"{record['problem']:>25s}; {record['solver']:>15s}; "
+            f"rtol: {record['rtol']:0.1e}; success: {record['success']}; "
+            f"error: {record.get('error')}; wall time: {record.get('wall_time')}; "
+            f"nfev: {record.get('nfev')}"
+        )
+
+    if args.baseline is not None:
+        regressions = compare_benchmark(records, load_benchmark(args.baseline))
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)